@@ -0,0 +1,244 @@
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+import json
+import logging
+from typing import Any, Awaitable, Callable, NamedTuple
+
+from django.conf import settings
+
+from services.bot.metrics import Counter
+from services.bot.summarizer import Ranking
+from services.bot.timezones import get_timezone
+from services.bot.utils import game_number_for_day
+from services.bot.watermarks import Watermark, get_watermark, get_watermarks
+
+logger = logging.getLogger(__name__)
+
+KEEPALIVE = b": keepalive\n\n"
+
+live_events = Counter("live.events", "Changes published to live leaderboard subscribers")
+live_resyncs = Counter("live.resyncs", "Live leaderboard subscribers which fell behind and were sent a snapshot")
+
+
+class LiveTopic(NamedTuple):
+    channel_id: int
+    ranking: Ranking
+    days: int | None
+    limit: int
+
+
+@dataclass
+class LiveState:
+    game_number: int
+    players: list[dict[str, Any]]
+    results: list[dict[str, Any]]
+
+
+@dataclass
+class _Topic:
+    key: LiveTopic
+    state: LiveState | None = None
+    watermark: Watermark | None = None
+    snapshot: bytes | None = None
+    subscribers: set["Subscription"] = field(default_factory=set)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+    def get_snapshot(self) -> bytes:
+        # Built at most once per change, however many subscribers need it
+        if self.snapshot is None:
+            assert self.state is not None
+            self.snapshot = _encode("snapshot", _ranked_state(self.state))
+        return self.snapshot
+
+
+class Subscription:
+    """
+    The events for one client, held in a buffer of at most buffer_size events. Deltas only make sense applied in
+    order, so a client which falls that far behind has its buffer replaced by a snapshot of the current state.
+    Iterating it waits for the next event, and closing it unsubscribes, which Django does when the response ends.
+    """
+
+    def __init__(self, topic: _Topic, buffer_size: int, keepalive_seconds: float) -> None:
+        self.topic = topic
+        self.buffer_size = buffer_size
+        self.keepalive_seconds = keepalive_seconds
+        self._queue: asyncio.Queue[bytes] = asyncio.Queue()
+        self._started = False
+
+    @property
+    def buffered(self) -> int:
+        return self._queue.qsize()
+
+    def start(self) -> None:
+        self._queue.put_nowait(self.topic.get_snapshot())
+        self._started = True
+
+    def send(self, events: list[bytes]) -> None:
+        # Changes published before the snapshot was taken are already part of it
+        if not self._started:
+            return
+
+        if self._queue.qsize() + len(events) <= self.buffer_size:
+            for event in events:
+                self._queue.put_nowait(event)
+            return
+
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._queue.put_nowait(self.topic.get_snapshot())
+        live_resyncs.add()
+
+    def close(self) -> None:
+        self.topic.subscribers.discard(self)
+
+    def __aiter__(self) -> "Subscription":
+        return self
+
+    async def __anext__(self) -> bytes:
+        # A comment keeps the connection open, and finds out if the client has gone, when nothing has changed.
+        # wait_for can swallow a cancellation which arrives along with an event, leaving a disconnected client's
+        # stream running, which the timeout context manager does not.
+        try:
+            async with asyncio.timeout(self.keepalive_seconds):
+                return await self._queue.get()
+        except TimeoutError:
+            return KEEPALIVE
+
+
+class LiveBroker:
+    """
+    Fans changes to leaderboards and today's results out to every client subscribed to them. Games are stored by
+    the bot in another process, so the broker checks the watermarks of every channel with a subscriber in one
+    query every poll_seconds, and loads each topic whose channel changed once, however many clients there are.
+    Clients get a snapshot when they subscribe followed by only the players which changed.
+    """
+
+    def __init__(
+        self,
+        load: Callable[[LiveTopic], Awaitable[LiveState]],
+        poll_seconds: float = settings.LIVE_POLL_SECONDS,
+        buffer_size: int = settings.LIVE_BUFFER_SIZE,
+        keepalive_seconds: float = settings.LIVE_KEEPALIVE_SECONDS,
+    ) -> None:
+        self.load = load
+        self.poll_seconds = poll_seconds
+        self.buffer_size = buffer_size
+        self.keepalive_seconds = keepalive_seconds
+        self._topics: dict[LiveTopic, _Topic] = {}
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def subscribers(self) -> int:
+        return sum(len(topic.subscribers) for topic in self._topics.values())
+
+    async def subscribe(self, key: LiveTopic) -> Subscription | None:
+        """Subscribes to the topic starting with a snapshot of it, or returns none if the channel is not tracked"""
+        topic = self._topics.get(key)
+        if topic is None:
+            topic = self._topics[key] = _Topic(key)
+
+        subscription = Subscription(topic, self.buffer_size, self.keepalive_seconds)
+        topic.subscribers.add(subscription)
+        try:
+            # Clients which subscribe together wait for the first one to load the topic rather than each loading it
+            async with topic.lock:
+                if topic.state is None:
+                    # Read before loading, so a change made while loading is picked up by the next poll
+                    topic.watermark = await get_watermark(key.channel_id)
+                    if topic.watermark is None:
+                        subscription.close()
+                        return None
+                    topic.state = await self.load(key)
+                subscription.start()
+        except BaseException:
+            subscription.close()
+            raise
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._poll())
+
+        return subscription
+
+    async def refresh(self) -> None:
+        """Loads and publishes the topics whose channel has changed, or whose channel's day has changed"""
+        # Topics are dropped once every client has closed its subscription
+        self._topics = {key: topic for key, topic in self._topics.items() if topic.subscribers}
+        watermarks = await get_watermarks({key.channel_id for key in self._topics})
+        now = datetime.now(timezone.utc)
+        for topic in list(self._topics.values()):
+            watermark = watermarks.get(topic.key.channel_id)
+            if topic.state is None or (
+                watermark == topic.watermark and topic.state.game_number == _get_game_number(watermark, now)
+            ):
+                continue
+
+            async with topic.lock:
+                topic.watermark = watermark
+                state = await self.load(topic.key)
+                self._publish(topic, state)
+
+    async def _poll(self) -> None:
+        while any(topic.subscribers for topic in self._topics.values()):
+            await asyncio.sleep(self.poll_seconds)
+            try:
+                await self.refresh()
+            except Exception as ex:
+                logger.error("Error refreshing live leaderboards: %s", ex, exc_info=ex)
+
+    def _publish(self, topic: _Topic, state: LiveState) -> None:
+        assert topic.state is not None
+        previous = _ranked_state(topic.state)
+        current = _ranked_state(state)
+        topic.state = state
+        topic.snapshot = None
+
+        events = []
+        players, removed = _diff(previous["players"], current["players"])
+        if players or removed:
+            events.append(_encode("leaderboard", {"players": players, "removed": removed}))
+
+        # A new day starts a new game, whose results replace the last one's rather than changing them
+        reset = previous["game_number"] != current["game_number"]
+        results, removed = _diff([] if reset else previous["results"], current["results"])
+        if results or removed or reset:
+            events.append(
+                _encode(
+                    "results",
+                    {"game_number": state.game_number, "reset": reset, "players": results, "removed": removed},
+                )
+            )
+
+        if not events:
+            return
+
+        # Each event is encoded once and the same bytes are queued for every subscriber
+        for subscription in list(topic.subscribers):
+            subscription.send(events)
+        live_events.add(len(events))
+
+
+def _get_game_number(watermark: Watermark | None, now: datetime) -> int:
+    """Today's game where the channel is"""
+    tz = get_timezone(watermark.timezone if watermark is not None else None)
+    return game_number_for_day(now.astimezone(tz).date()) or 0
+
+
+def _ranked_state(state: LiveState) -> dict[str, Any]:
+    return {
+        "game_number": state.game_number,
+        "players": [{**player, "rank": index + 1} for index, player in enumerate(state.players)],
+        "results": [{**result, "rank": index + 1} for index, result in enumerate(state.results)],
+    }
+
+
+def _diff(old: list[dict[str, Any]], new: list[dict[str, Any]]) -> tuple[list[dict[str, Any]], list[str]]:
+    """The rows which are new or changed, and the user ids of the rows which are gone"""
+    previous = {row["user_id"]: row for row in old}
+    current = {row["user_id"] for row in new}
+    changed = [row for row in new if previous.get(row["user_id"]) != row]
+    return changed, [user_id for user_id in previous if user_id not in current]
+
+
+def _encode(event: str, data: dict[str, Any]) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode()
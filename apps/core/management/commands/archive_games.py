@@ -0,0 +1,25 @@
+from datetime import datetime, timezone
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from apps.core.models import WordleChannel
+from services.bot.archive import archive_games, get_archive_cutoff
+from services.bot.timezones import get_timezone
+
+
+class Command(BaseCommand):
+    help = "Move games older than ARCHIVE_AFTER_DAYS into the archive"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--channel-id", type=int, help="Only archive this channel, defaults to every channel")
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        channels = WordleChannel.objects.all()
+        if options["channel_id"] is not None:
+            channels = channels.filter(channel_id=options["channel_id"])
+
+        now = datetime.now(timezone.utc)
+        for channel_id, timezone_name in channels.values_list("channel_id", "timezone"):
+            archived = archive_games(channel_id, get_archive_cutoff(now, get_timezone(timezone_name)))
+            self.stdout.write(f"Channel {channel_id}: {archived} games archived")
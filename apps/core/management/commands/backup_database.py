@@ -0,0 +1,15 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand
+
+from services.bot.backup import create_backup
+
+
+class Command(BaseCommand):
+    help = "Take a compressed snapshot of the database while the bot keeps running"
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        result = create_backup()
+        self.stdout.write(
+            f"Backed up {result.pages} pages to {result.path} ({result.size} bytes) in {result.duration:.2f}s"
+        )
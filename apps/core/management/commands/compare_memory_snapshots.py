@@ -0,0 +1,20 @@
+from pathlib import Path
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from services.bot.config import DIAGNOSTICS_TOP
+from services.bot.diagnostics import compare_snapshots
+
+
+class Command(BaseCommand):
+    help = "Show which allocation sites grew or shrank the most between two saved memory snapshots"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("old", type=Path, help="The earlier .tracemalloc snapshot")
+        parser.add_argument("new", type=Path, help="The later .tracemalloc snapshot")
+        parser.add_argument("--limit", type=int, default=DIAGNOSTICS_TOP, help="Number of allocation sites to show")
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        for line in compare_snapshots(options["old"], options["new"], options["limit"]):
+            self.stdout.write(line)
@@ -0,0 +1,44 @@
+from pathlib import Path
+import sys
+from typing import Any, BinaryIO
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from services.bot.exporter import EXPORT_CHUNK_SIZE, ExportFormat, export_games
+
+
+class Command(BaseCommand):
+    help = "Export wordle games as CSV or newline delimited JSON, streaming them in chunks"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        scope = parser.add_mutually_exclusive_group()
+        scope.add_argument("--channel-id", type=int, help="Only export games from this channel")
+        scope.add_argument("--guild-id", type=int, help="Only export games from channels in this guild")
+        parser.add_argument(
+            "--format", choices=[format.value for format in ExportFormat], default=ExportFormat.CSV.value
+        )
+        parser.add_argument("--gzip", action="store_true", help="Compress the output with gzip")
+        parser.add_argument("--since", type=int, help="Only export games posted after this message id")
+        parser.add_argument("--output", type=Path, help="File to write to, defaults to stdout")
+        parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        def export(output: BinaryIO) -> int:
+            return export_games(
+                output,
+                ExportFormat(options["format"]),
+                channel_id=options["channel_id"],
+                guild_id=options["guild_id"],
+                since_message_id=options["since"],
+                compress=options["gzip"],
+                chunk_size=options["chunk_size"],
+            )
+
+        if options["output"] is None:
+            count = export(sys.stdout.buffer)
+            sys.stdout.buffer.flush()
+        else:
+            with options["output"].open("wb") as output:
+                count = export(output)
+
+        self.stderr.write(f"Exported {count} games")
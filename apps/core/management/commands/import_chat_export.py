@@ -0,0 +1,40 @@
+from pathlib import Path
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from services.bot.importer import INSERT_BATCH_SIZE, PARSE_BATCH_SIZE, ImporterError, import_chat_export
+
+
+class Command(BaseCommand):
+    help = (
+        "Import wordle games from a DiscordChatExporter JSON export of a channel. "
+        "The channel is added to the Wordle Tracker if it is not already tracked, "
+        "and the live scanner carries on from the end of the export."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("path", type=Path, help="Path to the exported JSON file")
+        parser.add_argument("--channel-id", type=int, help="Override the channel id found in the export")
+        parser.add_argument("--workers", type=int, help="Number of parser processes, defaults to the CPU count")
+        parser.add_argument("--parse-batch-size", type=int, default=PARSE_BATCH_SIZE)
+        parser.add_argument("--insert-batch-size", type=int, default=INSERT_BATCH_SIZE)
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        try:
+            result = import_chat_export(
+                options["path"],
+                channel_id=options["channel_id"],
+                workers=options["workers"],
+                parse_batch_size=options["parse_batch_size"],
+                insert_batch_size=options["insert_batch_size"],
+            )
+        except ImporterError as ex:
+            raise CommandError(str(ex)) from ex
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {result.inserted} new games ({result.games} games in {result.messages} messages) "
+                f"into channel {result.channel_id}"
+            )
+        )
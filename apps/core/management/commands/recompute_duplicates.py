@@ -0,0 +1,22 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from apps.core.models import WordleChannel
+from services.bot.duplicates import recompute_duplicates
+
+
+class Command(BaseCommand):
+    help = "Recompute which games are duplicates for whole channels"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--channel-id", type=int, help="Only recompute this channel, defaults to every channel")
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        channels = WordleChannel.objects.all()
+        if options["channel_id"] is not None:
+            channels = channels.filter(channel_id=options["channel_id"])
+
+        for channel_id in channels.values_list("channel_id", flat=True):
+            changed = recompute_duplicates(channel_id)
+            self.stdout.write(f"Channel {channel_id}: {changed} games changed")
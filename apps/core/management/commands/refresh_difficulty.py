@@ -0,0 +1,14 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand
+
+from apps.core.models import GameDifficulty
+from services.bot.difficulty import refresh_difficulty
+
+
+class Command(BaseCommand):
+    help = "Rebuild the difficulty of every game from all tracked channels"
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        refresh_difficulty()
+        self.stdout.write(f"Refreshed the difficulty of {GameDifficulty.objects.count()} games")
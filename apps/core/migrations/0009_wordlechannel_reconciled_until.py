@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 06:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0008_wordlechannel_daily_reminder_enabled"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="wordlechannel",
+            name="reconciled_until",
+            field=models.BigIntegerField(null=True),
+        ),
+    ]
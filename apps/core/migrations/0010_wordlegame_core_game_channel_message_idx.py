@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-19 06:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0009_wordlechannel_reconciled_until"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="wordlegame",
+            index=models.Index(fields=["channel", "message_id"], name="core_game_channel_message_idx"),
+        ),
+    ]
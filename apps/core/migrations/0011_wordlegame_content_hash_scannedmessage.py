@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-19 06:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0010_wordlegame_core_game_channel_message_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="wordlegame",
+            name="content_hash",
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.CreateModel(
+            name="ScannedMessage",
+            fields=[
+                ("message_id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("content_hash", models.BigIntegerField()),
+                ("channel", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to="core.wordlechannel")),
+            ],
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-19 06:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0011_wordlegame_content_hash_scannedmessage"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="wordlegame",
+            index=models.Index(fields=["channel", "user_id", "game_number"], name="core_game_channel_user_idx"),
+        ),
+    ]
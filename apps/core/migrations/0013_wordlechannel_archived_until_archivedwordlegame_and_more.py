@@ -0,0 +1,55 @@
+# Generated by Django 5.2.6 on 2026-10-19 07:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0012_wordlegame_core_game_channel_user_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="wordlechannel",
+            name="archived_until",
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.CreateModel(
+            name="ArchivedWordleGame",
+            fields=[
+                ("message_id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("user_id", models.BigIntegerField()),
+                ("posted_at", models.DateTimeField()),
+                ("game_number", models.IntegerField()),
+                ("is_win", models.BooleanField()),
+                ("is_hard_mode", models.BooleanField()),
+                ("guesses", models.IntegerField()),
+                ("is_duplicate", models.BooleanField()),
+                ("is_correct_day", models.BooleanField()),
+                ("channel", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to="core.wordlechannel")),
+            ],
+            options={
+                "indexes": [models.Index(fields=["channel", "game_number"], name="core_archive_channel_game_idx")],
+            },
+        ),
+        migrations.CreateModel(
+            name="ArchivedYearSummary",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("user_id", models.BigIntegerField()),
+                ("year", models.IntegerField()),
+                ("games", models.IntegerField()),
+                ("wins", models.IntegerField()),
+                ("total_guesses", models.IntegerField()),
+                ("best", models.IntegerField()),
+                ("channel", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to="core.wordlechannel")),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(fields=("channel", "year", "user_id"), name="core_archive_summary_unique")
+                ],
+            },
+        ),
+    ]
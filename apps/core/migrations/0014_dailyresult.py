@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-19 07:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0013_wordlechannel_archived_until_archivedwordlegame_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyResult",
+            fields=[
+                (
+                    "pk",
+                    models.CompositePrimaryKey(
+                        "channel_id", "game_number", blank=True, editable=False, primary_key=True, serialize=False
+                    ),
+                ),
+                ("game_number", models.IntegerField()),
+                ("players", models.JSONField()),
+                ("channel", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to="core.wordlechannel")),
+            ],
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.6 on 2026-10-19 07:28
+
+from django.apps.registry import Apps
+from django.db import migrations, models
+from django.db.backends.base.schema import BaseDatabaseSchemaEditor
+
+GREEN = 2
+WORD_LENGTH = 5
+
+
+def count_greens(apps: Apps, schema_editor: BaseDatabaseSchemaEditor) -> None:
+    """Each guess in a result is stored as a base 3 number with a digit per letter, 2 being green"""
+    WordleGame = apps.get_model("core", "WordleGame")
+    games = []
+    for game in WordleGame.objects.only("message_id", "result").iterator(chunk_size=2000):
+        game.greens = 0
+        for guess in game.result:
+            for _ in range(WORD_LENGTH):
+                game.greens += guess % 3 == GREEN
+                guess //= 3
+        games.append(game)
+
+        if len(games) >= 2000:
+            WordleGame.objects.bulk_update(games, ["greens"])
+            games = []
+
+    WordleGame.objects.bulk_update(games, ["greens"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0014_dailyresult"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="archivedwordlegame",
+            name="greens",
+            field=models.IntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="wordlegame",
+            name="greens",
+            field=models.IntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.CreateModel(
+            name="GameDifficulty",
+            fields=[
+                ("game_number", models.IntegerField(primary_key=True, serialize=False)),
+                ("players", models.IntegerField()),
+                ("total_guesses", models.IntegerField()),
+                ("losses", models.IntegerField()),
+                ("greens", models.IntegerField()),
+                ("distribution", models.JSONField()),
+                ("average_score", models.FloatField()),
+            ],
+            options={
+                "indexes": [models.Index(fields=["average_score"], name="core_difficulty_score_idx")],
+            },
+        ),
+        migrations.RunPython(count_greens, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-19 07:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0015_archivedwordlegame_greens_wordlegame_greens_and_more"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="archivedwordlegame",
+            index=models.Index(
+                condition=models.Q(("is_correct_day", True), ("is_duplicate", False)),
+                fields=["channel", "user_id", "game_number", "guesses", "is_win", "is_duplicate", "is_correct_day"],
+                name="core_archive_versus_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="wordlegame",
+            index=models.Index(
+                condition=models.Q(("is_correct_day", True), ("is_duplicate", False)),
+                fields=["channel", "user_id", "game_number", "guesses", "is_win", "is_duplicate", "is_correct_day"],
+                name="core_game_versus_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.6 on 2026-10-19 07:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0016_archivedwordlegame_core_archive_versus_idx_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="wordlechannel",
+            name="rated_until",
+            field=models.IntegerField(null=True),
+        ),
+        migrations.CreateModel(
+            name="RatingChange",
+            fields=[
+                (
+                    "pk",
+                    models.CompositePrimaryKey(
+                        "channel_id",
+                        "game_number",
+                        "user_id",
+                        blank=True,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("game_number", models.IntegerField()),
+                ("user_id", models.BigIntegerField()),
+                ("previous_rating", models.FloatField()),
+                ("channel", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to="core.wordlechannel")),
+            ],
+        ),
+        migrations.CreateModel(
+            name="PlayerRating",
+            fields=[
+                (
+                    "pk",
+                    models.CompositePrimaryKey(
+                        "channel_id", "user_id", blank=True, editable=False, primary_key=True, serialize=False
+                    ),
+                ),
+                ("user_id", models.BigIntegerField()),
+                ("rating", models.FloatField()),
+                ("games", models.IntegerField()),
+                ("channel", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to="core.wordlechannel")),
+            ],
+            options={
+                "indexes": [models.Index(fields=["channel", "-rating"], name="core_rating_channel_idx")],
+            },
+        ),
+    ]
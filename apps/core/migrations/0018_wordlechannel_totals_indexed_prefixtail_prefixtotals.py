@@ -0,0 +1,63 @@
+# Generated by Django 5.2.6 on 2026-10-19 07:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0017_wordlechannel_rated_until_ratingchange_playerrating"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="wordlechannel",
+            name="totals_indexed",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name="PrefixTail",
+            fields=[
+                (
+                    "pk",
+                    models.CompositePrimaryKey(
+                        "channel_id", "user_id", blank=True, editable=False, primary_key=True, serialize=False
+                    ),
+                ),
+                ("user_id", models.BigIntegerField()),
+                ("game_number", models.IntegerField()),
+                ("stale_from", models.IntegerField(null=True)),
+                ("channel", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to="core.wordlechannel")),
+            ],
+        ),
+        migrations.CreateModel(
+            name="PrefixTotals",
+            fields=[
+                (
+                    "pk",
+                    models.CompositePrimaryKey(
+                        "channel_id",
+                        "user_id",
+                        "game_number",
+                        blank=True,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("user_id", models.BigIntegerField()),
+                ("game_number", models.IntegerField()),
+                ("games", models.IntegerField()),
+                ("wins", models.IntegerField()),
+                ("total_guesses", models.IntegerField()),
+                ("best", models.JSONField()),
+                ("channel", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to="core.wordlechannel")),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(fields=("channel", "user_id", "games"), name="core_prefix_position_unique")
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-19 08:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0018_wordlechannel_totals_indexed_prefixtail_prefixtotals"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="wordlechannel",
+            name="changed_at",
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name="wordlechannel",
+            name="last_ingested_message",
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.AddIndex(
+            model_name="archivedwordlegame",
+            index=models.Index(fields=["channel", "user_id", "message_id"], name="core_archive_user_message_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="wordlegame",
+            index=models.Index(fields=["channel", "user_id", "message_id"], name="core_game_user_message_idx"),
+        ),
+    ]
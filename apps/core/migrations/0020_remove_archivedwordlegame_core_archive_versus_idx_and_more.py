@@ -0,0 +1,65 @@
+# Generated by Django 5.2.6 on 2026-10-19 08:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0019_wordlechannel_changed_at_and_more"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="archivedwordlegame",
+            name="core_archive_versus_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="wordlegame",
+            name="core_game_versus_idx",
+        ),
+        migrations.AddField(
+            model_name="archivedwordlegame",
+            name="puzzle_type",
+            field=models.CharField(default="wordle", max_length=32),
+        ),
+        migrations.AddField(
+            model_name="wordlegame",
+            name="puzzle_type",
+            field=models.CharField(default="wordle", max_length=32),
+        ),
+        migrations.AddIndex(
+            model_name="archivedwordlegame",
+            index=models.Index(
+                condition=models.Q(("is_correct_day", True), ("is_duplicate", False), ("puzzle_type", "wordle")),
+                fields=[
+                    "channel",
+                    "user_id",
+                    "game_number",
+                    "guesses",
+                    "is_win",
+                    "is_duplicate",
+                    "is_correct_day",
+                    "puzzle_type",
+                ],
+                name="core_archive_versus_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="wordlegame",
+            index=models.Index(
+                condition=models.Q(("is_correct_day", True), ("is_duplicate", False), ("puzzle_type", "wordle")),
+                fields=[
+                    "channel",
+                    "user_id",
+                    "game_number",
+                    "guesses",
+                    "is_win",
+                    "is_duplicate",
+                    "is_correct_day",
+                    "puzzle_type",
+                ],
+                name="core_game_versus_idx",
+            ),
+        ),
+    ]
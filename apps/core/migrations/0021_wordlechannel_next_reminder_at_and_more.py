@@ -0,0 +1,54 @@
+# Generated by Django 5.2.6 on 2026-10-19 08:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0020_remove_archivedwordlegame_core_archive_versus_idx_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="wordlechannel",
+            name="next_reminder_at",
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name="wordlechannel",
+            name="next_summary_at",
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name="wordlechannel",
+            name="reminder_time",
+            field=models.TimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name="wordlechannel",
+            name="summary_time",
+            field=models.TimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name="wordlechannel",
+            name="timezone",
+            field=models.CharField(max_length=64, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="wordlechannel",
+            index=models.Index(
+                condition=models.Q(("daily_summary_enabled", True)),
+                fields=["next_summary_at"],
+                name="core_channel_summary_due_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="wordlechannel",
+            index=models.Index(
+                condition=models.Q(("daily_reminder_enabled", True)),
+                fields=["next_reminder_at"],
+                name="core_channel_reminder_due_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:02
+
+from django.apps.registry import Apps
+from django.db import migrations, models
+from django.db.backends.base.schema import BaseDatabaseSchemaEditor
+from django.db.models import Sum
+
+
+def count_live_greens(apps: Apps, schema_editor: BaseDatabaseSchemaEditor) -> None:
+    """Games archived before greens were counted have none, so greens only come from the live games"""
+    WordleGame = apps.get_model("core", "WordleGame")
+    GameDifficulty = apps.get_model("core", "GameDifficulty")
+    totals = {
+        row["game_number"]: (row["greens"], row["guesses"])
+        for row in WordleGame.objects.filter(is_duplicate=False, is_correct_day=True, puzzle_type="wordle")
+        .values("game_number")
+        .annotate(greens=Sum("greens"), guesses=Sum("guesses"))
+        .order_by()
+    }
+
+    difficulties = []
+    for difficulty in GameDifficulty.objects.iterator(chunk_size=2000):
+        difficulty.greens, difficulty.green_guesses = totals.get(difficulty.game_number, (0, 0))
+        difficulties.append(difficulty)
+
+    GameDifficulty.objects.bulk_update(difficulties, ["greens", "green_guesses"], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0021_wordlechannel_next_reminder_at_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="gamedifficulty",
+            name="green_guesses",
+            field=models.IntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name="archivedwordlegame",
+            index=models.Index(
+                condition=models.Q(("is_correct_day", True), ("is_duplicate", False), ("puzzle_type", "wordle")),
+                fields=["game_number"],
+                name="core_archive_difficulty_idx",
+            ),
+        ),
+        migrations.RunPython(count_live_greens, migrations.RunPython.noop),
+    ]
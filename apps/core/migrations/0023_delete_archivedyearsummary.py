@@ -0,0 +1,16 @@
+# Generated by Django 5.2.6 on 2026-10-19 09:12
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0022_gamedifficulty_green_guesses_and_more"),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name="ArchivedYearSummary",
+        ),
+    ]
@@ -5,8 +5,39 @@ class WordleChannel(models.Model):
     channel_id = models.BigIntegerField(primary_key=True)
     guild_id = models.BigIntegerField()
     last_seen_message = models.BigIntegerField(null=True)
+    reconciled_until = models.BigIntegerField(null=True)
+    archived_until = models.BigIntegerField(null=True)
+    # Game number of the last day included in the player ratings
+    rated_until = models.IntegerField(null=True)
+    # Whether the running totals of the channel's players have been built, they are rebuilt lazily when not
+    totals_indexed = models.BooleanField(default=False)
+    # Newest message a game was stored from and when any of the channel's games last changed, for caching
+    last_ingested_message = models.BigIntegerField(null=True)
+    changed_at = models.DateTimeField(null=True)
     daily_summary_enabled = models.BooleanField()
     daily_reminder_enabled = models.BooleanField()
+    # IANA name of the timezone the channel's days and posts are in, the default TIMEZONE when not set
+    timezone = models.CharField(max_length=64, null=True)
+    # Local times to post the daily summary and reminder at, DAILY_SUMMARY_TIME and DAILY_REMINDER_TIME when not set
+    summary_time = models.TimeField(null=True)
+    reminder_time = models.TimeField(null=True)
+    # When the next daily summary and reminder are due, which the scheduler looks up every bucket
+    next_summary_at = models.DateTimeField(null=True)
+    next_reminder_at = models.DateTimeField(null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["next_summary_at"],
+                condition=models.Q(daily_summary_enabled=True),
+                name="core_channel_summary_due_idx",
+            ),
+            models.Index(
+                fields=["next_reminder_at"],
+                condition=models.Q(daily_reminder_enabled=True),
+                name="core_channel_reminder_due_idx",
+            ),
+        ]
 
 
 class WordleGame(models.Model):
@@ -21,4 +52,175 @@ class WordleGame(models.Model):
     guesses = models.IntegerField()
     is_duplicate = models.BooleanField()
     is_correct_day = models.BooleanField()
+    # Which daily puzzle the game is of, only wordle games count towards the stats
+    puzzle_type = models.CharField(max_length=32, default="wordle")
     result = models.JSONField(default=list)
+    greens = models.IntegerField()
+    content_hash = models.BigIntegerField(null=True)
+
+    class Meta:
+        indexes = [
+            # Message ids are snowflakes, so this turns a time window within a channel into a range scan
+            models.Index(fields=["channel", "message_id"], name="core_game_channel_message_idx"),
+            # Duplicates are worked out per (user, game number) within a channel
+            models.Index(fields=["channel", "user_id", "game_number"], name="core_game_channel_user_idx"),
+            # Covers head to head comparisons, which join two users' counted games on game number. SQLite only
+            # reads the flags in the condition from the index if they are also columns of it
+            models.Index(
+                fields=[
+                    "channel",
+                    "user_id",
+                    "game_number",
+                    "guesses",
+                    "is_win",
+                    "is_duplicate",
+                    "is_correct_day",
+                    "puzzle_type",
+                ],
+                condition=models.Q(is_duplicate=False, is_correct_day=True, puzzle_type="wordle"),
+                name="core_game_versus_idx",
+            ),
+            # Pages through a user's history in message order
+            models.Index(fields=["channel", "user_id", "message_id"], name="core_game_user_message_idx"),
+        ]
+
+
+class ScannedMessage(models.Model):
+    """Fingerprints of recent messages which are not games, so unchanged ones can be skipped when seen again"""
+
+    message_id = models.BigIntegerField(primary_key=True)
+    channel = models.ForeignKey(WordleChannel, on_delete=models.CASCADE)
+    content_hash = models.BigIntegerField()
+
+
+class ArchivedWordleGame(models.Model):
+    """Games older than the archive horizon, without the columns which are only needed while a game can change"""
+
+    message_id = models.BigIntegerField(primary_key=True)
+    channel = models.ForeignKey(WordleChannel, on_delete=models.CASCADE)
+    user_id = models.BigIntegerField()
+    posted_at = models.DateTimeField()
+    game_number = models.IntegerField()
+    is_win = models.BooleanField()
+    is_hard_mode = models.BooleanField()
+    guesses = models.IntegerField()
+    is_duplicate = models.BooleanField()
+    is_correct_day = models.BooleanField()
+    puzzle_type = models.CharField(max_length=32, default="wordle")
+    # Games archived before greens were counted have none, so difficulty leaves archived greens out
+    greens = models.IntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["channel", "game_number"], name="core_archive_channel_game_idx"),
+            # Difficulty is refreshed for a few game numbers at a time across every channel
+            models.Index(
+                fields=["game_number"],
+                condition=models.Q(is_duplicate=False, is_correct_day=True, puzzle_type="wordle"),
+                name="core_archive_difficulty_idx",
+            ),
+            models.Index(
+                fields=[
+                    "channel",
+                    "user_id",
+                    "game_number",
+                    "guesses",
+                    "is_win",
+                    "is_duplicate",
+                    "is_correct_day",
+                    "puzzle_type",
+                ],
+                condition=models.Q(is_duplicate=False, is_correct_day=True, puzzle_type="wordle"),
+                name="core_archive_versus_idx",
+            ),
+            models.Index(fields=["channel", "user_id", "message_id"], name="core_archive_user_message_idx"),
+        ]
+
+
+class DailyResult(models.Model):
+    """Results of a finished game for a channel, kept until a game with that number changes"""
+
+    pk = models.CompositePrimaryKey("channel_id", "game_number")
+    channel = models.ForeignKey(WordleChannel, on_delete=models.CASCADE)
+    game_number = models.IntegerField()
+    # [user_id, guesses, is_win] for each player, in finishing order
+    players = models.JSONField()
+
+
+class GameDifficulty(models.Model):
+    """How players in every tracked channel did on each game, refreshed whenever one of its games changes"""
+
+    game_number = models.IntegerField(primary_key=True)
+    players = models.IntegerField()
+    total_guesses = models.IntegerField()
+    losses = models.IntegerField()
+    # Greens and guesses of the games which are not archived, as archived games may not have greens counted
+    greens = models.IntegerField()
+    green_guesses = models.IntegerField()
+    # How many players won in 1 to 6 guesses, followed by how many lost
+    distribution = models.JSONField()
+    # Average guesses with a loss counting as one more than the maximum
+    average_score = models.FloatField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["average_score"], name="core_difficulty_score_idx"),
+        ]
+
+
+class PlayerRating(models.Model):
+    """Skill rating of each player in a channel, from every game day up to the channel's rated_until"""
+
+    pk = models.CompositePrimaryKey("channel_id", "user_id")
+    channel = models.ForeignKey(WordleChannel, on_delete=models.CASCADE)
+    user_id = models.BigIntegerField()
+    rating = models.FloatField()
+    games = models.IntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["channel", "-rating"], name="core_rating_channel_idx"),
+        ]
+
+
+class RatingChange(models.Model):
+    """A player's rating before each game day they played, so ratings can be wound back to any day"""
+
+    pk = models.CompositePrimaryKey("channel_id", "game_number", "user_id")
+    channel = models.ForeignKey(WordleChannel, on_delete=models.CASCADE)
+    game_number = models.IntegerField()
+    user_id = models.BigIntegerField()
+    previous_rating = models.FloatField()
+
+
+class PrefixTotals(models.Model):
+    """
+    Running totals of each player's counted games in a channel in game number order, including archived games,
+    so the totals for any range of game numbers are the difference between two rows
+    """
+
+    pk = models.CompositePrimaryKey("channel_id", "user_id", "game_number")
+    channel = models.ForeignKey(WordleChannel, on_delete=models.CASCADE)
+    user_id = models.BigIntegerField()
+    game_number = models.IntegerField()
+    # Totals of the player's games up to and including this one, so games is also its position
+    games = models.IntegerField()
+    wins = models.IntegerField()
+    total_guesses = models.IntegerField()
+    # Sparse table of the fewest guesses, best[k] covers the 2^k games up to and including this one
+    best = models.JSONField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["channel", "user_id", "games"], name="core_prefix_position_unique"),
+        ]
+
+
+class PrefixTail(models.Model):
+    """The last game in each player's running totals, and where they need rebuilding from after a change"""
+
+    pk = models.CompositePrimaryKey("channel_id", "user_id")
+    channel = models.ForeignKey(WordleChannel, on_delete=models.CASCADE)
+    user_id = models.BigIntegerField()
+    game_number = models.IntegerField()
+    stale_from = models.IntegerField(null=True)
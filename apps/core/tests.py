@@ -1,3 +1,87 @@
-# from django.test import TestCase
+from datetime import date, datetime, time, timedelta, timezone, tzinfo
+from zoneinfo import ZoneInfo
 
-# Create your tests here.
+from django.test import TestCase
+
+from apps.core.models import ArchivedWordleGame, WordleChannel, WordleGame
+from services.bot.archive import archive_games, get_archive_cutoff
+from services.bot.config import ARCHIVE_AFTER_DAYS, TIMEZONE
+from services.bot.daily_results import PlayerResult, get_daily_results
+from services.bot.duplicates import recompute_duplicates
+from services.bot.parser import WORDLE
+from services.bot.schedule import set_channel_schedule
+from services.bot.snowflake import snowflake_for_time
+from services.bot.summarizer import Ranking, get_leaderboard
+from services.bot.utils import game_number_for_day
+
+CHANNEL_ID = 1
+LOS_ANGELES = "America/Los_Angeles"
+DAY = date(2024, 3, 1)
+
+
+class TestArchiveTimezones(TestCase):
+    """Channels in another timezone than the default have their days archived whole"""
+
+    def setUp(self) -> None:
+        self.game_number = game_number_for_day(DAY) or 0
+        self.channel = WordleChannel.objects.create(
+            channel_id=CHANNEL_ID, guild_id=CHANNEL_ID, daily_summary_enabled=False, daily_reminder_enabled=False
+        )
+
+    def add_game(self, user_id: int, game_number: int, posted_at: datetime, guesses: int, tz: tzinfo) -> None:
+        WordleGame.objects.create(
+            message_id=snowflake_for_time(posted_at),
+            channel=self.channel,
+            user_id=user_id,
+            posted_at=posted_at,
+            scanned_at=posted_at,
+            game_number=game_number,
+            is_win=True,
+            is_hard_mode=False,
+            guesses=guesses,
+            is_duplicate=False,
+            is_correct_day=game_number_for_day(posted_at.astimezone(tz).date()) == game_number,
+            puzzle_type=WORDLE,
+            greens=guesses,
+        )
+
+    def add_games(self, tz: tzinfo) -> None:
+        """A day where the second player posts, and posts again, after midnight in London but not Los Angeles"""
+        los_angeles = ZoneInfo(LOS_ANGELES)
+        self.add_game(1, self.game_number, datetime.combine(DAY, time(10), tzinfo=los_angeles), 3, tz)
+        self.add_game(2, self.game_number, datetime.combine(DAY, time(20), tzinfo=los_angeles), 4, tz)
+        self.add_game(2, self.game_number, datetime.combine(DAY, time(21), tzinfo=los_angeles), 2, tz)
+        self.add_game(1, self.game_number + 1, datetime.combine(DAY + timedelta(days=1), time(9), tzinfo=tz), 5, tz)
+        recompute_duplicates(CHANNEL_ID)
+
+    def archive(self, tz: tzinfo) -> int:
+        now = datetime.combine(DAY + timedelta(days=ARCHIVE_AFTER_DAYS + 1), time(12), tzinfo=tz)
+        return archive_games(CHANNEL_ID, get_archive_cutoff(now.astimezone(timezone.utc), tz))
+
+    def assert_results(self) -> None:
+        self.assertEqual(recompute_duplicates(CHANNEL_ID), 0)
+        self.assertEqual(
+            get_daily_results(CHANNEL_ID, self.game_number),
+            [PlayerResult(user_id=1, guesses=3, is_win=True), PlayerResult(user_id=2, guesses=4, is_win=True)],
+        )
+        leaderboard = get_leaderboard(CHANNEL_ID, Ranking.WINS, 10, None, self.game_number + 2)
+        self.assertEqual({row["user_id"]: row["games"] for row in leaderboard}, {1: 2, 2: 1})
+
+    def test_archive_channel_timezone(self) -> None:
+        WordleChannel.objects.filter(channel_id=CHANNEL_ID).update(timezone=LOS_ANGELES)
+        self.add_games(ZoneInfo(LOS_ANGELES))
+
+        self.assertEqual(self.archive(ZoneInfo(LOS_ANGELES)), 3)
+        self.assertFalse(WordleGame.objects.filter(game_number=self.game_number).exists())
+        self.assert_results()
+
+    def test_change_timezone_after_archiving(self) -> None:
+        self.add_games(TIMEZONE)
+        # Both of the second player's games are after midnight in London, so are live and on the wrong day
+        self.assertEqual(self.archive(TIMEZONE), 1)
+        get_leaderboard(CHANNEL_ID, Ranking.WINS, 10, None, self.game_number + 2)
+
+        self.assertEqual(set_channel_schedule(CHANNEL_ID, LOS_ANGELES, None, None), 2)
+        self.assertEqual(ArchivedWordleGame.objects.filter(game_number=self.game_number).count(), 3)
+        self.assertFalse(WordleGame.objects.filter(game_number=self.game_number).exists())
+        self.assert_results()
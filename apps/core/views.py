@@ -1,3 +1,268 @@
-# from django.shortcuts import render
+from collections import OrderedDict
+from dataclasses import asdict
+from datetime import datetime, time as day_start, timedelta, tzinfo
+from functools import wraps
+import json
+import time
+from typing import Any, Awaitable, Callable
 
-# Create your views here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.http import require_GET
+
+from apps.core.live import LiveBroker, LiveState, LiveTopic
+from apps.core.models import ArchivedWordleGame, WordleGame
+from services.bot.config import SUMMARY_LIMIT_DEFAULT
+from services.bot.daily_results import get_daily_results
+from services.bot.metrics import Gauge
+from services.bot.summarizer import Ranking, get_game_range, get_leaderboard, get_rating_leaderboard
+from services.bot.timezones import get_timezone
+from services.bot.utils import day_for_game_number, game_number_for_day
+from services.bot.watermarks import Watermark, get_watermark
+
+HISTORY_FIELDS = [
+    "message_id",
+    "puzzle_type",
+    "game_number",
+    "posted_at",
+    "guesses",
+    "is_win",
+    "is_hard_mode",
+    "is_duplicate",
+]
+
+# Watermarks are only read from the database once per channel every API_WATERMARK_TTL seconds, so clients
+# polling for changes are answered from memory in between
+_watermarks: dict[int, tuple[Watermark | None, float]] = {}
+# Response bodies by path, along with the ETag they were built for
+_responses: OrderedDict[str, tuple[str, bytes]] = OrderedDict()
+
+View = Callable[..., Awaitable[Any]]
+
+
+class ApiError(Exception):
+    def __init__(self, message: str, status: int = 400) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+# Typed loosely, as Django's stubs only describe sync views
+def channel_api(view: View) -> Callable[..., Any]:
+    """
+    Serves the JSON the view returns for a channel, tagged with the channel's watermark. Requests whose
+    If-None-Match or If-Modified-Since are still current get a 304, and responses are cached until the
+    watermark moves, neither of which needs the database while the watermark is fresh.
+    """
+
+    @wraps(view)
+    async def wrapper(request: HttpRequest, channel_id: int, **kwargs: Any) -> HttpResponse:
+        watermark = await _get_watermark(channel_id)
+        if watermark is None:
+            return JsonResponse({"error": "Channel is not tracked"}, status=404)
+
+        etag, last_modified = _get_validators(watermark)
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return _add_validators(not_modified, etag, last_modified)
+
+        path = request.get_full_path()
+        cached = _responses.get(path)
+        if cached is not None and cached[0] == etag:
+            _responses.move_to_end(path)
+            body = cached[1]
+        else:
+            try:
+                body = json.dumps(await view(request, channel_id, **kwargs)).encode()
+            except ApiError as ex:
+                return JsonResponse({"error": str(ex)}, status=ex.status)
+
+            _responses[path] = (etag, body)
+            if len(_responses) > settings.API_CACHE_SIZE:
+                _responses.popitem(last=False)
+
+        return _add_validators(HttpResponse(body, content_type="application/json"), etag, last_modified)
+
+    return require_GET(wrapper)
+
+
+@channel_api
+async def leaderboard(request: HttpRequest, channel_id: int) -> dict[str, Any]:
+    ranking = _get_ranking(request)
+    limit = _get_int(request, "limit", SUMMARY_LIMIT_DEFAULT, 1, settings.API_MAX_LIMIT)
+    days = _get_optional_int(request, "days", 1) if ranking != Ranking.RATING else None
+    include_today = request.GET.get("include_today", "false").lower() == "true"
+    players = await _get_players(channel_id, ranking, limit, days, include_today)
+    return {"ranking": ranking.value, "days": days, "players": players}
+
+
+@channel_api
+async def game_results(request: HttpRequest, channel_id: int, game_number: int) -> dict[str, Any]:
+    return {
+        "game_number": game_number,
+        "day": day_for_game_number(game_number).isoformat(),
+        "players": await _get_results(channel_id, game_number),
+    }
+
+
+@channel_api
+async def user_history(request: HttpRequest, channel_id: int, user_id: int) -> dict[str, Any]:
+    """
+    The user's games in the channel newest first, a page at a time. Pages carry on from the message id of the
+    last game on the previous one, so each is a seek on the index however far back it goes.
+    """
+    before = _get_optional_int(request, "before", 0)
+    limit = _get_int(request, "limit", settings.API_PAGE_SIZE, 1, settings.API_MAX_LIMIT)
+
+    games: list[dict[str, Any]] = []
+    # Games are archived oldest first, so every archived game comes before every live one
+    for model in (WordleGame, ArchivedWordleGame):
+        rows = model.objects.filter(channel_id=channel_id, user_id=user_id)
+        if before is not None:
+            rows = rows.filter(message_id__lt=before)
+
+        async for game in rows.order_by("-message_id").values(*HISTORY_FIELDS)[: limit - len(games)]:
+            games.append({**game, "message_id": str(game["message_id"]), "posted_at": game["posted_at"].isoformat()})
+        if len(games) == limit:
+            break
+
+    next_page = None
+    if len(games) == limit:
+        path = reverse("user_history", kwargs={"channel_id": channel_id, "user_id": user_id})
+        next_page = f"{path}?before={games[-1]['message_id']}&limit={limit}"
+
+    return {"games": games, "next": next_page}
+
+
+@require_GET
+async def live_leaderboard(request: HttpRequest, channel_id: int) -> HttpResponse | StreamingHttpResponse:
+    """
+    Streams the channel's leaderboard including today, and today's results, as server-sent events. The first
+    event is a snapshot of both, then leaderboard and results events carry only the players which changed or
+    were removed, whenever the bot stores games which change them.
+    """
+    try:
+        ranking = _get_ranking(request)
+        limit = _get_int(request, "limit", SUMMARY_LIMIT_DEFAULT, 1, settings.API_MAX_LIMIT)
+        days = _get_optional_int(request, "days", 1) if ranking != Ranking.RATING else None
+    except ApiError as ex:
+        return JsonResponse({"error": str(ex)}, status=ex.status)
+
+    subscription = await live_broker.subscribe(LiveTopic(channel_id, ranking, days, limit))
+    if subscription is None:
+        return JsonResponse({"error": "Channel is not tracked"}, status=404)
+
+    response = StreamingHttpResponse(subscription, content_type="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    # Stops proxies holding events back to send them in larger chunks
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+async def _load_live_state(topic: LiveTopic) -> LiveState:
+    game_number = game_number_for_day(datetime.now(await _get_timezone(topic.channel_id)).date()) or 0
+    return LiveState(
+        game_number=game_number,
+        players=await _get_players(topic.channel_id, topic.ranking, topic.limit, topic.days, include_today=True),
+        results=await _get_results(topic.channel_id, game_number),
+    )
+
+
+live_broker = LiveBroker(_load_live_state)
+live_subscribers = Gauge(
+    "live.subscribers", "Clients streaming live leaderboards", "1", lambda: live_broker.subscribers
+)
+
+
+# The API only ever reads, leaving anything which writes to the bot, so the two processes do not fight over
+# SQLite's write lock
+async def _get_players(
+    channel_id: int, ranking: Ranking, limit: int, days: int | None, include_today: bool
+) -> list[dict[str, Any]]:
+    if ranking == Ranking.RATING:
+        ratings = await sync_to_async(get_rating_leaderboard)(channel_id, limit, read_only=True)
+        return [{"user_id": str(rating.user_id), "rating": rating.rating, "games": rating.games} for rating in ratings]
+
+    end = datetime.now(await _get_timezone(channel_id)).date()
+    if include_today:
+        end += timedelta(days=1)
+
+    min_game_number, max_game_number = get_game_range(end, days)
+    rows = await sync_to_async(get_leaderboard)(
+        channel_id, ranking, limit, min_game_number, max_game_number, read_only=True
+    )
+    return [{**row, "user_id": str(row["user_id"])} for row in rows]
+
+
+async def _get_results(channel_id: int, game_number: int) -> list[dict[str, Any]]:
+    results = await sync_to_async(get_daily_results)(channel_id, game_number, read_only=True)
+    return [{**asdict(result), "user_id": str(result.user_id)} for result in results]
+
+
+async def _get_watermark(channel_id: int) -> Watermark | None:
+    now = time.monotonic()
+    cached = _watermarks.get(channel_id)
+    if cached is not None and cached[1] > now:
+        return cached[0]
+
+    watermark = await get_watermark(channel_id)
+    _watermarks[channel_id] = (watermark, now + settings.API_WATERMARK_TTL)
+    return watermark
+
+
+async def _get_timezone(channel_id: int) -> tzinfo:
+    # Read from the cached watermark, which requests for the channel have already looked up
+    watermark = await _get_watermark(channel_id)
+    return get_timezone(watermark.timezone if watermark is not None else None)
+
+
+def _get_validators(watermark: Watermark) -> tuple[str, int]:
+    # Summaries also depend on the channel's day, which changes without any games changing
+    tz = get_timezone(watermark.timezone)
+    started_at = datetime.combine(datetime.now(tz).date(), day_start.min, tzinfo=tz)
+    changed_at = max(watermark.changed_at or started_at, started_at)
+    etag = f'"{watermark.last_ingested_message or 0}-{int(changed_at.timestamp() * 1000)}"'
+    return etag, int(changed_at.timestamp())
+
+
+def _add_validators(response: HttpResponse, etag: str, last_modified: int) -> HttpResponse:
+    response.headers["ETag"] = etag
+    response.headers["Last-Modified"] = http_date(last_modified)
+    # Clients may keep responses but must check they are still current before using them
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+def _get_optional_int(request: HttpRequest, name: str, minimum: int) -> int | None:
+    value = request.GET.get(name)
+    if value is None or value == "":
+        return None
+
+    try:
+        number = int(value)
+    except ValueError:
+        raise ApiError(f"Expected {name} to be a whole number")
+
+    if number < minimum:
+        raise ApiError(f"Expected {name} to be at least {minimum}")
+
+    return number
+
+
+def _get_int(request: HttpRequest, name: str, default: int, minimum: int, maximum: int) -> int:
+    number = _get_optional_int(request, name, minimum)
+    return min(number, maximum) if number is not None else default
+
+
+def _get_ranking(request: HttpRequest) -> Ranking:
+    value = request.GET.get("ranking")
+    if value is None:
+        return Ranking.WINS
+
+    try:
+        return Ranking(value)
+    except ValueError:
+        raise ApiError(f"Expected ranking to be one of {', '.join(ranking.value for ranking in Ranking)}")
@@ -0,0 +1,95 @@
+"""
+Measures how long a backup takes and how much it slows down writes which happen while it runs, comparing
+the stepped online backup with copying the whole database in a single step.
+
+    python -m benchmarks.backup_latency --days 1000 --channels 20 --interval-ms 5
+"""
+
+import argparse
+from datetime import datetime, timezone
+import random
+import statistics
+import threading
+import time
+
+from benchmarks.environment import setup_benchmark_environment
+
+directory = setup_benchmark_environment()
+
+from django.db import close_old_connections, transaction  # noqa: E402
+
+from apps.core.models import WordleGame  # noqa: E402
+from benchmarks.data import populate  # noqa: E402
+from services.bot.backup import create_backup  # noqa: E402
+from services.bot.config import BACKUP_PAGES_PER_STEP, BACKUP_STEP_SLEEP_MS  # noqa: E402
+
+
+class Writer(threading.Thread):
+    """Keeps writing games like the scanner does, recording how long each write takes"""
+
+    def __init__(self, message_ids: list[int], interval: float) -> None:
+        super().__init__(daemon=True)
+        self.message_ids = message_ids
+        self.interval = interval
+        self.latencies: list[float] = []
+        self.running = True
+
+    def run(self) -> None:
+        while self.running:
+            started = time.perf_counter()
+            with transaction.atomic():
+                WordleGame.objects.filter(message_id=random.choice(self.message_ids)).update(
+                    scanned_at=datetime.now(timezone.utc)
+                )
+            self.latencies.append((time.perf_counter() - started) * 1000)
+            time.sleep(self.interval)
+
+        close_old_connections()
+
+
+def measure(
+    name: str, message_ids: list[int], interval: float, pages_per_step: int | None, step_sleep_ms: int = 0
+) -> None:
+    writer = Writer(message_ids, interval)
+    writer.start()
+    time.sleep(0.5)
+    if pages_per_step is not None:
+        result = create_backup(
+            directory=directory / "backups", keep=1, pages_per_step=pages_per_step, step_sleep_ms=step_sleep_ms
+        )
+        summary = f"{result.duration:.2f}s for {result.pages} pages, {result.restarts} restarts"
+    else:
+        time.sleep(2)
+        summary = "no backup running"
+
+    writer.running = False
+    writer.join()
+
+    latencies = sorted(writer.latencies)
+    p99 = latencies[int(len(latencies) * 0.99)]
+    print(
+        f"{name:<12} {summary:<40} writes: {len(latencies):>5}  median {statistics.median(latencies):.2f} ms  "
+        f"p99 {p99:.2f} ms  max {latencies[-1]:.2f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=1000)
+    parser.add_argument("--channels", type=int, default=20)
+    parser.add_argument("--users", type=int, default=25)
+    parser.add_argument("--interval-ms", type=float, default=5)
+    args = parser.parse_args()
+
+    random.seed(0)
+    print(f"Inserted {populate(args.days, args.channels, args.users)} games")
+    message_ids = list(WordleGame.objects.values_list("message_id", flat=True))
+    interval = args.interval_ms / 1000
+
+    measure("baseline", message_ids, interval, pages_per_step=None)
+    measure("stepped", message_ids, interval, BACKUP_PAGES_PER_STEP, BACKUP_STEP_SLEEP_MS)
+    measure("single step", message_ids, interval, pages_per_step=-1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Measures how much memory the discord client holds with the default options and in low memory mode, by
+feeding it guild and message gateway events directly rather than connecting to discord. Memory is read with
+tracemalloc after the guilds are loaded and as messages stream in, so the default message cache can be seen
+filling up to its limit while low memory mode stays where it was after the guilds were loaded.
+
+    python -m benchmarks.client_memory --guilds 200 --members 200 --messages 5000
+"""
+
+import argparse
+import gc
+import tracemalloc
+from typing import Any
+
+from benchmarks.environment import setup_benchmark_environment
+
+setup_benchmark_environment()
+
+import discord  # noqa: E402
+
+from services.bot.client import get_client_options  # noqa: E402
+from services.bot.memory import get_rss  # noqa: E402
+
+CHANNELS_PER_GUILD = 10
+JOINED_AT = "2021-06-19T00:00:00+00:00"
+
+
+def _user(user_id: int) -> dict[str, Any]:
+    return {"id": str(user_id), "username": f"user{user_id}", "discriminator": "0", "avatar": None}
+
+
+def _member(user_id: int) -> dict[str, Any]:
+    return {"user": _user(user_id), "roles": [], "joined_at": JOINED_AT, "deaf": False, "mute": False, "flags": 0}
+
+
+def _guild(guild_id: int, members: int) -> dict[str, Any]:
+    channels = [
+        {
+            "id": str(guild_id * 100 + index),
+            "type": 0,
+            "name": f"channel-{index}",
+            "position": index,
+            "permission_overwrites": [],
+        }
+        for index in range(CHANNELS_PER_GUILD)
+    ]
+    everyone = {
+        "id": str(guild_id),
+        "name": "@everyone",
+        "permissions": "0",
+        "position": 0,
+        "color": 0,
+        "hoist": False,
+        "managed": False,
+        "mentionable": False,
+    }
+    return {
+        "id": str(guild_id),
+        "name": f"guild-{guild_id}",
+        "owner_id": "2",
+        "features": [],
+        "roles": [everyone],
+        "emojis": [],
+        "stickers": [],
+        "channels": channels,
+        "members": [_member(guild_id * 10_000 + index) for index in range(members)],
+        "member_count": members,
+        "threads": [],
+        "voice_states": [],
+        "presences": [],
+    }
+
+
+def _message(message_id: int, guild_id: int, user_id: int) -> dict[str, Any]:
+    member = _member(user_id)
+    return {
+        "id": str(message_id),
+        "channel_id": str(guild_id * 100),
+        "guild_id": str(guild_id),
+        "author": member.pop("user"),
+        "member": member,
+        "content": "Wordle 1,000 4/6\n\n⬛🟨⬛⬛⬛\n⬛⬛🟩⬛🟨\n🟩⬛🟩⬛🟩\n🟩🟩🟩🟩🟩",
+        "timestamp": JOINED_AT,
+        "edited_timestamp": None,
+        "tts": False,
+        "mention_everyone": False,
+        "mentions": [],
+        "mention_roles": [],
+        "attachments": [],
+        "embeds": [],
+        "pinned": False,
+        "type": 0,
+    }
+
+
+def _traced_mib() -> float:
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0] / 2**20
+
+
+def measure(low_memory: bool, guilds: int, members: int, messages: int, checkpoints: int) -> None:
+    name = "low memory" if low_memory else "default"
+    tracemalloc.start()
+    baseline = _traced_mib()
+    client = discord.Client(**get_client_options(low_memory))
+    state = client._connection
+    for guild_id in range(1, guilds + 1):
+        state.parse_guild_create(_guild(guild_id, members))
+
+    print(f"{name:<11} guilds loaded:       {_traced_mib() - baseline:8.1f} MiB")
+    step = max(messages // checkpoints, 1)
+    for index in range(messages):
+        guild_id = index % guilds + 1
+        # Authors who were not in the guild payload, as with members the client has not been sent
+        user_id = guild_id * 10_000 + members + index % 500
+        state.parse_message_create(_message(10**12 + index, guild_id, user_id))  # type: ignore[arg-type]
+        if (index + 1) % step == 0:
+            print(
+                f"{name:<11} {index + 1:>7} messages:     {_traced_mib() - baseline:8.1f} MiB "
+                f"({len(client.cached_messages)} cached messages, "
+                f"{sum(len(guild.members) for guild in client.guilds)} cached members)"
+            )
+
+    del client, state
+    tracemalloc.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--guilds", type=int, default=200)
+    parser.add_argument("--members", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--checkpoints", type=int, default=5)
+    args = parser.parse_args()
+
+    for low_memory in (False, True):
+        measure(low_memory, args.guilds, args.members, args.messages, args.checkpoints)
+
+    print(f"process rss: {get_rss() / 2**20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Runs the daily post scheduler through a whole day of buckets with channels spread over timezones and post times,
+without posting anything, and measures what each bucket costs for more and more channels. Every channel should
+come due exactly once a day for each post, and a bucket with nothing due should cost the same however many
+channels there are.
+
+    python -m benchmarks.daily_posts --channels 100 1000 10000
+"""
+
+import argparse
+import asyncio
+from datetime import datetime, time, timedelta, timezone
+import random
+import statistics
+import time as timer
+
+from benchmarks.environment import setup_benchmark_environment
+
+setup_benchmark_environment()
+
+from apps.core.models import WordleChannel  # noqa: E402
+from services.bot.config import SCHEDULE_BUCKET_MINUTES  # noqa: E402
+from services.bot.query_log import install_query_log, query_duration  # noqa: E402
+from services.bot.schedule import DailyPost, get_due_channels, schedule_next_posts  # noqa: E402
+
+TIMEZONES = [
+    None,
+    "UTC",
+    "America/New_York",
+    "America/Los_Angeles",
+    "America/Sao_Paulo",
+    "Europe/Berlin",
+    "Asia/Kolkata",
+    "Asia/Tokyo",
+    "Australia/Sydney",
+    "Pacific/Auckland",
+]
+# Away from any clock changes, as a day with one is an hour longer or shorter than the day of buckets
+START = datetime(2025, 6, 15, 12, 0, tzinfo=timezone.utc)
+
+
+def _get_time() -> time | None:
+    if random.random() < 0.5:
+        return None
+    return time(random.randrange(24), random.randrange(0, 60, SCHEDULE_BUCKET_MINUTES))
+
+
+def _add_channels(first: int, count: int) -> None:
+    WordleChannel.objects.bulk_create(
+        [
+            WordleChannel(
+                channel_id=channel_id,
+                guild_id=channel_id,
+                daily_summary_enabled=True,
+                daily_reminder_enabled=random.random() < 0.8,
+                timezone=random.choice(TIMEZONES),
+                summary_time=_get_time(),
+                reminder_time=_get_time(),
+            )
+            for channel_id in range(first, first + count)
+        ],
+        batch_size=1000,
+    )
+
+
+async def _run_bucket(now: datetime) -> tuple[int, int, float]:
+    """Does what the scheduler job does apart from posting, returning the posts due, queries run and time taken"""
+    started = timer.perf_counter()
+    queries = query_duration.count
+    due = 0
+    for post in DailyPost:
+        channels = await get_due_channels(post, now)
+        if len(channels) > 0:
+            await schedule_next_posts(post, channels, now)
+        due += sum(getattr(channel, post.due_field) is not None for channel in channels)
+
+    return due, query_duration.count - queries, (timer.perf_counter() - started) * 1000
+
+
+async def run(counts: list[int]) -> None:
+    total = 0
+    for count in counts:
+        await asyncio.to_thread(_add_channels, total + 1, count - total)
+        total = count
+        enabled = await WordleChannel.objects.filter(daily_reminder_enabled=True).acount()
+        await WordleChannel.objects.aupdate(next_summary_at=None, next_reminder_at=None)
+
+        # The first bucket schedules every channel, then a day of buckets posts to each of them once
+        await _run_bucket(START)
+        posts, busy, queries = 0, [], []
+        buckets = 24 * 60 // SCHEDULE_BUCKET_MINUTES
+        for bucket in range(1, buckets + 1):
+            due, bucket_queries, elapsed = await _run_bucket(
+                START + timedelta(minutes=bucket * SCHEDULE_BUCKET_MINUTES)
+            )
+            posts += due
+            queries.append(bucket_queries)
+            busy.append(elapsed / max(due, 1))
+
+        assert posts == count + enabled, f"Expected {count + enabled} posts in a day, got {posts}"
+        # Every channel has just been moved on to tomorrow, so these find nothing due
+        idle = [(await _run_bucket(START + timedelta(days=1, seconds=index)))[2] for index in range(20)]
+        print(
+            f"{count:>6} channels: {posts} posts over {buckets} buckets, at most {max(queries)} queries a bucket, "
+            f"{statistics.median(busy):.2f}ms a post due, {statistics.median(idle):.2f}ms a bucket with none due"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--channels", type=int, nargs="+", default=[100, 1000, 10000])
+    args = parser.parse_args()
+
+    random.seed(0)
+    install_query_log()
+    asyncio.run(run(sorted(args.channels)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Synthetic games for benchmarks, import this after setting up the benchmark environment"""
+
+from datetime import datetime, time, timedelta, timezone
+import random
+
+from django.db import connection
+
+from apps.core.models import WordleChannel, WordleGame
+from services.bot.config import TIMEZONE
+from services.bot.parser import WORDLE
+from services.bot.snowflake import snowflake_for_time
+from services.bot.utils import day_for_game_number
+
+
+def populate(days: int, channels: int, users: int) -> int:
+    first_game_number = 1500 - days
+    now = datetime.now(timezone.utc)
+    rows = []
+    for channel_id in range(1, channels + 1):
+        WordleChannel.objects.create(
+            channel_id=channel_id, guild_id=channel_id, daily_summary_enabled=True, daily_reminder_enabled=True
+        )
+
+    sequence = 0
+    for game_number in range(first_game_number, first_game_number + days):
+        day_start = datetime.combine(day_for_game_number(game_number), time(hour=6), tzinfo=TIMEZONE)
+        for channel_id in range(1, channels + 1):
+            for user_id in range(1, users + 1):
+                if random.random() < 0.3:
+                    continue
+                posted_at = day_start + timedelta(seconds=random.randint(0, 16 * 60 * 60))
+                sequence += 1
+                guesses = random.randint(1, 6)
+                rows.append(
+                    (
+                        snowflake_for_time(posted_at) + sequence % (1 << 22),
+                        channel_id,
+                        user_id,
+                        posted_at.isoformat(),
+                        now.isoformat(),
+                        game_number,
+                        guesses < 6,
+                        False,
+                        guesses,
+                        random.random() < 0.02,
+                        True,
+                        "[]",
+                        random.randint(guesses, guesses * 3),
+                        WORDLE,
+                    )
+                )
+
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {WordleGame._meta.db_table} (message_id, channel_id, user_id, posted_at, scanned_at, "
+            "game_number, is_win, is_hard_mode, guesses, is_duplicate, is_correct_day, result, greens, puzzle_type) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)",
+            rows,
+        )
+
+    return len(rows)
@@ -0,0 +1,33 @@
+import os
+from pathlib import Path
+import tempfile
+import time
+from typing import Callable
+
+import django
+
+
+def setup_benchmark_environment() -> Path:
+    """Points the app at a throw away database with all migrations applied, returns its directory"""
+    directory = Path(tempfile.mkdtemp(prefix="wordle-tracker-benchmark-"))
+    os.environ["DB_PATH"] = str(directory)
+    os.environ.setdefault("TOKEN", "benchmark")
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "wordletracker.settings")
+    django.setup()
+
+    from django.core.management import call_command
+
+    call_command("migrate", verbosity=0)
+    return directory
+
+
+def time_median_ms(function: Callable[[], object], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+
+    timings.sort()
+    return timings[len(timings) // 2]
@@ -0,0 +1,202 @@
+"""
+A local stand in for the parts of the discord REST API the bot uses, with discord style rate limits, so
+outbound request handling can be load tested offline. Point discord.py at it by setting
+`discord.http.Route.BASE` to its `base_url`, or run it on its own:
+
+    python -m benchmarks.fake_discord --port 8080
+"""
+
+import argparse
+import asyncio
+from collections import Counter
+import json
+from datetime import datetime, timezone
+import time
+from typing import Any
+
+from aiohttp import web
+
+from services.bot.snowflake import snowflake_for_time, time_for_snowflake
+
+BOT_USER_ID = 1
+GLOBAL_LIMIT = 50
+
+
+class _Window:
+    def __init__(self, limit: int, period: float) -> None:
+        self.limit = limit
+        self.period = period
+        self.reset_at = 0.0
+        self.used = 0
+
+    def take(self, now: float) -> bool:
+        if now >= self.reset_at:
+            self.reset_at = now + self.period
+            self.used = 0
+
+        if self.used >= self.limit:
+            return False
+
+        self.used += 1
+        return True
+
+
+class FakeDiscord:
+    """Serves fake messages, members and channels, answering with a 429 when a rate limit is exceeded"""
+
+    def __init__(self, latency_ms: float = 20, bucket_limit: int = 5, global_limit: int = GLOBAL_LIMIT) -> None:
+        self.latency = latency_ms / 1000
+        self.bucket_limit = bucket_limit
+        self.requests: Counter[str] = Counter()
+        self.rate_limited: Counter[str] = Counter()
+        self._global = _Window(global_limit, 1)
+        self._buckets: dict[str, _Window] = {}
+        self._runner: web.AppRunner | None = None
+        self.base_url = ""
+
+        self.app = web.Application()
+        self.app.router.add_get("/api/v10/users/@me", self._get_user)
+        self.app.router.add_get("/api/v10/channels/{channel_id}", self._get_channel)
+        self.app.router.add_get("/api/v10/channels/{channel_id}/messages", self._get_messages)
+        self.app.router.add_post("/api/v10/channels/{channel_id}/messages", self._send_message)
+        self.app.router.add_get("/api/v10/guilds/{guild_id}/members/{user_id}", self._get_member)
+
+    async def start(self, port: int = 0) -> str:
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", port)
+        await site.start()
+        bound_port = self._runner.addresses[0][1]
+        self.base_url = f"http://127.0.0.1:{bound_port}/api/v10"
+        return self.base_url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def _respond(self, request: web.Request, bucket: str, body: Any) -> web.Response:
+        route = request.match_info.route.resource.canonical if request.match_info.route.resource else bucket
+        self.requests[route] += 1
+        now = time.monotonic()
+        window = self._buckets.setdefault(bucket, _Window(self.bucket_limit, 1))
+
+        # Discord only treats a 429 as a rate limit if it came through its proxy
+        headers = {"Via": "1.1 google", "X-RateLimit-Bucket": route, "X-RateLimit-Limit": str(window.limit)}
+        if not self._global.take(now):
+            self.rate_limited["global"] += 1
+            retry_after = max(self._global.reset_at - now, 0.001)
+            headers["X-RateLimit-Global"] = "true"
+            return _json_response(
+                {"message": "You are being rate limited.", "retry_after": retry_after, "global": True}, 429, headers
+            )
+
+        if not window.take(now):
+            self.rate_limited[route] += 1
+            retry_after = max(window.reset_at - now, 0.001)
+            headers.update({"X-RateLimit-Remaining": "0", "X-RateLimit-Reset-After": f"{retry_after:.3f}"})
+            return _json_response(
+                {"message": "You are being rate limited.", "retry_after": retry_after, "global": False}, 429, headers
+            )
+
+        await asyncio.sleep(self.latency)
+        headers.update(
+            {
+                "X-RateLimit-Remaining": str(window.limit - window.used),
+                "X-RateLimit-Reset-After": f"{max(window.reset_at - now, 0.001):.3f}",
+            }
+        )
+        return _json_response(body, 200, headers)
+
+    async def _get_user(self, request: web.Request) -> web.Response:
+        return await self._respond(request, "user", _user(BOT_USER_ID))
+
+    async def _get_channel(self, request: web.Request) -> web.Response:
+        channel_id = int(request.match_info["channel_id"])
+        return await self._respond(request, f"channel:{channel_id}", _channel(channel_id))
+
+    async def _get_messages(self, request: web.Request) -> web.Response:
+        channel_id = int(request.match_info["channel_id"])
+        limit = int(request.query.get("limit", 50))
+        before = int(request.query.get("before", snowflake_for_time(datetime.now(timezone.utc))))
+        # One message a minute going back forever
+        step = 60_000 << 22
+        messages = [_message(channel_id, before - step * (index + 1)) for index in range(limit)]
+        return await self._respond(request, f"messages:{channel_id}", messages)
+
+    async def _send_message(self, request: web.Request) -> web.Response:
+        channel_id = int(request.match_info["channel_id"])
+        message = _message(channel_id, snowflake_for_time(datetime.now(timezone.utc)))
+        return await self._respond(request, f"send:{channel_id}", message)
+
+    async def _get_member(self, request: web.Request) -> web.Response:
+        guild_id = int(request.match_info["guild_id"])
+        user_id = int(request.match_info["user_id"])
+        member: dict[str, Any] = {
+            "user": _user(user_id),
+            "nick": None,
+            "roles": [],
+            "joined_at": "2021-06-19T00:00:00+00:00",
+            "flags": 0,
+        }
+        return await self._respond(request, f"members:{guild_id}", member)
+
+
+def _json_response(body: Any, status: int, headers: dict[str, str]) -> web.Response:
+    # discord.py only parses bodies whose content type is exactly application/json, without a charset
+    return web.Response(
+        body=json.dumps(body).encode(), status=status, headers={**headers, "Content-Type": "application/json"}
+    )
+
+
+def _user(user_id: int) -> dict[str, Any]:
+    return {"id": str(user_id), "username": f"user{user_id}", "discriminator": "0", "avatar": None}
+
+
+def _channel(channel_id: int) -> dict[str, Any]:
+    return {
+        "id": str(channel_id),
+        "type": 0,
+        "guild_id": str(channel_id),
+        "name": f"wordle-{channel_id}",
+        "position": 0,
+    }
+
+
+def _message(channel_id: int, message_id: int) -> dict[str, Any]:
+    return {
+        "id": str(message_id),
+        "channel_id": str(channel_id),
+        "author": _user(message_id % 20 + 2),
+        "content": "Wordle 1,000 4/6\n\n⬛🟨⬛⬛⬛\n⬛⬛🟩⬛🟨\n🟩⬛🟩⬛🟩\n🟩🟩🟩🟩🟩",
+        "timestamp": time_for_snowflake(message_id).isoformat(),
+        "edited_timestamp": None,
+        "tts": False,
+        "mention_everyone": False,
+        "mentions": [],
+        "mention_roles": [],
+        "attachments": [],
+        "embeds": [],
+        "pinned": False,
+        "type": 0,
+    }
+
+
+async def _serve(port: int, latency_ms: float) -> None:
+    fake = FakeDiscord(latency_ms)
+    print(f"Serving fake discord at {await fake.start(port)}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await fake.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    args = parser.parse_args()
+    asyncio.run(_serve(args.port, args.latency_ms))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Times the head to head comparison between two users with long histories, with and without the covering
+versus index, and compares it with pulling both users' games into Python.
+
+    python -m benchmarks.head_to_head --days 1000 --channels 5 --users 25
+"""
+
+import argparse
+import random
+
+from benchmarks.environment import setup_benchmark_environment, time_median_ms
+
+setup_benchmark_environment()
+
+from django.db import connection  # noqa: E402
+
+from apps.core.models import WordleGame  # noqa: E402
+from benchmarks.data import populate  # noqa: E402
+from services.bot.difficulty import get_score  # noqa: E402
+from services.bot.versus import HeadToHead, get_head_to_head  # noqa: E402
+
+
+def in_python(channel_id: int, user_id: int, opponent_id: int) -> HeadToHead:
+    games = WordleGame.objects.filter(
+        channel_id=channel_id, user_id__in=[user_id, opponent_id], is_duplicate=False, is_correct_day=True
+    )
+    scores: dict[int, dict[int, int]] = {user_id: {}, opponent_id: {}}
+    for player, game_number, guesses, is_win in games.values_list("user_id", "game_number", "guesses", "is_win"):
+        scores[player][game_number] = get_score(guesses, is_win)
+
+    result = HeadToHead()
+    for game_number, score in scores[user_id].items():
+        opponent_score = scores[opponent_id].get(game_number)
+        if opponent_score is None:
+            continue
+        result.games += 1
+        result.wins += score < opponent_score
+        result.losses += score > opponent_score
+        result.ties += score == opponent_score
+        result.total_difference += score - opponent_score
+
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=1000)
+    parser.add_argument("--channels", type=int, default=5)
+    parser.add_argument("--users", type=int, default=25)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    random.seed(0)
+    print(f"Inserted {populate(args.days, args.channels, args.users)} games")
+    connection.cursor().execute("ANALYZE")
+
+    expected = in_python(1, 1, 2)
+    print(f"{expected.games} shared games, {expected.wins}-{expected.losses}-{expected.ties}")
+    assert get_head_to_head(1, 1, 2) == expected, "Query should match the comparison done in Python"
+
+    print(f"in python:             {time_median_ms(lambda: in_python(1, 1, 2), args.repeat):.3f} ms")
+    print(f"with versus index:     {time_median_ms(lambda: get_head_to_head(1, 1, 2), args.repeat):.3f} ms")
+    with connection.cursor() as cursor:
+        cursor.execute("DROP INDEX core_game_versus_idx")
+    print(f"without versus index:  {time_median_ms(lambda: get_head_to_head(1, 1, 2), args.repeat):.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Streams a live leaderboard to hundreds of subscribers through the Django test client, then stores games like
+the bot does and measures how long the broker takes to publish each change, how many queries it needed, and
+how long subscribers wait for it. Some subscribers stop reading after the snapshot, to show their buffers
+staying bounded while everyone else keeps up.
+
+    python -m benchmarks.live_leaderboard --subscribers 500 --slow 50 --changes 50
+"""
+
+import argparse
+import asyncio
+from datetime import datetime, timezone
+import os
+import statistics
+import time
+
+from benchmarks.environment import setup_benchmark_environment
+
+os.environ.setdefault("ALLOWED_HOSTS", "testserver")
+setup_benchmark_environment()
+
+from asgiref.sync import sync_to_async  # noqa: E402
+from django.http import StreamingHttpResponse  # noqa: E402
+from django.test import AsyncClient  # noqa: E402
+
+from apps.core import live  # noqa: E402
+from apps.core.views import live_broker  # noqa: E402
+from benchmarks.data import populate  # noqa: E402
+from services.bot.config import TIMEZONE  # noqa: E402
+from services.bot.memory import get_rss  # noqa: E402
+from services.bot.parser import parse_message  # noqa: E402
+from services.bot.query_log import install_query_log, query_duration  # noqa: E402
+from services.bot.scanner import _store_game, get_game_fields  # noqa: E402
+from services.bot.snowflake import snowflake_for_time  # noqa: E402
+from services.bot.utils import game_number_for_day  # noqa: E402
+
+CHANNEL_ID = 1
+
+
+class Subscriber:
+    def __init__(self, response: StreamingHttpResponse) -> None:
+        self.stream = aiter(response.streaming_content)  # type: ignore[arg-type]
+        self.events: list[tuple[str, float]] = []
+
+    async def read_one(self) -> None:
+        chunk = bytes(await anext(self.stream))
+        if chunk.startswith(b"event: "):
+            self.events.append((chunk[7 : chunk.index(b"\n")].decode(), time.perf_counter()))
+
+    async def read(self) -> None:
+        while True:
+            await self.read_one()
+
+
+def _store(user_id: int, game_number: int) -> None:
+    result = parse_message(f"Wordle {game_number:,} 3/6\n\n🟨⬛⬛⬛⬛\n⬛🟩⬛🟨⬛\n🟩🟩🟩🟩🟩")
+    assert result is not None
+    posted_at = datetime.now(timezone.utc)
+    fields = get_game_fields(result, CHANNEL_ID, user_id, posted_at, False, user_id, TIMEZONE)
+    _store_game(snowflake_for_time(posted_at) + user_id, fields)
+
+
+async def run(subscribers: int, slow: int, changes: int, days: int) -> None:
+    client = AsyncClient()
+    # Changes are published by calling refresh directly, so polling never gets in the way of the timings
+    live_broker.poll_seconds = 3600
+    url = f"/api/channels/{CHANNEL_ID}/live?days={days}&limit=10"
+
+    started = time.perf_counter()
+    queries = query_duration.count
+    responses = await asyncio.gather(*(client.get(url) for _ in range(subscribers + slow)))
+    readers = [Subscriber(response) for response in responses]  # type: ignore[arg-type]
+    for reader in readers:
+        await reader.read_one()
+    print(
+        f"{subscribers + slow} subscribers connected and sent snapshots in "
+        f"{(time.perf_counter() - started) * 1000:.0f}ms with {query_duration.count - queries} queries"
+    )
+
+    fast = readers[:subscribers]
+    tasks = [asyncio.create_task(reader.read()) for reader in fast]
+    game_number = game_number_for_day(datetime.now(TIMEZONE).date()) or 0
+    publish_times, delivery_times, refresh_queries = [], [], []
+    for index in range(changes):
+        await sync_to_async(_store)(100_000 + index, game_number)
+
+        counts = [len(reader.events) for reader in fast]
+        queries = query_duration.count
+        published = time.perf_counter()
+        await live_broker.refresh()
+        publish_times.append((time.perf_counter() - published) * 1000)
+        refresh_queries.append(query_duration.count - queries)
+
+        while any(len(reader.events) == count for reader, count in zip(fast, counts)):
+            await asyncio.sleep(0)
+        delivery_times += [(reader.events[-1][1] - published) * 1000 for reader in fast]
+
+    delivery_times.sort()
+    print(f"publish per change:     median {statistics.median(publish_times):.1f}ms, max {max(publish_times):.1f}ms")
+    print(f"queries per change:     {statistics.median(refresh_queries):.0f}, however many subscribers there are")
+    print(
+        f"delivered to readers:   median {statistics.median(delivery_times):.1f}ms, "
+        f"p99 {delivery_times[int(len(delivery_times) * 0.99)]:.1f}ms, max {delivery_times[-1]:.1f}ms"
+    )
+    print(
+        f"stalled subscribers:    at most {_max_buffered()} buffered events "
+        f"of {live_broker.buffer_size}, {live.live_resyncs.value} resyncs to a snapshot"
+    )
+    print(f"process rss:            {get_rss() / 2**20:.1f} MiB")
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    # As the ASGI handler does once a response has finished, including when the client disconnects
+    for response in responses:
+        await sync_to_async(response.close)()
+    print(f"subscribers left after disconnecting: {live_broker.subscribers}")
+
+
+def _max_buffered() -> int:
+    return max(subscription.buffered for topic in live_broker._topics.values() for subscription in topic.subscribers)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--channels", type=int, default=5)
+    parser.add_argument("--users", type=int, default=30)
+    parser.add_argument("--subscribers", type=int, default=500)
+    parser.add_argument("--slow", type=int, default=50)
+    parser.add_argument("--changes", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"Inserted {populate(365, args.channels, args.users)} games")
+    install_query_log()
+    asyncio.run(run(args.subscribers, args.slow, args.changes, args.days))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Load tests outbound requests against the fake discord API: several channels are backfilled flat out while
+interactions look up members, with and without the outbound request scheduler installed.
+
+    python -m benchmarks.outbound_scheduler --channels 20 --seconds 10
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from benchmarks.environment import setup_benchmark_environment
+
+setup_benchmark_environment()
+
+from discord.http import HTTPClient, Route  # noqa: E402
+
+from benchmarks.fake_discord import FakeDiscord  # noqa: E402
+from services.bot.outbound import Priority, RequestScheduler, request_priority  # noqa: E402
+
+
+async def backfill(http: HTTPClient, channel_id: int, deadline: float) -> int:
+    pages = 0
+    before: int | None = None
+    with request_priority(Priority.BACKFILL):
+        while time.monotonic() < deadline:
+            messages = await http.logs_from(channel_id, 100, before=before)
+            before = int(messages[-1]["id"])
+            pages += 1
+
+    return pages
+
+
+async def interactions(http: HTTPClient, deadline: float, interval: float) -> list[float]:
+    latencies = []
+    user_id = 2
+    while time.monotonic() < deadline:
+        started = time.monotonic()
+        await http.get_member(1, user_id)
+        latencies.append((time.monotonic() - started) * 1000)
+        user_id += 1
+        await asyncio.sleep(interval)
+
+    return latencies
+
+
+async def run(name: str, channels: int, seconds: float, interval: float, scheduled: bool) -> None:
+    fake = FakeDiscord()
+    Route.BASE = await fake.start()
+    http = HTTPClient(asyncio.get_running_loop())
+    if scheduled:
+        RequestScheduler().install(http)
+
+    try:
+        await http.static_login("benchmark")
+        deadline = time.monotonic() + seconds
+        pages, latencies = await asyncio.gather(
+            asyncio.gather(*(backfill(http, channel_id, deadline) for channel_id in range(100, 100 + channels))),
+            interactions(http, deadline, interval),
+        )
+    finally:
+        await http.close()
+        await fake.stop()
+
+    latencies.sort()
+    print(
+        f"{name:<14} backfill pages/s: {sum(pages) / seconds:>6.1f}  "
+        f"interaction median {statistics.median(latencies):>7.1f} ms  "
+        f"p95 {latencies[int(len(latencies) * 0.95)]:>7.1f} ms  max {latencies[-1]:>7.1f} ms  "
+        f"429s: {sum(fake.rate_limited.values())}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--channels", type=int, default=20)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--interval-ms", type=float, default=250)
+    args = parser.parse_args()
+
+    interval = args.interval_ms / 1000
+    asyncio.run(run("unscheduled", args.channels, args.seconds, interval, scheduled=False))
+    asyncio.run(run("scheduled", args.channels, args.seconds, interval, scheduled=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Measures how many messages a second the parser gets through with only wordle registered and with ten formats,
+on a mix of chat and game results like a busy channel sees. Checking each line against each format's prefix
+in turn is timed alongside for comparison, as its cost grows with every format added.
+
+    python -m benchmarks.parser_dispatch --messages 20000 --games 0.1
+"""
+
+import argparse
+import logging
+import random
+from typing import Callable, Optional
+
+from benchmarks.environment import time_median_ms
+from services.bot.parser import WORDLE, GameResult, ParserRegistry, PuzzleFormat, registry as wordle_registry
+from services.bot.utils import WORDLE_EPOCH
+
+# Share headers of other daily puzzles, several sharing a first letter with each other or with chat
+OTHER_PREFIXES = [
+    "Connections",
+    "Strands #",
+    "Quordle ",
+    "Octordle #",
+    "nerdle ",
+    "#Worldle ",
+    "#Heardle ",
+    "Framed #",
+    "Costcodle #",
+]
+# Chat which shares first letters with the prefixes, without being a header
+WORDS = ["what", "Wordle", "was", "hard", "today", "Connect", "was", "easy", "#1", "Quick", "one", "nice", "Framed"]
+WORDLE_RESULT = "Wordle 1,234 4/6\n\n⬛🟨⬛⬛⬛\n⬛⬛🟩⬛🟨\n🟩⬛🟩⬛🟩\n🟩🟩🟩🟩🟩"
+
+
+def _skip(lines: list[str]) -> Optional[GameResult]:
+    return None
+
+
+def _get_registry(formats: int) -> ParserRegistry:
+    registry = ParserRegistry([wordle_registry.get(WORDLE)])
+    for prefix in OTHER_PREFIXES[: formats - 1]:
+        registry.register(
+            PuzzleFormat(
+                puzzle_type=prefix.strip("# ").lower(),
+                prefix=prefix,
+                is_header=lambda line: " " in line,
+                parse=_skip,
+                epoch=WORDLE_EPOCH,
+            )
+        )
+
+    return registry
+
+
+def _get_linear_parser(registry: ParserRegistry, prefixes: list[str]) -> Callable[[str], Optional[GameResult]]:
+    """Splits every message into lines and checks each line against every prefix in turn"""
+
+    def parse(message: str) -> Optional[GameResult]:
+        lines = message.split("\n")
+        for index, line in enumerate(lines):
+            for prefix in prefixes:
+                if line.startswith(prefix):
+                    return registry.parse("\n".join(lines[index:]))
+        return None
+
+    return parse
+
+
+def _get_messages(count: int, games: float) -> list[str]:
+    messages = []
+    for _ in range(count):
+        if random.random() < games:
+            messages.append(WORDLE_RESULT)
+        else:
+            lines = random.randint(1, 3)
+            messages.append("\n".join(" ".join(random.choices(WORDS, k=random.randint(2, 12))) for _ in range(lines)))
+
+    return messages
+
+
+def _measure(parse: Callable[[str], Optional[GameResult]], messages: list[str], repeat: int) -> tuple[float, int]:
+    parsed = sum(parse(message) is not None for message in messages)
+    elapsed = time_median_ms(lambda: [parse(message) for message in messages], repeat)
+    return len(messages) / elapsed * 1000, parsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--games", type=float, default=0.1)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    # Chat which happens to look like a header is logged when it fails to parse, which would swamp the timings
+    logging.disable(logging.WARNING)
+    random.seed(1)
+    messages = _get_messages(args.messages, args.games)
+    for formats in (1, 10):
+        registry = _get_registry(formats)
+        prefixes = ["Wordle ", *OTHER_PREFIXES[: formats - 1]]
+        for name, parse in [
+            ("trie pattern", registry.parse),
+            ("prefix by prefix", _get_linear_parser(registry, prefixes)),
+        ]:
+            rate, parsed = _measure(parse, messages, args.repeat)
+            print(f"{formats:>2} formats, {name:<17} {rate:>10,.0f} messages/s ({parsed} games)")
+
+
+if __name__ == "__main__":
+    main()
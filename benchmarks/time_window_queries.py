@@ -0,0 +1,117 @@
+"""
+Compares time window predicates on posted_at with the equivalent primary key ranges on message_id.
+
+    python -m benchmarks.time_window_queries --days 1000 --channels 20 --users 25
+"""
+
+import argparse
+from datetime import datetime, time
+import random
+from typing import Any
+
+from benchmarks.environment import setup_benchmark_environment, time_median_ms
+
+setup_benchmark_environment()
+
+from django.db.models import Count, Max, QuerySet  # noqa: E402
+
+from apps.core.models import WordleGame  # noqa: E402
+from benchmarks.data import populate  # noqa: E402
+from services.bot.config import TIMEZONE  # noqa: E402
+from services.bot.snowflake import snowflake_for_time, snowflake_range_for_days  # noqa: E402
+from services.bot.utils import day_for_game_number  # noqa: E402
+
+
+def compare(name: str, before: QuerySet[Any], after: QuerySet[Any], repeat: int) -> None:
+    print(f"\n=== {name}")
+    for label, queryset in (("posted_at / game_number", before), ("message_id range", after)):
+        assert list(queryset) is not None
+        print(f"--- {label}: {time_median_ms(lambda: list(queryset.all()), repeat):.3f} ms")
+        print(queryset.explain())
+
+    assert sorted(map(str, before)) == sorted(map(str, after)), "Queries should return the same rows"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=1000)
+    parser.add_argument("--channels", type=int, default=20)
+    parser.add_argument("--users", type=int, default=25)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    random.seed(0)
+    print(f"Inserted {populate(args.days, args.channels, args.users)} games")
+    game = WordleGame.objects.order_by("-message_id")[args.users * 3]
+
+    # Duplicate check in process_message
+    day_start = datetime.combine(game.posted_at.astimezone(TIMEZONE).date(), time.min, tzinfo=TIMEZONE)
+    duplicate_filter = dict(
+        game_number=game.game_number, user_id=game.user_id, channel_id=game.channel_id, message_id__lt=game.message_id
+    )
+    compare(
+        "Duplicate check",
+        WordleGame.objects.filter(posted_at__gte=day_start, **duplicate_filter).values("message_id"),
+        WordleGame.objects.filter(message_id__gte=snowflake_for_time(day_start), **duplicate_filter).values(
+            "message_id"
+        ),
+        args.repeat,
+    )
+
+    # Daily results
+    results_filter = dict(
+        channel_id=game.channel_id, is_duplicate=False, is_correct_day=True, game_number=game.game_number
+    )
+    start, end = snowflake_range_for_days(
+        day_for_game_number(game.game_number), day_for_game_number(game.game_number + 1), TIMEZONE
+    )
+    compare(
+        "Daily results",
+        WordleGame.objects.filter(**results_filter),
+        WordleGame.objects.filter(message_id__gte=start, message_id__lt=end, **results_filter),
+        args.repeat,
+    )
+
+    # Summary of the last 30 days
+    summary_filter = dict(
+        channel_id=game.channel_id,
+        is_duplicate=False,
+        is_correct_day=True,
+        game_number__gte=game.game_number - 30,
+        game_number__lt=game.game_number,
+    )
+    start, end = snowflake_range_for_days(
+        day_for_game_number(game.game_number - 30), day_for_game_number(game.game_number), TIMEZONE
+    )
+    compare(
+        "30 day summary",
+        WordleGame.objects.filter(**summary_filter).values("user_id").annotate(games=Count("message_id")),
+        WordleGame.objects.filter(message_id__gte=start, message_id__lt=end, **summary_filter)
+        .values("user_id")
+        .annotate(games=Count("message_id")),
+        args.repeat,
+    )
+
+    # Daily reminder
+    reminder_filter = dict(
+        channel_id=game.channel_id,
+        is_duplicate=False,
+        is_correct_day=True,
+        game_number__gte=game.game_number - 3,
+        game_number__lte=game.game_number,
+    )
+    start, end = snowflake_range_for_days(
+        day_for_game_number(game.game_number - 3), day_for_game_number(game.game_number + 1), TIMEZONE
+    )
+    compare(
+        "Daily reminder",
+        WordleGame.objects.filter(**reminder_filter).values("user_id").annotate(last_played=Max("game_number")),
+        WordleGame.objects.filter(message_id__gte=start, message_id__lt=end, **reminder_filter)
+        .values("user_id")
+        .annotate(last_played=Max("game_number")),
+        args.repeat,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Answers a summary for each channel straight after a cold start and again after a restart which loaded the
+cache snapshot, with member lookups going to the fake discord API and its rate limits. Shows how long the
+first summaries take either way and how much the snapshot costs to write and load. One channel has a game
+change while the bot is down, so its leaderboard is dropped on load and worked out again.
+
+    python -m benchmarks.warm_restart --channels 20 --users 30 --days 60
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from benchmarks.environment import setup_benchmark_environment
+
+setup_benchmark_environment()
+
+from asgiref.sync import sync_to_async  # noqa: E402
+import discord  # noqa: E402
+from discord.http import Route  # noqa: E402
+
+from benchmarks.data import populate  # noqa: E402
+from benchmarks.fake_discord import FakeDiscord  # noqa: E402
+from services.bot import warm_cache  # noqa: E402
+from services.bot.summarizer import Ranking, Summarizer  # noqa: E402
+from services.bot.utils import day_for_game_number  # noqa: E402
+from services.bot.watermarks import mark_channel_changed  # noqa: E402
+
+CHANGED_CHANNEL_ID = 1
+
+
+async def answer_summaries(name: str, channels: list[discord.TextChannel], fake: FakeDiscord, limit: int) -> None:
+    requests = sum(fake.requests.values())
+    end = day_for_game_number(1500)
+    latencies = []
+    for channel in channels:
+        started = time.perf_counter()
+        await Summarizer(channel).get_summary(limit, end, Ranking.WINS, 30)
+        warm_cache.record_response("wordle-summary", started)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    first_fast = warm_cache.first_fast_response.last if warm_cache.first_fast_response.count > 0 else None
+    print(
+        f"{name:<5} first summary {latencies[0]:>7.1f} ms  median {statistics.median(latencies):>7.1f} ms  "
+        f"all {sum(latencies) / 1000:>5.1f} s  discord requests {sum(fake.requests.values()) - requests:>4}  "
+        f"first fast response {f'{first_fast:.2f} s' if first_fast is not None else 'never'}"
+    )
+
+
+async def run(channel_count: int, limit: int) -> None:
+    fake = FakeDiscord()
+    Route.BASE = await fake.start()
+    client = discord.Client(intents=discord.Intents.none())
+    try:
+        await client.http.static_login("benchmark")
+        state = client._connection
+        channels = []
+        # Built without connecting to the gateway, the guilds only need their id to fetch members
+        for channel_id in range(1, channel_count + 1):
+            guild = discord.Guild(data={"id": str(channel_id)}, state=state)  # type: ignore[typeddict-item]
+            data = await client.http.get_channel(channel_id)
+            channels.append(discord.TextChannel(state=state, guild=guild, data=data))  # type: ignore[arg-type]
+
+        warm_cache.reset()
+        await answer_summaries("cold", channels, fake, limit)
+
+        started = time.perf_counter()
+        size = await asyncio.to_thread(warm_cache.write_snapshot)
+        print(f"wrote snapshot of {size} bytes in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+        await sync_to_async(mark_channel_changed)(CHANGED_CHANNEL_ID)
+        warm_cache.reset()
+        result = await warm_cache.load_snapshot()
+        assert result is not None and result.stale == 1, f"Expected one stale leaderboard, got {result}"
+        print(
+            f"loaded {result.display_names} display names and {result.leaderboards} leaderboards "
+            f"in {result.duration * 1000:.1f} ms, dropped {result.stale} stale"
+        )
+        await answer_summaries("warm", channels, fake, limit)
+    finally:
+        await client.close()
+        await fake.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--channels", type=int, default=20)
+    parser.add_argument("--users", type=int, default=30)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    populate(args.days, args.channels, args.users)
+    asyncio.run(run(args.channels, args.limit))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Compares summary totals for "last N days" windows read from the running totals index with a range aggregate
+over the games, for a spread of window sizes.
+
+    python -m benchmarks.window_totals --days 1000 --channels 5 --users 25
+"""
+
+import argparse
+import random
+import time
+
+from benchmarks.environment import setup_benchmark_environment, time_median_ms
+
+setup_benchmark_environment()
+
+from django.db.models import Count, Min, Q, Sum  # noqa: E402
+
+from apps.core.models import WordleGame  # noqa: E402
+from benchmarks.data import populate  # noqa: E402
+from services.bot.window_totals import get_window_totals, update_window_totals  # noqa: E402
+
+END_GAME_NUMBER = 1500
+
+
+def aggregate(min_game_number: int | None) -> list[tuple[int, int, int, int, int]]:
+    games = WordleGame.objects.filter(
+        channel_id=1, is_duplicate=False, is_correct_day=True, game_number__lt=END_GAME_NUMBER
+    )
+    if min_game_number is not None:
+        games = games.filter(game_number__gte=min_game_number)
+
+    rows = games.values("user_id").annotate(
+        games=Count("message_id"),
+        wins=Count("message_id", filter=Q(is_win=True)),
+        total_guesses=Sum("guesses"),
+        best=Min("guesses"),
+    )
+    return sorted((row["user_id"], row["games"], row["wins"], row["total_guesses"], row["best"]) for row in rows)
+
+
+def indexed(min_game_number: int | None) -> list[tuple[int, int, int, int, int]]:
+    return sorted(
+        (row.user_id, row.games, row.wins, row.total_guesses, row.best)
+        for row in get_window_totals(1, min_game_number, END_GAME_NUMBER)
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=1000)
+    parser.add_argument("--channels", type=int, default=5)
+    parser.add_argument("--users", type=int, default=25)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    random.seed(0)
+    print(f"Inserted {populate(args.days, args.channels, args.users)} games")
+
+    started = time.perf_counter()
+    indexed(None)
+    print(f"Built the index in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    for days in (7, 30, 90, 365, None):
+        min_game_number = END_GAME_NUMBER - days if days is not None else None
+        assert aggregate(min_game_number) == indexed(min_game_number), "Index should match the aggregate"
+        print(
+            f"{f'last {days} days' if days is not None else 'all time':<15}"
+            f" aggregate {time_median_ms(lambda: aggregate(min_game_number), args.repeat):>7.3f} ms"
+            f"  index {time_median_ms(lambda: indexed(min_game_number), args.repeat):>7.3f} ms"
+        )
+
+    # A new game after each player's last one is added on to the end of their totals
+    game = WordleGame.objects.filter(channel_id=1).order_by("-game_number").first()
+    assert game is not None
+    game.pk, game.game_number = game.pk + 1, END_GAME_NUMBER
+    game.save(force_insert=True)
+    append = time_median_ms(lambda: update_window_totals(1, [(game.user_id, END_GAME_NUMBER)]), args.repeat)
+    print(f"Tail append: {append:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,10 +2,15 @@
 """Django's command-line utility for administrative tasks."""
 import os
 import sys
+from pathlib import Path
 
 
 def main() -> None:
     """Run administrative tasks."""
+    # Some commands share configuration with the bot, so load it the same way the bot does
+    from dotenv import load_dotenv
+
+    load_dotenv(Path.cwd() / ".env")
     os.environ.setdefault("DJANGO_SETTINGS_MODULE", "wordletracker.settings")
     try:
         from django.core.management import execute_from_command_line
@@ -0,0 +1,108 @@
+from datetime import datetime, time, timedelta, timezone, tzinfo
+import logging
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import Q
+
+from apps.core.models import ArchivedWordleGame, WordleChannel, WordleGame
+from services.bot.config import ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE
+from services.bot.daily_results import invalidate_daily_results
+from services.bot.difficulty import refresh_difficulty
+from services.bot.ratings import invalidate_ratings
+from services.bot.snowflake import snowflake_for_time, time_for_snowflake
+from services.bot.timezones import get_timezone
+from services.bot.window_totals import update_window_totals
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FIELDS = [field.attname for field in ArchivedWordleGame._meta.concrete_fields]
+
+
+async def archive_old_games() -> None:
+    now = datetime.now(timezone.utc)
+    async for channel_id, timezone_name in WordleChannel.objects.values_list("channel_id", "timezone").aiterator():
+        try:
+            await sync_to_async(archive_games)(channel_id, get_archive_cutoff(now, get_timezone(timezone_name)))
+        except Exception as ex:
+            logger.error(
+                "Error while archiving games for channel: %s", ex, exc_info=ex, extra={"channel_id": channel_id}
+            )
+
+
+def get_archive_cutoff(now: datetime, tz: tzinfo) -> int:
+    """
+    The first message id which is kept in the games table. Archiving always happens on a boundary between the
+    channel's days in its timezone, so each day's games are either all archived or none of them are.
+    """
+    day = now.astimezone(tz).date() - timedelta(days=ARCHIVE_AFTER_DAYS)
+    return snowflake_for_time(datetime.combine(day, time.min, tzinfo=tz))
+
+
+def realign_archive(channel_id: int, tz: tzinfo) -> int:
+    """
+    Moves the channel's archive on to the next boundary between days in the timezone, after the channel's days
+    have moved to it, by archiving the rest of the day it now ends part way through. Returns how many games
+    were archived.
+    """
+    archived_until = WordleChannel.objects.filter(channel_id=channel_id).values_list("archived_until", flat=True).get()
+    if archived_until is None:
+        return 0
+
+    # Already on a boundary if the first message id after the archive is where a day starts
+    day = time_for_snowflake(archived_until + 1).astimezone(tz).date()
+    if snowflake_for_time(datetime.combine(day, time.min, tzinfo=tz)) == archived_until + 1:
+        return 0
+
+    return archive_games(channel_id, snowflake_for_time(datetime.combine(day + timedelta(days=1), time.min, tzinfo=tz)))
+
+
+def archive_games(channel_id: int, cutoff: int) -> int:
+    """
+    Moves the channel's games posted before the cutoff into the archive. Window totals count archived games
+    as well, so they do not change. Each batch is moved in its own transaction so the games table is never
+    locked for long.
+    """
+
+    # Claim the range first, so the scanner does not write games back into it while they are being moved
+    WordleChannel.objects.filter(
+        Q(archived_until__isnull=True) | Q(archived_until__lt=cutoff - 1), channel_id=channel_id
+    ).update(archived_until=cutoff - 1)
+
+    archived_count = 0
+    while True:
+        with transaction.atomic():
+            games = list(
+                WordleGame.objects.filter(channel_id=channel_id, message_id__lt=cutoff)
+                .order_by("message_id")
+                .values(*ARCHIVE_FIELDS)[:ARCHIVE_BATCH_SIZE]
+            )
+            if len(games) == 0:
+                break
+
+            ArchivedWordleGame.objects.bulk_create(
+                [ArchivedWordleGame(**game) for game in games], ignore_conflicts=True
+            )
+            WordleGame.objects.filter(message_id__in=[game["message_id"] for game in games]).delete()
+            archived_count += len(games)
+
+    if archived_count > 0:
+        logger.info(f"Archived {archived_count} games", extra={"channel_id": channel_id})
+
+    return archived_count
+
+
+def delete_archived_games(channel_id: int, message_ids: list[int]) -> int:
+    games = ArchivedWordleGame.objects.filter(channel_id=channel_id, message_id__in=message_ids)
+    deleted = list(games.values("user_id", "game_number"))
+    deleted_count, _ = games.delete()
+    game_numbers = {game["game_number"] for game in deleted}
+    invalidate_daily_results(channel_id, game_numbers)
+    invalidate_ratings(channel_id, game_numbers)
+    update_window_totals(channel_id, [(game["user_id"], game["game_number"]) for game in deleted])
+    refresh_difficulty(game_numbers)
+    return deleted_count
+
+
+def is_archived(channel_id: int, message_id: int) -> bool:
+    return WordleChannel.objects.filter(channel_id=channel_id, archived_until__gte=message_id).exists()
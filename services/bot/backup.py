@@ -0,0 +1,167 @@
+import asyncio
+from contextlib import closing
+from dataclasses import dataclass
+from datetime import datetime, timezone
+import gzip
+import logging
+from pathlib import Path
+import shutil
+import sqlite3
+import time
+
+from django.conf import settings
+
+from services.bot.config import (
+    BACKUP_DIRECTORY,
+    BACKUP_KEEP,
+    BACKUP_MAX_RESTARTS,
+    BACKUP_PAGES_PER_STEP,
+    BACKUP_STEP_SLEEP_MS,
+)
+from services.bot.metrics import Counter, Histogram
+from wordletracker.settings import DB_PATH
+
+logger = logging.getLogger(__name__)
+
+BACKUP_PREFIX = "db-"
+BACKUP_SUFFIX = ".sqlite3.gz"
+
+backup_duration = Histogram("backup.duration", "Time taken to snapshot, check and compress the database", "s")
+backup_failures = Counter("backup.failures", "Backups which failed or did not pass the integrity check")
+
+
+class BackupError(Exception):
+    pass
+
+
+@dataclass
+class BackupResult:
+    path: Path
+    pages: int
+    restarts: int
+    size: int
+    duration: float
+
+
+async def backup_database() -> None:
+    try:
+        # The backup has its own connections to the database, so it can run on any thread
+        await asyncio.to_thread(create_backup)
+    except Exception as ex:
+        backup_failures.add()
+        logger.error("Error while backing up the database: %s", ex, exc_info=ex)
+
+
+def get_backup_directory() -> Path:
+    return DB_PATH / BACKUP_DIRECTORY
+
+
+def create_backup(
+    source: Path | None = None,
+    directory: Path | None = None,
+    keep: int = BACKUP_KEEP,
+    pages_per_step: int = BACKUP_PAGES_PER_STEP,
+    step_sleep_ms: int = BACKUP_STEP_SLEEP_MS,
+) -> BackupResult:
+    """
+    Takes a consistent snapshot of the live database with SQLite's online backup API, checks its integrity
+    and stores it compressed, keeping the newest `keep` backups. The database is only locked while each
+    step of `pages_per_step` pages is copied, so writes carry on in between steps.
+    """
+    source = source or Path(str(settings.DATABASES["default"]["NAME"]))
+    directory = directory or get_backup_directory()
+    directory.mkdir(parents=True, exist_ok=True)
+
+    started = time.perf_counter()
+    name = f"{BACKUP_PREFIX}{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}"
+    snapshot = directory / f"{name}.sqlite3.partial"
+    path = directory / f"{name}{BACKUP_SUFFIX}"
+    try:
+        progress = _copy(source, snapshot, pages_per_step, step_sleep_ms)
+        _check_integrity(snapshot)
+        _compress(snapshot, path)
+    finally:
+        snapshot.unlink(missing_ok=True)
+
+    result = BackupResult(
+        path=path,
+        pages=progress.pages,
+        restarts=progress.restarts,
+        size=path.stat().st_size,
+        duration=time.perf_counter() - started,
+    )
+    backup_duration.record(result.duration)
+    logger.info(
+        f"Backed up {result.pages} pages to {path.name} in {result.duration:.2f}s",
+        extra={"size": result.size, "restarts": result.restarts},
+    )
+
+    rotate_backups(directory, keep)
+    return result
+
+
+def rotate_backups(directory: Path, keep: int) -> list[Path]:
+    # Names start with a UTC timestamp, so they sort oldest first
+    backups = sorted(directory.glob(f"{BACKUP_PREFIX}*{BACKUP_SUFFIX}"))
+    removed = backups[: max(len(backups) - keep, 0)]
+    for backup in removed:
+        backup.unlink()
+
+    return removed
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+class _Progress:
+    def __init__(self, step_sleep_ms: int) -> None:
+        self.step_sleep_ms = step_sleep_ms
+        self.pages = 0
+        self.restarts = 0
+        self.remaining: int | None = None
+
+    def __call__(self, status: int, remaining: int, total: int) -> None:
+        # SQLite starts again from the first page when another connection writes to the database, so a
+        # step which copied pages without getting any closer to the end means it was restarted
+        if status == sqlite3.SQLITE_OK and self.remaining is not None and remaining >= self.remaining:
+            self.restarts += 1
+            if self.restarts > BACKUP_MAX_RESTARTS:
+                raise _TooManyRestarts()
+
+        self.pages = total
+        self.remaining = remaining
+        # Only the step itself holds the lock, so give writers a chance before the next one
+        time.sleep(self.step_sleep_ms / 1000)
+
+
+def _copy(source: Path, snapshot: Path, pages_per_step: int, step_sleep_ms: int) -> _Progress:
+    progress = _Progress(step_sleep_ms)
+    with closing(sqlite3.connect(source)) as source_connection, closing(sqlite3.connect(snapshot)) as connection:
+        try:
+            source_connection.backup(connection, pages=pages_per_step, progress=progress)
+        except _TooManyRestarts:
+            # The database is changing too often to be copied in steps, so copy the rest in one go instead
+            logger.warning(f"Backup restarted {progress.restarts} times, copying the database in one step")
+            source_connection.backup(connection)
+
+    return progress
+
+
+def _check_integrity(snapshot: Path) -> None:
+    with closing(sqlite3.connect(snapshot)) as connection:
+        problems = [row[0] for row in connection.execute("PRAGMA integrity_check")]
+
+    if problems != ["ok"]:
+        raise BackupError(f"Backup failed the integrity check: {'; '.join(problems[:5])}")
+
+
+def _compress(snapshot: Path, path: Path) -> None:
+    partial = path.with_name(path.name + ".partial")
+    try:
+        with open(snapshot, "rb") as input, gzip.open(partial, "wb") as output:
+            shutil.copyfileobj(input, output)
+        # Renaming is atomic, so a backup with the final name is always complete
+        partial.rename(path)
+    finally:
+        partial.unlink(missing_ok=True)
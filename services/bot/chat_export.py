@@ -0,0 +1,211 @@
+from dataclasses import dataclass
+from datetime import datetime
+import json
+from pathlib import Path
+from typing import Any, Iterator, Optional, TextIO
+import io
+import unittest
+
+from services.bot.parser import GameResult, parse_message
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class ChatExportError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class ExportedMessage:
+    message_id: int
+    author_id: int
+    posted_at: datetime
+    content: str
+
+
+class ChatExportReader:
+    """
+    Streams messages out of a DiscordChatExporter JSON file without loading the whole document.
+
+    Top level keys other than `messages` are small, so they are decoded normally and kept in
+    `metadata`. The exporter writes `guild`, `channel`, `dateRange` and `exportedAt` before the
+    messages, so they are available as soon as the first message has been yielded.
+    """
+
+    def __init__(self, file: TextIO) -> None:
+        self.metadata: dict[str, Any] = {}
+        self._file = file
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._position = 0
+        self._eof = False
+
+    @classmethod
+    def open(cls, path: Path) -> "ChatExportReader":
+        return cls(path.open("r", encoding="utf-8"))
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __iter__(self) -> Iterator[ExportedMessage]:
+        self._expect("{")
+        if self._peek() == "}":
+            return
+
+        while True:
+            key = self._decode()
+            if not isinstance(key, str):
+                raise ChatExportError(f"Expected object key, got {key!r}")
+            self._expect(":")
+
+            if key == "messages":
+                yield from self._iter_messages()
+            else:
+                self.metadata[key] = self._decode()
+
+            if self._next() == "}":
+                return
+
+    def _iter_messages(self) -> Iterator[ExportedMessage]:
+        self._expect("[")
+        if self._peek() == "]":
+            self._position += 1
+            return
+
+        while True:
+            yield _to_exported_message(self._decode())
+            delimiter = self._next()
+            if delimiter == "]":
+                return
+            if delimiter != ",":
+                raise ChatExportError(f"Expected ',' or ']' in messages array, got {delimiter!r}")
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+
+        # Drop the part of the buffer we have already consumed so memory stays bounded by the
+        # size of a single message rather than the size of the file
+        if self._position > READ_CHUNK_SIZE:
+            self._buffer = self._buffer[self._position :]
+            self._position = 0
+
+        chunk = self._file.read(READ_CHUNK_SIZE)
+        if len(chunk) == 0:
+            self._eof = True
+            return False
+
+        self._buffer += chunk
+        return True
+
+    def _peek(self) -> str:
+        while True:
+            while self._position < len(self._buffer) and self._buffer[self._position].isspace():
+                self._position += 1
+
+            if self._position < len(self._buffer):
+                return self._buffer[self._position]
+
+            if not self._fill():
+                raise ChatExportError("Unexpected end of chat export")
+
+    def _next(self) -> str:
+        value = self._peek()
+        self._position += 1
+        return value
+
+    def _expect(self, value: str) -> None:
+        actual = self._next()
+        if actual != value:
+            raise ChatExportError(f"Expected {value!r} in chat export, got {actual!r}")
+
+    def _decode(self) -> Any:
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._position)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise ChatExportError("Chat export contains invalid or truncated JSON")
+
+            # A number at the very end of the buffer might continue in the next chunk
+            if end == len(self._buffer) and self._fill():
+                continue
+
+            self._position = end
+            return value
+
+
+def _to_exported_message(data: Any) -> ExportedMessage:
+    try:
+        return ExportedMessage(
+            message_id=int(data["id"]),
+            author_id=int(data["author"]["id"]),
+            posted_at=datetime.fromisoformat(data["timestamp"]),
+            content=data.get("content") or "",
+        )
+    except (KeyError, TypeError, ValueError) as ex:
+        raise ChatExportError(f"Chat export contains an invalid message: {ex}") from ex
+
+
+def parse_exported_messages(messages: list[ExportedMessage]) -> list[tuple[ExportedMessage, GameResult]]:
+    """Runs in a worker process, so it must only depend on the parser and not on Django"""
+    results = []
+    for message in messages:
+        result = parse_message(message.content)
+        if result is not None:
+            results.append((message, result))
+
+    return results
+
+
+def get_export_watermark(metadata: dict[str, Any]) -> Optional[datetime]:
+    """The latest point in time the export is guaranteed to cover"""
+    exported_at = metadata.get("exportedAt")
+    before = (metadata.get("dateRange") or {}).get("before")
+    candidates = [datetime.fromisoformat(value) for value in (exported_at, before) if value]
+    if len(candidates) == 0:
+        return None
+
+    return min(candidates)
+
+
+class TestChatExportReader(unittest.TestCase):
+    def test_streams_messages(self) -> None:
+        document = {
+            "guild": {"id": "1", "name": "Guild"},
+            "channel": {"id": "2", "name": "wordle"},
+            "exportedAt": "2024-05-01T12:00:00.1234567+00:00",
+            "messages": [
+                {
+                    "id": str(100 + i),
+                    "timestamp": "2024-05-01T10:00:00+00:00",
+                    "content": "x" * i,
+                    "author": {"id": "3"},
+                }
+                for i in range(200)
+            ],
+            "messageCount": 200,
+        }
+        text = json.dumps(document, indent=2)
+
+        # Tiny chunks make sure values split across reads are handled
+        global READ_CHUNK_SIZE
+        original_chunk_size = READ_CHUNK_SIZE
+        READ_CHUNK_SIZE = 7
+        try:
+            reader = ChatExportReader(io.StringIO(text))
+            messages = list(reader)
+        finally:
+            READ_CHUNK_SIZE = original_chunk_size
+
+        self.assertEqual(len(messages), 200)
+        self.assertEqual(messages[-1].message_id, 299)
+        self.assertEqual(messages[-1].content, "x" * 199)
+        self.assertEqual(reader.metadata["channel"]["id"], "2")
+        self.assertEqual(reader.metadata["messageCount"], 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
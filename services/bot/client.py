@@ -1,25 +1,32 @@
 import asyncio
 import discord
 import logging
+from typing import Any
 
-from apps.core.models import WordleChannel
-from services.bot.commands import Admin, daily_summary, summary
-from services.bot.config import CLIENT_WAIT_TIMEOUT, SYNC_COMMANDS, TOKEN
+from services.bot.commands import Admin, daily_summary, field_comparison, hardest_days, summary, versus
+from services.bot.config import CLIENT_WAIT_TIMEOUT, HEALTH_PORT, LOW_MEMORY_MODE, SYNC_COMMANDS, get_token
+from services.bot.health import HealthServer, on_gateway_connect, on_gateway_disconnect, on_gateway_event
 from services.bot.jobs import JobScheduler
-from services.bot.scanner import delete_message, process_message
+from services.bot.memory import track_client
+from services.bot.outbound import outbound
+from services.bot.scanner import MessageSource, delete_message, process_message
+from services.bot.warm_cache import is_tracked_channel
 
 logger = logging.getLogger(__name__)
 
 
 async def run_client() -> None:
-    intents: discord.Intents = discord.Intents.default()
-    intents.message_content = True
-    client = _WordleTrackerClient(intents=intents)
+    client = _WordleTrackerClient(**get_client_options())
+    track_client(client)
     scheduler = JobScheduler(asyncio.get_running_loop(), client)
+    health = HealthServer(client, scheduler)
 
     try:
+        if HEALTH_PORT != 0:
+            await health.start()
+
         logger.info("Logging in client...")
-        await client.login(TOKEN)
+        await client.login(get_token())
         await _sync_commands(client)
 
         # Connect in the background so we can run some setup code once the client is ready
@@ -37,40 +44,80 @@ async def run_client() -> None:
     finally:
         logger.info("Client shutting down...")
         scheduler.shutdown()
+        await health.stop()
         await client.close()
         logger.info("Client successfully stopped")
 
 
+def get_client_options(low_memory: bool = LOW_MEMORY_MODE) -> dict[str, Any]:
+    """
+    Options the client is created with. Low memory mode only subscribes to guild and message events and turns
+    off the message and member caches, which otherwise grow with the number and size of guilds the bot is in.
+    Nothing the bot does reads from those caches, edits and deletes are handled from the raw events.
+    """
+    if not low_memory:
+        intents = discord.Intents.default()
+        intents.message_content = True
+        return {"intents": intents}
+
+    # Guilds are still needed for messages to arrive with their text channel rather than a partial channel
+    intents = discord.Intents.none()
+    intents.guilds = True
+    intents.guild_messages = True
+    intents.message_content = True
+    return {
+        "intents": intents,
+        "max_messages": None,
+        "member_cache_flags": discord.MemberCacheFlags.none(),
+        "chunk_guilds_at_startup": False,
+    }
+
+
 class _WordleTrackerClient(discord.Client):
-    def __init__(self, *, intents: discord.Intents) -> None:
-        super().__init__(intents=intents)
+    def __init__(self, **options: Any) -> None:
+        super().__init__(**options)
+        outbound.install(self.http)
 
     async def _should_ignore_message(self, message: discord.Message) -> bool:
         if not isinstance(message.channel, discord.TextChannel):
             return True
 
-        if not await WordleChannel.objects.filter(channel_id=message.channel.id).aexists():
-            return True
+        return await self._should_ignore_channel(message.channel.id)
+
+    async def _should_ignore_channel(self, channel_id: int) -> bool:
+        return not await is_tracked_channel(channel_id)
+
+    async def on_connect(self) -> None:
+        on_gateway_connect()
 
-        return False
+    async def on_resumed(self) -> None:
+        on_gateway_connect()
+
+    async def on_disconnect(self) -> None:
+        on_gateway_disconnect()
 
     async def on_message(self, message: discord.Message) -> None:
+        on_gateway_event()
         if await self._should_ignore_message(message):
             return
 
-        await process_message(message)
+        await process_message(message, MessageSource.CREATED)
 
-    async def on_message_edit(self, before: discord.Message, after: discord.Message) -> None:
-        if await self._should_ignore_message(after):
+    # The raw events are sent whether or not the message is cached, the non raw ones are only sent for messages in
+    # the cache, so would miss edits to anything older than the cache or everything when it is turned off
+    async def on_raw_message_edit(self, payload: discord.RawMessageUpdateEvent) -> None:
+        on_gateway_event()
+        if await self._should_ignore_message(payload.message):
             return
 
-        await process_message(after)
+        await process_message(payload.message, MessageSource.EDITED)
 
-    async def on_message_delete(self, message: discord.Message) -> None:
-        if await self._should_ignore_message(message):
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent) -> None:
+        on_gateway_event()
+        if await self._should_ignore_channel(payload.channel_id):
             return
 
-        await delete_message(message)
+        await delete_message(payload.channel_id, payload.message_id)
 
 
 async def _sync_commands(client: discord.Client) -> None:
@@ -82,6 +129,9 @@ async def _sync_commands(client: discord.Client) -> None:
     tree = discord.app_commands.CommandTree(client)
     tree.add_command(summary)
     tree.add_command(daily_summary)
+    tree.add_command(hardest_days)
+    tree.add_command(field_comparison)
+    tree.add_command(versus)
     tree.add_command(Admin())
     await tree.sync()
     logger.info("Command definitions synced successfully")
@@ -1,17 +1,32 @@
-from datetime import datetime, timedelta
+import asyncio
+from datetime import date, datetime, time, timedelta
 import enum
 import logging
+import tempfile
+import time as timer
+from zoneinfo import ZoneInfoNotFoundError
+from asgiref.sync import sync_to_async
 import discord
 from django.db import IntegrityError
 
 from apps.core.models import WordleChannel
-from services.bot.config import SUMMARY_LIMIT_DEFAULT, TIMEZONE
-from services.bot.scanner import scan_messages_for_channel
+from services.bot.config import SUMMARY_LIMIT_DEFAULT
+from services.bot.diagnostics import DiagnosticsAction, start_tracing, stop_tracing, write_report
+from services.bot.exporter import ExportFormat, export_games, get_export_filename
+from services.bot.outbound import Priority, request_priority
+from services.bot.scanner import RescanProgress, rescan_channel
+from services.bot.schedule import DailyPost, get_post_time, set_channel_schedule
 from services.bot.summarizer import Ranking, Summarizer
+from services.bot.timezones import get_timezone
 from services.bot.utils import game_number_for_day
+from services.bot.warm_cache import record_response, set_channel_tracked
 
 logger = logging.getLogger(__name__)
 
+RESCAN_PROGRESS_INTERVAL = 2
+# Given as the timezone to go back to the bot's default, as leaving it out keeps the channel's timezone
+DEFAULT_TIMEZONE = "default"
+
 CHANNEL_ADDED_SUCCESS = "Wordle Tracker has been added to this channel"
 CHANNEL_REMOVED_SUCCESS = "Wordle Tracker has been removed from this channel. "
 INVALID_CHANNEL_TYPE = "Wordle Tracker can not be added to this type of channel"
@@ -20,6 +35,15 @@ CHANNEL_NOT_ADDED = (
     "Wordle Tracker has not yet been added to this channel. "
     "Run the `/admin add` command to add the bot to this channel"
 )
+INVALID_DATE = "Expected a date in the format YYYY-MM-DD"
+INVALID_MESSAGE_ID = "Expected a message ID, which is a long number"
+INVALID_TIMEZONE = "Expected a timezone from the tz database, such as Europe/London or America/New_York"
+INVALID_TIME = "Expected a time in the format HH:MM"
+OWNER_ONLY = "Only the owner of the bot can run this command"
+EXPORT_TOO_LARGE = (
+    "The export is too large to attach to a message, "
+    "ask the bot owner to run the `export_games` management command instead"
+)
 GENERIC_ERROR = (
     "Oopsie woopsie! Something went wrong while processing your command (*^ω^*)~\n"
     "For assistance please contact [support](https://bitly.com/98K8eH) to see if they "
@@ -53,16 +77,9 @@ class Admin(discord.app_commands.Group):
             await interaction.response.send_message(content=CHANNEL_ALREADY_ADDED, ephemeral=True)
             return
 
+        set_channel_tracked(interaction.channel.id, True)
         await interaction.response.defer(ephemeral=True)
-
-        content = GENERIC_ERROR
-        try:
-            await scan_messages_for_channel(interaction.channel, None)
-            content = CHANNEL_ADDED_SUCCESS
-        except Exception as ex:
-            logger.error("Error when adding channel: %s", ex, exc_info=ex)
-        finally:
-            await interaction.followup.send(content=content, suppress_embeds=True)
+        await _rescan_with_progress(interaction, interaction.channel, None, None, CHANNEL_ADDED_SUCCESS)
 
     @discord.app_commands.command(name="info", description="Show current channel info")
     async def info(self, interaction: discord.Interaction) -> None:
@@ -78,12 +95,69 @@ class Admin(discord.app_commands.Group):
                 content = (
                     "Wordle Tracker has been added to this channel!\n"
                     f"Daily Summary Enabled: {channel.daily_summary_enabled}\n"
+                    f"{_get_schedule_content(channel)}\n"
                 )
             await interaction.response.send_message(content=content, ephemeral=True)
         except Exception as ex:
             await interaction.response.send_message(content=GENERIC_ERROR, ephemeral=True, suppress_embeds=True)
             logger.error("Error getting channel info: %s", ex, exc_info=ex)
 
+    @discord.app_commands.command(
+        name="schedule", description="Set the timezone and daily post times of current channel"
+    )
+    @discord.app_commands.describe(
+        timezone=f"Timezone the channel's days are in, such as America/New_York, or {DEFAULT_TIMEZONE} for the bot's",
+        summary_time="Local time to post the daily summary at (HH:MM)",
+        reminder_time="Local time to post the daily reminder at (HH:MM)",
+    )
+    async def schedule(
+        self,
+        interaction: discord.Interaction,
+        timezone: str | None = None,
+        summary_time: str | None = None,
+        reminder_time: str | None = None,
+    ) -> None:
+        if not isinstance(interaction.channel, discord.TextChannel) or interaction.guild is None:
+            await interaction.response.send_message(content=GENERIC_ERROR, ephemeral=True, suppress_embeds=True)
+            return
+
+        channel = await WordleChannel.objects.filter(channel_id=interaction.channel.id).afirst()
+        if channel is None:
+            await interaction.response.send_message(content=CHANNEL_NOT_ADDED, ephemeral=True)
+            return
+
+        # Anything not given stays as it is
+        timezone_name = channel.timezone
+        try:
+            if timezone is not None and timezone.strip().lower() == DEFAULT_TIMEZONE:
+                timezone_name = None
+            elif timezone is not None:
+                get_timezone(timezone)
+                timezone_name = timezone
+        except (ZoneInfoNotFoundError, ValueError):
+            await interaction.response.send_message(content=INVALID_TIMEZONE, ephemeral=True)
+            return
+
+        try:
+            summary = time.fromisoformat(summary_time) if summary_time is not None else channel.summary_time
+            reminder = time.fromisoformat(reminder_time) if reminder_time is not None else channel.reminder_time
+        except ValueError:
+            await interaction.response.send_message(content=INVALID_TIME, ephemeral=True)
+            return
+
+        # Changing the timezone moves the channel's games onto different days, which takes a while for big channels
+        await interaction.response.defer(ephemeral=True)
+        try:
+            changed = await sync_to_async(set_channel_schedule)(channel.channel_id, timezone_name, summary, reminder)
+            channel = await WordleChannel.objects.aget(channel_id=channel.channel_id)
+            content = f"Schedule updated!\n{_get_schedule_content(channel)}"
+            if changed > 0:
+                content += f"\n{changed} games changed whether they were played on the correct day"
+            await interaction.followup.send(content=content)
+        except Exception as ex:
+            await interaction.followup.send(content=GENERIC_ERROR, suppress_embeds=True)
+            logger.error("Error setting channel schedule: %s", ex, exc_info=ex)
+
     @discord.app_commands.command(name="remove", description="Remove current channel from the Wordle Tracker")
     async def remove(self, interaction: discord.Interaction) -> None:
         if not isinstance(interaction.channel, discord.TextChannel) or interaction.guild is None:
@@ -91,14 +165,58 @@ class Admin(discord.app_commands.Group):
             return
 
         deleted_count, _ = await WordleChannel.objects.filter(channel_id=interaction.channel.id).adelete()
+        set_channel_tracked(interaction.channel.id, False)
 
         if deleted_count == 0:
             await interaction.response.send_message(content=CHANNEL_NOT_ADDED, ephemeral=True)
         else:
             await interaction.response.send_message(content=CHANNEL_REMOVED_SUCCESS, ephemeral=True)
 
-    @discord.app_commands.command(name="rescan", description="Rescan all the messages in current channel")
-    async def rescan(self, interaction: discord.Interaction) -> None:
+    @discord.app_commands.command(name="rescan", description="Rescan the messages in current channel")
+    @discord.app_commands.describe(
+        start="Only rescan messages posted on or after this date (YYYY-MM-DD)",
+        end="Only rescan messages posted on or before this date (YYYY-MM-DD)",
+    )
+    async def rescan(self, interaction: discord.Interaction, start: str | None = None, end: str | None = None) -> None:
+        if not isinstance(interaction.channel, discord.TextChannel) or interaction.guild is None:
+            await interaction.response.send_message(content=GENERIC_ERROR, ephemeral=True, suppress_embeds=True)
+            return
+
+        channel = await WordleChannel.objects.filter(channel_id=interaction.channel.id).afirst()
+        if channel is None:
+            await interaction.response.send_message(content=CHANNEL_NOT_ADDED, ephemeral=True)
+            return
+
+        try:
+            start_date = date.fromisoformat(start) if start is not None else None
+            end_date = date.fromisoformat(end) if end is not None else None
+        except ValueError:
+            await interaction.response.send_message(content=INVALID_DATE, ephemeral=True)
+            return
+
+        tz = get_timezone(channel.timezone)
+        await interaction.response.defer(ephemeral=True)
+        await _rescan_with_progress(
+            interaction,
+            interaction.channel,
+            datetime.combine(start_date, time.min, tzinfo=tz) if start_date is not None else None,
+            datetime.combine(end_date + timedelta(days=1), time.min, tzinfo=tz) if end_date is not None else None,
+            "Rescanning finished!",
+        )
+
+    @discord.app_commands.command(name="export", description="Export the games tracked in current channel to a file")
+    @discord.app_commands.describe(
+        format="Which file format to export the games in",
+        compress="Should the file be gzip compressed",
+        since="Only export games posted after this message ID",
+    )
+    async def export(
+        self,
+        interaction: discord.Interaction,
+        format: ExportFormat = ExportFormat.CSV,
+        compress: bool = True,
+        since: str | None = None,
+    ) -> None:
         if not isinstance(interaction.channel, discord.TextChannel) or interaction.guild is None:
             await interaction.response.send_message(content=GENERIC_ERROR, ephemeral=True, suppress_embeds=True)
             return
@@ -107,15 +225,124 @@ class Admin(discord.app_commands.Group):
             await interaction.response.send_message(content=CHANNEL_NOT_ADDED, ephemeral=True)
             return
 
+        since_message_id = None
+        if since is not None:
+            try:
+                since_message_id = int(since)
+            except ValueError:
+                await interaction.response.send_message(content=INVALID_MESSAGE_ID, ephemeral=True)
+                return
+
         await interaction.response.defer(ephemeral=True)
-        content = GENERIC_ERROR
         try:
-            await scan_messages_for_channel(interaction.channel, None)
-            content = "Rescanning finished!"
+            with tempfile.TemporaryFile() as file:
+                await sync_to_async(export_games)(
+                    file,
+                    format,
+                    channel_id=interaction.channel.id,
+                    since_message_id=since_message_id,
+                    compress=compress,
+                )
+
+                if file.tell() > interaction.guild.filesize_limit:
+                    await interaction.followup.send(content=EXPORT_TOO_LARGE, suppress_embeds=True)
+                    return
+
+                file.seek(0)
+                attachment = discord.File(file, filename=get_export_filename(format, compress))
+                await interaction.followup.send(file=attachment)
         except Exception as ex:
-            logger.error("Error rescanning messages: %s", ex, exc_info=ex)
-        finally:
-            await interaction.followup.send(content, suppress_embeds=True)
+            await interaction.followup.send(content=GENERIC_ERROR, suppress_embeds=True)
+            logger.error("Error exporting games: %s", ex, exc_info=ex)
+
+    @discord.app_commands.command(name="memory", description="Trace memory allocations and write memory reports")
+    @discord.app_commands.describe(action="Start or stop tracing allocations, or write a report to the data volume")
+    async def memory(
+        self, interaction: discord.Interaction, action: DiagnosticsAction = DiagnosticsAction.SNAPSHOT
+    ) -> None:
+        # Diagnostics cover the whole process rather than one guild, so are not left to guild admins
+        if not await _is_owner(interaction):
+            await interaction.response.send_message(content=OWNER_ONLY, ephemeral=True)
+            return
+
+        if action == DiagnosticsAction.START:
+            started = start_tracing()
+            content = "Started tracing memory allocations" if started else "Memory allocations are already traced"
+            await interaction.response.send_message(content=content, ephemeral=True)
+            return
+
+        if action == DiagnosticsAction.STOP:
+            stopped = stop_tracing()
+            content = "Stopped tracing memory allocations" if stopped else "Memory allocations are not being traced"
+            await interaction.response.send_message(content=content, ephemeral=True)
+            return
+
+        await interaction.response.defer(ephemeral=True)
+        try:
+            report = await asyncio.to_thread(write_report)
+            content = f"Wrote memory report to `{report.path}`"
+            if report.compared_to is not None:
+                content += f", compared with `{report.compared_to.name}`"
+            await interaction.followup.send(content=content)
+        except Exception as ex:
+            await interaction.followup.send(content=GENERIC_ERROR, suppress_embeds=True)
+            logger.error("Error writing memory report: %s", ex, exc_info=ex)
+
+
+async def _is_owner(interaction: discord.Interaction) -> bool:
+    info = await interaction.client.application_info()
+    if info.team is not None:
+        return any(member.id == interaction.user.id for member in info.team.members)
+
+    return info.owner.id == interaction.user.id
+
+
+async def _rescan_with_progress(
+    interaction: discord.Interaction,
+    channel: discord.TextChannel,
+    start: datetime | None,
+    end: datetime | None,
+    success_content: str,
+) -> None:
+    progress_message = await interaction.followup.send(content="Scanning messages...", wait=True)
+    last_update = timer.monotonic()
+
+    async def on_progress(progress: RescanProgress) -> None:
+        nonlocal last_update
+        if timer.monotonic() - last_update < RESCAN_PROGRESS_INTERVAL:
+            return
+
+        last_update = timer.monotonic()
+        try:
+            await progress_message.edit(content=_get_progress_content(progress))
+        except discord.HTTPException as ex:
+            logger.warning("Failed to update scan progress: %s", ex, exc_info=ex)
+
+    content = GENERIC_ERROR
+    try:
+        with request_priority(Priority.BACKFILL):
+            progress = await rescan_channel(channel, start, end, on_progress)
+        content = f"{success_content}\n{_get_progress_content(progress)}"
+    except Exception as ex:
+        logger.error("Error rescanning messages: %s", ex, exc_info=ex, extra={"channel_id": channel.id})
+    finally:
+        await progress_message.edit(content=content)
+
+
+def _get_progress_content(progress: RescanProgress) -> str:
+    percent = 100 * progress.slices_done // max(progress.slices_total, 1)
+    return (
+        f"Scanned {progress.messages} messages and updated {progress.games} games, "
+        f"{progress.unchanged} messages were unchanged ({percent}%)"
+    )
+
+
+def _get_schedule_content(channel: WordleChannel) -> str:
+    return (
+        f"Timezone: {get_timezone(channel.timezone)}\n"
+        f"Daily Summary Time: {get_post_time(channel, DailyPost.SUMMARY):%H:%M}\n"
+        f"Daily Reminder Time: {get_post_time(channel, DailyPost.REMINDER):%H:%M}"
+    )
 
 
 @discord.app_commands.command(name="wordle-summary", description="Summary of wordle games posted in current channel")
@@ -134,16 +361,18 @@ async def summary(
     include_today: bool = False,
     response: ResponseType = ResponseType.Whisper,
 ) -> None:
+    started = timer.perf_counter()
     if not isinstance(interaction.channel, discord.TextChannel) or interaction.guild is None:
         await interaction.response.send_message(content=GENERIC_ERROR, ephemeral=True, suppress_embeds=True)
         return
 
-    if not await WordleChannel.objects.filter(channel_id=interaction.channel.id).aexists():
+    channel = await WordleChannel.objects.filter(channel_id=interaction.channel.id).afirst()
+    if channel is None:
         await interaction.response.send_message(content=CHANNEL_NOT_ADDED, ephemeral=True)
         return
     try:
         summarizer = Summarizer(interaction.channel)
-        end_date = datetime.now().astimezone(TIMEZONE).date()
+        end_date = datetime.now(get_timezone(channel.timezone)).date()
         if include_today:
             end_date += timedelta(days=1)
 
@@ -151,6 +380,7 @@ async def summary(
         await interaction.response.send_message(
             embed=embed, ephemeral=response == ResponseType.Whisper, silent=response == ResponseType.Post
         )
+        record_response("wordle-summary", started)
     except Exception as ex:
         await interaction.response.send_message(content=GENERIC_ERROR, ephemeral=True, suppress_embeds=True)
         logger.error("Error generating summary: %s", ex, exc_info=ex)
@@ -164,17 +394,19 @@ async def daily_summary(
     game_number: int | None,
     response: ResponseType = ResponseType.Whisper,
 ) -> None:
+    started = timer.perf_counter()
     if not isinstance(interaction.channel, discord.TextChannel) or interaction.guild is None:
         await interaction.response.send_message(content=GENERIC_ERROR, ephemeral=True, suppress_embeds=True)
         return
 
-    if not await WordleChannel.objects.filter(channel_id=interaction.channel.id).aexists():
+    channel = await WordleChannel.objects.filter(channel_id=interaction.channel.id).afirst()
+    if channel is None:
         await interaction.response.send_message(content=CHANNEL_NOT_ADDED, ephemeral=True)
         return
 
     try:
         if game_number is None:
-            yesterday = datetime.now().astimezone(TIMEZONE).date() - timedelta(days=1)
+            yesterday = datetime.now(get_timezone(channel.timezone)).date() - timedelta(days=1)
             game_number = game_number_for_day(yesterday)
             if game_number is None:
                 await interaction.response.send_message(content=GENERIC_ERROR, ephemeral=True, suppress_embeds=True)
@@ -186,6 +418,107 @@ async def daily_summary(
         await interaction.response.send_message(
             embed=embed, ephemeral=response == ResponseType.Whisper, silent=response == ResponseType.Post
         )
+        record_response("wordle-results", started)
     except Exception as ex:
         await interaction.response.send_message(content=GENERIC_ERROR, ephemeral=True, suppress_embeds=True)
         logger.error("Error getting daily results: %s", ex, exc_info=ex)
+
+
+@discord.app_commands.command(name="wordle-hardest", description="Hardest wordle games across every tracked channel")
+@discord.app_commands.describe(
+    days="Number of previous days to limit the games to",
+    limit="Max number of games to include",
+    response="Which format to respond to the request in",
+)
+async def hardest_days(
+    interaction: discord.Interaction,
+    days: int | None,
+    limit: int = SUMMARY_LIMIT_DEFAULT,
+    response: ResponseType = ResponseType.Whisper,
+) -> None:
+    if not isinstance(interaction.channel, discord.TextChannel) or interaction.guild is None:
+        await interaction.response.send_message(content=GENERIC_ERROR, ephemeral=True, suppress_embeds=True)
+        return
+
+    channel = await WordleChannel.objects.filter(channel_id=interaction.channel.id).afirst()
+    if channel is None:
+        await interaction.response.send_message(content=CHANNEL_NOT_ADDED, ephemeral=True)
+        return
+
+    try:
+        summarizer = Summarizer(interaction.channel)
+        end_date = datetime.now(get_timezone(channel.timezone)).date()
+        embed = await summarizer.get_hardest_days(limit, end_date, days)
+        await interaction.response.send_message(
+            embed=embed, ephemeral=response == ResponseType.Whisper, silent=response == ResponseType.Post
+        )
+    except Exception as ex:
+        await interaction.response.send_message(content=GENERIC_ERROR, ephemeral=True, suppress_embeds=True)
+        logger.error("Error getting hardest days: %s", ex, exc_info=ex)
+
+
+@discord.app_commands.command(name="wordle-field", description="How your result compares to every tracked channel")
+@discord.app_commands.describe(
+    game_number="Which Wordle Game to compare, defaults to yesterday",
+    response="Which format to respond to the request in",
+)
+async def field_comparison(
+    interaction: discord.Interaction,
+    game_number: int | None,
+    response: ResponseType = ResponseType.Whisper,
+) -> None:
+    if not isinstance(interaction.channel, discord.TextChannel) or interaction.guild is None:
+        await interaction.response.send_message(content=GENERIC_ERROR, ephemeral=True, suppress_embeds=True)
+        return
+
+    channel = await WordleChannel.objects.filter(channel_id=interaction.channel.id).afirst()
+    if channel is None:
+        await interaction.response.send_message(content=CHANNEL_NOT_ADDED, ephemeral=True)
+        return
+
+    try:
+        if game_number is None:
+            yesterday = datetime.now(get_timezone(channel.timezone)).date() - timedelta(days=1)
+            game_number = game_number_for_day(yesterday)
+            if game_number is None:
+                await interaction.response.send_message(content=GENERIC_ERROR, ephemeral=True, suppress_embeds=True)
+                logger.error(f"Failed to get game number for yesterday: {yesterday}")
+                return
+
+        summarizer = Summarizer(interaction.channel)
+        embed = await summarizer.get_field_comparison(interaction.user.id, game_number)
+        await interaction.response.send_message(
+            embed=embed, ephemeral=response == ResponseType.Whisper, silent=response == ResponseType.Post
+        )
+    except Exception as ex:
+        await interaction.response.send_message(content=GENERIC_ERROR, ephemeral=True, suppress_embeds=True)
+        logger.error("Error comparing to the field: %s", ex, exc_info=ex)
+
+
+@discord.app_commands.command(name="wordle-versus", description="Head to head record against another player")
+@discord.app_commands.describe(
+    opponent="Who to compare your results with",
+    response="Which format to respond to the request in",
+)
+async def versus(
+    interaction: discord.Interaction,
+    opponent: discord.Member,
+    response: ResponseType = ResponseType.Whisper,
+) -> None:
+    if not isinstance(interaction.channel, discord.TextChannel) or interaction.guild is None:
+        await interaction.response.send_message(content=GENERIC_ERROR, ephemeral=True, suppress_embeds=True)
+        return
+
+    if not await WordleChannel.objects.filter(channel_id=interaction.channel.id).aexists():
+        await interaction.response.send_message(content=CHANNEL_NOT_ADDED, ephemeral=True)
+        return
+
+    try:
+        summarizer = Summarizer(interaction.channel)
+        embed = await summarizer.get_head_to_head(interaction.user.id, opponent.id)
+        await interaction.response.send_message(
+            embed=embed, ephemeral=response == ResponseType.Whisper, silent=response == ResponseType.Post
+        )
+    except Exception as ex:
+        await interaction.response.send_message(content=GENERIC_ERROR, ephemeral=True, suppress_embeds=True)
+        logger.error("Error getting head to head: %s", ex, exc_info=ex)
@@ -1,3 +1,4 @@
+from datetime import time
 import os
 from zoneinfo import ZoneInfo
 
@@ -19,6 +20,11 @@ def _get_env_int(name: str, default: int | None = None) -> int:
         raise ValueError(f"Environment variable {name} must be an integer, got '{value}'")
 
 
+def get_token() -> str:
+    """The discord token, only read when the bot logs in so the stats API and management commands run without it"""
+    return _get_env("TOKEN")
+
+
 def _get_env_bool(name: str, default: bool) -> bool:
     value = os.getenv(name)
     if value is None:
@@ -34,9 +40,51 @@ def _get_env_bool(name: str, default: bool) -> bool:
         raise ValueError(f"Environment variable {name} must be a boolean ('TRUE' or 'FALSE'), got '{value}'")
 
 
-TOKEN = _get_env("TOKEN")
 SUMMARY_LIMIT_DEFAULT = _get_env_int("SUMMARY_LIMIT_DEFAULT", 5)
 USERNAME_MAX_LENGTH = _get_env_int("USERNAME_MAX_LENGTH", 20)
 CLIENT_WAIT_TIMEOUT = _get_env_int("CLIENT_WAIT_TIMEOUT", 60)
 SYNC_COMMANDS = _get_env_bool("SYNC_COMMANDS", True)
 TIMEZONE = ZoneInfo(_get_env("TIMEZONE", "Europe/London"))
+DAILY_SUMMARY_TIME = time.fromisoformat(_get_env("DAILY_SUMMARY_TIME", "09:00"))
+DAILY_REMINDER_TIME = time.fromisoformat(_get_env("DAILY_REMINDER_TIME", "21:00"))
+SCHEDULE_BUCKET_MINUTES = _get_env_int("SCHEDULE_BUCKET_MINUTES", 5)
+SCHEDULE_GRACE_MINUTES = _get_env_int("SCHEDULE_GRACE_MINUTES", 60)
+RECONCILE_WINDOW_DAYS = _get_env_int("RECONCILE_WINDOW_DAYS", 7)
+RECONCILE_BATCH_SIZE = _get_env_int("RECONCILE_BATCH_SIZE", 500)
+RESCAN_SLICE_DAYS = _get_env_int("RESCAN_SLICE_DAYS", 30)
+RESCAN_CONCURRENCY = _get_env_int("RESCAN_CONCURRENCY", 4)
+FINGERPRINT_RETENTION_DAYS = _get_env_int("FINGERPRINT_RETENTION_DAYS", 14)
+ARCHIVE_AFTER_DAYS = _get_env_int("ARCHIVE_AFTER_DAYS", 400)
+ARCHIVE_BATCH_SIZE = _get_env_int("ARCHIVE_BATCH_SIZE", 2000)
+BACKUP_DIRECTORY = _get_env("BACKUP_DIRECTORY", "backups")
+BACKUP_KEEP = _get_env_int("BACKUP_KEEP", 7)
+BACKUP_PAGES_PER_STEP = _get_env_int("BACKUP_PAGES_PER_STEP", 1000)
+BACKUP_STEP_SLEEP_MS = _get_env_int("BACKUP_STEP_SLEEP_MS", 10)
+BACKUP_MAX_RESTARTS = _get_env_int("BACKUP_MAX_RESTARTS", 5)
+OUTBOUND_RATE = _get_env_int("OUTBOUND_RATE", 40)
+OUTBOUND_BURST = _get_env_int("OUTBOUND_BURST", 10)
+OUTBOUND_BACKFILL_RESERVE = _get_env_int("OUTBOUND_BACKFILL_RESERVE", 5)
+OUTBOUND_BUCKET_RATE = _get_env_int("OUTBOUND_BUCKET_RATE", 5)
+RATING_INITIAL = _get_env_int("RATING_INITIAL", 1500)
+RATING_K_FACTOR = _get_env_int("RATING_K_FACTOR", 32)
+LOW_MEMORY_MODE = _get_env_bool("LOW_MEMORY_MODE", False)
+MEMORY_LOG_INTERVAL_MINUTES = _get_env_int("MEMORY_LOG_INTERVAL_MINUTES", 15)
+DIAGNOSTICS_DIRECTORY = _get_env("DIAGNOSTICS_DIRECTORY", "diagnostics")
+DIAGNOSTICS_TRACE_FRAMES = _get_env_int("DIAGNOSTICS_TRACE_FRAMES", 5)
+DIAGNOSTICS_TOP = _get_env_int("DIAGNOSTICS_TOP", 25)
+WATCHDOG_INTERVAL_MS = _get_env_int("WATCHDOG_INTERVAL_MS", 250)
+WATCHDOG_STALL_MS = _get_env_int("WATCHDOG_STALL_MS", 500)
+ASYNCIO_DEBUG = _get_env_bool("ASYNCIO_DEBUG", False)
+SLOW_CALLBACK_MS = _get_env_int("SLOW_CALLBACK_MS", 100)
+SLOW_QUERY_MS = _get_env_int("SLOW_QUERY_MS", 100)
+SLOW_QUERY_LOG_INTERVAL = _get_env_int("SLOW_QUERY_LOG_INTERVAL", 300)
+HEALTH_HOST = _get_env("HEALTH_HOST", "0.0.0.0")
+HEALTH_PORT = _get_env_int("HEALTH_PORT", 8000)
+HEALTH_DB_PING_SECONDS = _get_env_int("HEALTH_DB_PING_SECONDS", 15)
+WARM_RESTART = _get_env_bool("WARM_RESTART", True)
+CACHE_SNAPSHOT_FILE = _get_env("CACHE_SNAPSHOT_FILE", "cache-snapshot.json.gz")
+DISPLAY_NAME_TTL_SECONDS = _get_env_int("DISPLAY_NAME_TTL_SECONDS", 43200)
+DISPLAY_NAME_CACHE_SIZE = _get_env_int("DISPLAY_NAME_CACHE_SIZE", 10000)
+LEADERBOARD_CACHE_SIZE = _get_env_int("LEADERBOARD_CACHE_SIZE", 256)
+TRACKED_CHANNEL_RECHECK_SECONDS = _get_env_int("TRACKED_CHANNEL_RECHECK_SECONDS", 60)
+FAST_RESPONSE_MS = _get_env_int("FAST_RESPONSE_MS", 500)
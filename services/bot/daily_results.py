@@ -0,0 +1,86 @@
+from dataclasses import astuple, dataclass
+from datetime import datetime, tzinfo
+import logging
+from typing import Iterable
+
+from django.db import transaction
+
+from apps.core.models import ArchivedWordleGame, DailyResult, WordleChannel, WordleGame
+from services.bot.metrics import Counter
+from services.bot.parser import WORDLE
+from services.bot.snowflake import snowflake_range_for_days
+from services.bot.timezones import get_channel_timezone
+from services.bot.utils import day_for_game_number, game_number_for_day
+
+logger = logging.getLogger(__name__)
+
+cache_hits = Counter("daily_results.cache_hits", "Daily results read from the stored results of finished games")
+cache_misses = Counter("daily_results.cache_misses", "Daily results worked out from the games")
+
+
+@dataclass
+class PlayerResult:
+    user_id: int
+    guesses: int
+    is_win: bool
+
+
+def get_daily_results(channel_id: int, game_number: int, read_only: bool = False) -> list[PlayerResult]:
+    """
+    Results of the game for the channel, best first. Once the game's day is over only a late edit, delete
+    or rescan can change them, so finished games are stored and read back until one of those happens. Read
+    only callers, which must not take the write lock, work them out without storing them.
+    """
+    players = DailyResult.objects.filter(pk=(channel_id, game_number)).values_list("players", flat=True).first()
+    if players is not None:
+        cache_hits.add()
+        return [PlayerResult(*player) for player in players]
+
+    cache_misses.add()
+    if read_only:
+        return _get_results(channel_id, game_number, get_channel_timezone(channel_id))
+
+    # Working the results out and storing them happen together, so a change in between can not be missed
+    with transaction.atomic():
+        tz = get_channel_timezone(channel_id)
+        results = _get_results(channel_id, game_number, tz)
+        if _is_finished(game_number, tz):
+            DailyResult.objects.get_or_create(
+                channel_id=channel_id,
+                game_number=game_number,
+                defaults=dict(players=[astuple(result) for result in results]),
+            )
+
+        return results
+
+
+def invalidate_daily_results(channel_id: int, game_numbers: Iterable[int] | None = None) -> None:
+    """Forgets the stored results for the channel's games with the given numbers, or all of them"""
+    results = DailyResult.objects.filter(channel_id=channel_id)
+    if game_numbers is not None:
+        results = results.filter(game_number__in=list(game_numbers))
+
+    results.delete()
+
+
+def _get_results(channel_id: int, game_number: int, tz: tzinfo) -> list[PlayerResult]:
+    start, end = snowflake_range_for_days(day_for_game_number(game_number), day_for_game_number(game_number + 1), tz)
+    # Days are archived whole, so the games for a day are either all archived or none of them are
+    is_archived = WordleChannel.objects.filter(channel_id=channel_id, archived_until__gte=start).exists()
+    model = ArchivedWordleGame if is_archived else WordleGame
+    games = model.objects.filter(
+        channel_id=channel_id,
+        is_duplicate=False,
+        is_correct_day=True,
+        puzzle_type=WORDLE,
+        game_number=game_number,
+        message_id__gte=start,
+        message_id__lt=end,
+    ).order_by("guesses", "-is_win", "posted_at")
+
+    return [PlayerResult(*row) for row in games.values_list("user_id", "guesses", "is_win")]
+
+
+def _is_finished(game_number: int, tz: tzinfo) -> bool:
+    today = game_number_for_day(datetime.now(tz).date())
+    return today is not None and game_number < today
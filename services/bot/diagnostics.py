@@ -0,0 +1,172 @@
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timezone
+import enum
+import gc
+import logging
+from pathlib import Path
+import sys
+import tempfile
+import tracemalloc
+import unittest
+
+from services.bot.config import DIAGNOSTICS_DIRECTORY, DIAGNOSTICS_TOP, DIAGNOSTICS_TRACE_FRAMES
+from services.bot.memory import get_peak_rss, get_rss
+from wordletracker.settings import DB_PATH
+
+logger = logging.getLogger(__name__)
+
+REPORT_PREFIX = "memory-"
+SNAPSHOT_SUFFIX = ".tracemalloc"
+
+# Allocations made while importing modules or by tracemalloc itself are noise in every report
+_SNAPSHOT_FILTERS = [
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, tracemalloc.__file__),
+]
+
+# The snapshot the next report is compared with, kept on disk rather than in memory so tracing is all it costs
+_last_snapshot: Path | None = None
+
+
+class DiagnosticsAction(enum.Enum):
+    START = "start"
+    STOP = "stop"
+    SNAPSHOT = "snapshot"
+
+
+@dataclass
+class DiagnosticsReport:
+    path: Path
+    snapshot: Path | None
+    compared_to: Path | None
+    traced_memory: int
+
+
+def get_diagnostics_directory() -> Path:
+    return DB_PATH / DIAGNOSTICS_DIRECTORY
+
+
+def start_tracing(frames: int = DIAGNOSTICS_TRACE_FRAMES) -> bool:
+    """Starts recording where memory is allocated, returning false if it already was"""
+    global _last_snapshot
+    if tracemalloc.is_tracing():
+        return False
+
+    tracemalloc.start(frames)
+    _last_snapshot = None
+    logger.info(f"Started tracing memory allocations with {frames} frames")
+    return True
+
+
+def stop_tracing() -> bool:
+    """Stops recording allocations and frees the traces, returning false if it was not running"""
+    global _last_snapshot
+    if not tracemalloc.is_tracing():
+        return False
+
+    tracemalloc.stop()
+    _last_snapshot = None
+    logger.info("Stopped tracing memory allocations")
+    return True
+
+
+def write_report(directory: Path | None = None, limit: int = DIAGNOSTICS_TOP) -> DiagnosticsReport:
+    """
+    Writes the process memory use and the most common types of live object to a report. While tracing it also
+    includes the top allocation sites, and how they changed since the previous report, with the snapshot
+    saved alongside the report so any two can be compared later with the compare_memory_snapshots command.
+    """
+    global _last_snapshot
+    directory = directory if directory is not None else get_diagnostics_directory()
+    directory.mkdir(parents=True, exist_ok=True)
+    name = f"{REPORT_PREFIX}{datetime.now(timezone.utc):%Y%m%dT%H%M%S%fZ}"
+
+    lines = [
+        f"rss: {_format_size(get_rss())}",
+        f"peak rss: {_format_size(get_peak_rss())}",
+        f"allocated blocks: {sys.getallocatedblocks()}",
+    ]
+
+    snapshot_path = None
+    compared_to = None
+    traced_memory = 0
+    if tracemalloc.is_tracing():
+        snapshot = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+        snapshot_path = directory / f"{name}{SNAPSHOT_SUFFIX}"
+        snapshot.dump(str(snapshot_path))
+        traced_memory, peak_traced_memory = tracemalloc.get_traced_memory()
+        lines += [
+            f"traced: {_format_size(traced_memory)}",
+            f"peak traced: {_format_size(peak_traced_memory)}",
+            "",
+            f"Top {limit} allocation sites:",
+            *(str(stat) for stat in snapshot.statistics("lineno")[:limit]),
+        ]
+
+        if _last_snapshot is not None and _last_snapshot.exists():
+            compared_to = _last_snapshot
+            lines += ["", f"Changes since {compared_to.name}:"]
+            lines += _compare(tracemalloc.Snapshot.load(str(compared_to)), snapshot, limit)
+
+        _last_snapshot = snapshot_path
+    else:
+        lines += ["", "Not tracing allocations, start tracing to include allocation sites"]
+
+    lines += ["", f"Top {limit} object types:"]
+    lines += [f"{count:>10} {type_name}" for type_name, count in count_objects(limit)]
+
+    path = directory / f"{name}.txt"
+    path.write_text("\n".join(lines) + "\n")
+    logger.info(f"Wrote memory report to {path}")
+    return DiagnosticsReport(path=path, snapshot=snapshot_path, compared_to=compared_to, traced_memory=traced_memory)
+
+
+def compare_snapshots(old: Path, new: Path, limit: int = DIAGNOSTICS_TOP) -> list[str]:
+    """The allocation sites which grew or shrank the most between two saved snapshots"""
+    return _compare(tracemalloc.Snapshot.load(str(old)), tracemalloc.Snapshot.load(str(new)), limit)
+
+
+def count_objects(limit: int = DIAGNOSTICS_TOP) -> list[tuple[str, int]]:
+    """The most common types of object tracked by the garbage collector, which covers all containers"""
+    counts = Counter(type(value).__qualname__ for value in gc.get_objects())
+    return counts.most_common(limit)
+
+
+def _compare(old: tracemalloc.Snapshot, new: tracemalloc.Snapshot, limit: int) -> list[str]:
+    return [str(stat) for stat in new.compare_to(old, "lineno")[:limit]]
+
+
+def _format_size(size: int) -> str:
+    return f"{size / 2**20:.1f} MiB"
+
+
+class TestWriteReport(unittest.TestCase):
+    def tearDown(self) -> None:
+        stop_tracing()
+
+    def test_compares_with_previous_report(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            self.assertTrue(start_tracing(1))
+            first = write_report(Path(directory))
+            self.assertIsNone(first.compared_to)
+
+            retained = [bytearray(1024) for _ in range(1000)]
+            second = write_report(Path(directory))
+            self.assertEqual(second.compared_to, first.snapshot)
+            assert first.snapshot is not None and second.snapshot is not None
+            changes = compare_snapshots(first.snapshot, second.snapshot, 1)
+            self.assertIn(__file__, changes[0])
+            self.assertIn("Changes since", second.path.read_text())
+            del retained
+
+    def test_report_without_tracing(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            report = write_report(Path(directory))
+            self.assertIsNone(report.snapshot)
+            self.assertIn("object types", report.path.read_text())
+
+
+if __name__ == "__main__":
+    unittest.main()
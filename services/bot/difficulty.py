@@ -0,0 +1,118 @@
+from dataclasses import dataclass, field
+import logging
+from typing import Iterable
+
+from django.db.models import Count, Sum
+
+from apps.core.models import ArchivedWordleGame, GameDifficulty, WordleGame
+from services.bot.parser import MAX_GUESSES, WORD_LENGTH, WORDLE, LetterGuess
+
+logger = logging.getLogger(__name__)
+
+# A loss scores one more than the most guesses a win can take
+LOSS_SCORE = MAX_GUESSES + 1
+GAME_NUMBERS_PER_STATEMENT = 500
+
+
+@dataclass
+class _Totals:
+    players: int = 0
+    total_guesses: int = 0
+    losses: int = 0
+    greens: int = 0
+    green_guesses: int = 0
+    distribution: list[int] = field(default_factory=lambda: [0] * LOSS_SCORE)
+
+
+def count_greens(guesses: list[list[LetterGuess]]) -> int:
+    return sum(letter == LetterGuess.GREEN for guess in guesses for letter in guess)
+
+
+def get_score(guesses: int, is_win: bool) -> int:
+    return guesses if is_win else LOSS_SCORE
+
+
+def get_green_density(difficulty: GameDifficulty) -> float | None:
+    """Fraction of letters guessed which were green, unknown once every game of the day has been archived"""
+    if difficulty.green_guesses == 0:
+        return None
+    return difficulty.greens / (difficulty.green_guesses * WORD_LENGTH)
+
+
+def get_better_than(difficulty: GameDifficulty, score: int) -> float:
+    """Fraction of the field that did worse than the score, counting half of those who did the same"""
+    worse = sum(difficulty.distribution[score:])
+    same = difficulty.distribution[score - 1]
+    return (worse + same / 2) / max(difficulty.players, 1)
+
+
+def refresh_difficulty(game_numbers: Iterable[int] | None = None) -> None:
+    """
+    Works out the difficulty of the given games, or every game, from the first result each player posted on
+    the day in every channel. Only the games passed in are read, so keeping a game up to date after one of its
+    results changes is a lookup on the game number indexes of the live and archived games rather than a scan.
+    """
+    if game_numbers is None:
+        _refresh(None)
+        return
+
+    game_numbers = sorted(set(game_numbers))
+    for index in range(0, len(game_numbers), GAME_NUMBERS_PER_STATEMENT):
+        _refresh(game_numbers[index : index + GAME_NUMBERS_PER_STATEMENT])
+
+
+def _refresh(game_numbers: list[int] | None) -> None:
+    totals: dict[int, _Totals] = {}
+    for model in (WordleGame, ArchivedWordleGame):
+        games = model.objects.filter(is_duplicate=False, is_correct_day=True, puzzle_type=WORDLE)
+        if game_numbers is not None:
+            games = games.filter(game_number__in=game_numbers)
+
+        rows = (
+            games.values("game_number", "guesses", "is_win")
+            .annotate(players=Count("message_id"), greens=Sum("greens"))
+            .order_by()
+        )
+        for row in rows:
+            total = totals.setdefault(row["game_number"], _Totals())
+            total.players += row["players"]
+            total.total_guesses += row["guesses"] * row["players"]
+            total.losses += 0 if row["is_win"] else row["players"]
+            # Games archived before greens were counted have none, so only live games count towards greens
+            if model is WordleGame:
+                total.greens += row["greens"]
+                total.green_guesses += row["guesses"] * row["players"]
+            total.distribution[get_score(row["guesses"], row["is_win"]) - 1] += row["players"]
+
+    GameDifficulty.objects.bulk_create(
+        [
+            GameDifficulty(
+                game_number=game_number,
+                players=total.players,
+                total_guesses=total.total_guesses,
+                losses=total.losses,
+                greens=total.greens,
+                green_guesses=total.green_guesses,
+                distribution=total.distribution,
+                average_score=(total.total_guesses + total.losses * (LOSS_SCORE - MAX_GUESSES)) / total.players,
+            )
+            for game_number, total in totals.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["game_number"],
+        update_fields=[
+            "players",
+            "total_guesses",
+            "losses",
+            "greens",
+            "green_guesses",
+            "distribution",
+            "average_score",
+        ],
+    )
+
+    # Games which no longer have any results
+    removed = GameDifficulty.objects.exclude(game_number__in=list(totals))
+    if game_numbers is not None:
+        removed = removed.filter(game_number__in=game_numbers)
+    removed.delete()
@@ -0,0 +1,94 @@
+from functools import reduce
+import logging
+from operator import or_
+from typing import Iterable
+
+from asgiref.sync import sync_to_async
+from django.db import connection
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber, TruncDate
+
+from apps.core.models import ArchivedWordleGame, WordleGame
+from services.bot.daily_results import invalidate_daily_results
+from services.bot.difficulty import refresh_difficulty
+from services.bot.ratings import invalidate_ratings
+from services.bot.timezones import get_channel_timezone
+from services.bot.watermarks import mark_channel_changed
+from services.bot.window_totals import invalidate_window_totals
+
+logger = logging.getLogger(__name__)
+
+# Each key uses two query parameters, keep well under SQLite's limit
+KEYS_PER_STATEMENT = 200
+
+
+def recompute_duplicates(channel_id: int, keys: Iterable[tuple[int, int]] | None = None) -> int:
+    """
+    Recomputes is_duplicate for live games in the channel with the given (user_id, game_number) keys, or for
+    every game in the channel, archived or not, if no keys are given. Returns how many games changed.
+
+    A game is a duplicate if the same user posted the same game earlier on the same day, so within each
+    (user, puzzle type, game number, posting day) partition every game after the first is a duplicate. Days are
+    the channel's own, in its timezone. This is done with a window function in a single UPDATE so it only writes
+    the rows whose flag actually changes. Days are archived whole, so each table is ranked on its own.
+    """
+    if keys is None:
+        changed = _recompute(WordleGame, channel_id, None) + _recompute(ArchivedWordleGame, channel_id, None)
+        if changed > 0:
+            # Callers passing keys know which games changed, here any of the channel's results could have
+            invalidate_daily_results(channel_id)
+            invalidate_ratings(channel_id)
+            invalidate_window_totals(channel_id)
+            refresh_difficulty()
+            mark_channel_changed(channel_id)
+        return changed
+
+    keys = sorted(set(keys))
+    changed = 0
+    for index in range(0, len(keys), KEYS_PER_STATEMENT):
+        chunk = keys[index : index + KEYS_PER_STATEMENT]
+        # Each term names the whole index key so SQLite can look every key up in the index separately
+        changed += _recompute(
+            WordleGame,
+            channel_id,
+            reduce(
+                or_,
+                (Q(channel_id=channel_id, user_id=user_id, game_number=game_number) for user_id, game_number in chunk),
+            ),
+        )
+
+    return changed
+
+
+async def arecompute_duplicates(channel_id: int, keys: Iterable[tuple[int, int]] | None = None) -> int:
+    return await sync_to_async(recompute_duplicates)(channel_id, keys)
+
+
+def _recompute(model: type[WordleGame] | type[ArchivedWordleGame], channel_id: int, keys: Q | None) -> int:
+    games = model.objects.filter(channel_id=channel_id) if keys is None else model.objects.filter(keys)
+    tz = get_channel_timezone(channel_id)
+
+    ranked = games.annotate(
+        position=Window(
+            RowNumber(),
+            partition_by=[F("user_id"), F("puzzle_type"), F("game_number"), TruncDate("posted_at", tzinfo=tz)],
+            order_by=F("message_id").asc(),
+        )
+    ).values("message_id", "position")
+
+    sql, params = ranked.query.sql_with_params()
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE "{table}" SET "is_duplicate" = "ranked"."position" > 1 '
+            f'FROM ({sql}) AS "ranked" '
+            f'WHERE "{table}"."message_id" = "ranked"."message_id" '
+            f'AND "{table}"."is_duplicate" != ("ranked"."position" > 1)',
+            params,
+        )
+        changed = cursor.rowcount
+
+    if changed > 0:
+        logger.info(f"Recomputed duplicate flag for {changed} games", extra={"channel_id": channel_id})
+
+    return changed
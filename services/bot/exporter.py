@@ -0,0 +1,116 @@
+import csv
+import enum
+import gzip
+import io
+import json
+import logging
+from typing import Any, BinaryIO, Iterator, cast
+
+from apps.core.models import WordleGame
+
+logger = logging.getLogger(__name__)
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FIELDS = [
+    "message_id",
+    "channel_id",
+    "channel__guild_id",
+    "user_id",
+    "posted_at",
+    "game_number",
+    "is_win",
+    "is_hard_mode",
+    "guesses",
+    "is_duplicate",
+    "is_correct_day",
+    "puzzle_type",
+    "result",
+]
+EXPORT_COLUMNS = [field.replace("channel__", "") for field in EXPORT_FIELDS]
+
+
+class ExportFormat(enum.Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+
+def get_export_filename(format: ExportFormat, compress: bool) -> str:
+    filename = f"wordle-games.{format.value}"
+    if compress:
+        filename += ".gz"
+    return filename
+
+
+def export_games(
+    output: BinaryIO,
+    format: ExportFormat,
+    channel_id: int | None = None,
+    guild_id: int | None = None,
+    since_message_id: int | None = None,
+    compress: bool = False,
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+) -> int:
+    """Writes games ordered by message id to output and returns how many were written"""
+    binary = cast(BinaryIO, gzip.GzipFile(fileobj=output, mode="wb")) if compress else output
+    text = io.TextIOWrapper(binary, encoding="utf-8", newline="")
+    count = 0
+    try:
+        if format == ExportFormat.CSV:
+            writer = csv.writer(text)
+            writer.writerow(EXPORT_COLUMNS)
+            for row in _iter_rows(channel_id, guild_id, since_message_id, chunk_size):
+                writer.writerow([_to_csv_value(value) for value in row])
+                count += 1
+        else:
+            for row in _iter_rows(channel_id, guild_id, since_message_id, chunk_size):
+                text.write(json.dumps(dict(zip(EXPORT_COLUMNS, row)), default=_to_json_value))
+                text.write("\n")
+                count += 1
+    finally:
+        text.flush()
+        # Detach so closing the wrappers does not close the caller's file
+        text.detach()
+        if compress:
+            binary.close()
+
+    logger.info(
+        f"Exported {count} games",
+        extra={"channel_id": channel_id, "guild_id": guild_id},
+    )
+    return count
+
+
+def _iter_rows(
+    channel_id: int | None, guild_id: int | None, since_message_id: int | None, chunk_size: int
+) -> Iterator[tuple[Any, ...]]:
+    games = WordleGame.objects.all()
+    if channel_id is not None:
+        games = games.filter(channel_id=channel_id)
+    if guild_id is not None:
+        games = games.filter(channel__guild_id=guild_id)
+
+    # Page through the primary key rather than using a single cursor, so each chunk is a short
+    # indexed range query and only one chunk is ever held in memory
+    cursor = since_message_id
+    while True:
+        chunk = games
+        if cursor is not None:
+            chunk = chunk.filter(message_id__gt=cursor)
+        rows = list(chunk.order_by("message_id").values_list(*EXPORT_FIELDS)[:chunk_size])
+        if len(rows) == 0:
+            return
+
+        yield from rows
+        cursor = rows[-1][0]
+
+
+def _to_csv_value(value: Any) -> Any:
+    if isinstance(value, list):
+        return json.dumps(value)
+    return _to_json_value(value)
+
+
+def _to_json_value(value: Any) -> Any:
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
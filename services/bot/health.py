@@ -0,0 +1,207 @@
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+import logging
+import math
+import time
+from typing import Any
+
+from aiohttp import web
+from asgiref.sync import sync_to_async
+import discord
+from django.db import connection
+
+from services.bot import scanner
+from services.bot.config import HEALTH_DB_PING_SECONDS, HEALTH_HOST, HEALTH_PORT
+from services.bot.jobs import JobScheduler
+from services.bot.metrics import Histogram
+from services.bot.outbound import outbound
+from services.bot.query_log import query_duration
+from services.bot.snowflake import time_for_snowflake
+from services.bot.watchdog import event_loop_lag, event_loop_stalls
+
+logger = logging.getLogger(__name__)
+
+database_ping = Histogram("db.ping", "Time taken to run a trivial query, including waiting for its thread", "ms")
+
+
+@dataclass
+class GatewayStatus:
+    connected: bool = False
+    connected_at: datetime | None = None
+    disconnected_at: datetime | None = None
+    reconnects: int = 0
+    last_event_at: datetime | None = None
+
+
+@dataclass
+class DatabaseStatus:
+    ping_ms: float | None = None
+    checked_at: datetime | None = None
+    error: str | None = None
+
+
+# Updated by the client as gateway events come in
+gateway_status = GatewayStatus()
+
+
+def on_gateway_connect() -> None:
+    now = datetime.now(timezone.utc)
+    if gateway_status.connected_at is not None:
+        gateway_status.reconnects += 1
+    gateway_status.connected = True
+    gateway_status.connected_at = now
+    gateway_status.last_event_at = now
+
+
+def on_gateway_disconnect() -> None:
+    gateway_status.connected = False
+    gateway_status.disconnected_at = datetime.now(timezone.utc)
+
+
+def on_gateway_event() -> None:
+    gateway_status.last_event_at = datetime.now(timezone.utc)
+
+
+class HealthServer:
+    """
+    Serves the state of the bot as JSON for an orchestrator to probe. `/health` answers as long as the event
+    loop is running, `/ready` answers with a 503 unless the client is connected to the gateway and the database
+    answered recently. Everything is read from values the bot keeps in memory, the only database access is a
+    trivial query run every HEALTH_DB_PING_SECONDS in the background, so probing costs nothing extra.
+    """
+
+    def __init__(
+        self, client: discord.Client, scheduler: JobScheduler, host: str = HEALTH_HOST, port: int = HEALTH_PORT
+    ) -> None:
+        self.client = client
+        self.scheduler = scheduler
+        self.host = host
+        self.port = port
+        self.database = DatabaseStatus()
+        self._runner: web.AppRunner | None = None
+        self._ping_task: asyncio.Task[None] | None = None
+
+        self.app = web.Application()
+        self.app.router.add_get("/health", self._health)
+        self.app.router.add_get("/ready", self._ready)
+
+    async def start(self) -> None:
+        self._ping_task = asyncio.create_task(self._ping_database())
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"Serving health checks on {self.host}:{self.port}")
+
+    async def stop(self) -> None:
+        if self._ping_task is not None:
+            self._ping_task.cancel()
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def is_ready(self) -> bool:
+        if not gateway_status.connected or not self.client.is_ready() or self.client.is_closed():
+            return False
+
+        checked_at = self.database.checked_at
+        stale = datetime.now(timezone.utc) - timedelta(seconds=HEALTH_DB_PING_SECONDS * 3)
+        return self.database.error is None and checked_at is not None and checked_at > stale
+
+    def get_status(self) -> dict[str, Any]:
+        now = datetime.now(timezone.utc)
+        return {
+            "ready": self.is_ready(),
+            "gateway": {
+                "connected": gateway_status.connected,
+                "client_ready": self.client.is_ready(),
+                "latency_ms": _round(self.client.latency * 1000),
+                "connected_at": _format_time(gateway_status.connected_at),
+                "disconnected_at": _format_time(gateway_status.disconnected_at),
+                "reconnects": gateway_status.reconnects,
+                "last_event_at": _format_time(gateway_status.last_event_at),
+            },
+            "ingest": {
+                "messages_in_flight": scanner.messages_in_flight,
+                "game_writes": scanner.game_writes.value,
+                "last_store_ms": _round(scanner.store_duration.last),
+                "outbound_waiting": outbound.waiting,
+            },
+            "scans": {
+                str(channel_id): {
+                    "scanning": status.scanning,
+                    "scanned_until": _format_time(_time_for_message(status.scanned_until)),
+                    # A channel with no new messages has nothing to catch up on however long ago its last one was,
+                    # so the backlog is reported as how long the scan catching up has been running
+                    "scanning_seconds": _round(_get_scanning(status, now)),
+                    "messages": status.messages,
+                    "started_at": _format_time(status.started_at),
+                    "finished_at": _format_time(status.finished_at),
+                    "error": status.error,
+                }
+                for channel_id, status in scanner.scan_statuses.items()
+            },
+            "jobs": {
+                id: {
+                    "next_run_at": _format_time(self.scheduler.get_next_run_time(id)),
+                    "last_run_at": _format_time(status.last_run_at),
+                    "last_error": status.last_error,
+                }
+                for id, status in self.scheduler.jobs.items()
+            },
+            "database": {
+                "ping_ms": _round(self.database.ping_ms),
+                "checked_at": _format_time(self.database.checked_at),
+                "error": self.database.error,
+                "last_query_ms": _round(query_duration.last),
+            },
+            "event_loop": {
+                "lag_ms": _round(event_loop_lag.last),
+                "stalls": event_loop_stalls.value,
+            },
+        }
+
+    async def _health(self, request: web.Request) -> web.Response:
+        return web.json_response(self.get_status())
+
+    async def _ready(self, request: web.Request) -> web.Response:
+        status = self.get_status()
+        return web.json_response(status, status=200 if status["ready"] else 503)
+
+    async def _ping_database(self) -> None:
+        while True:
+            started = time.perf_counter()
+            try:
+                await sync_to_async(_ping)()
+                self.database.ping_ms = (time.perf_counter() - started) * 1000
+                self.database.error = None
+                database_ping.record(self.database.ping_ms)
+            except Exception as ex:
+                self.database.error = str(ex)
+                logger.warning("Database health check failed: %s", ex, exc_info=ex)
+
+            self.database.checked_at = datetime.now(timezone.utc)
+            await asyncio.sleep(HEALTH_DB_PING_SECONDS)
+
+
+def _ping() -> None:
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+
+
+def _time_for_message(message_id: int | None) -> datetime | None:
+    return time_for_snowflake(message_id) if message_id is not None else None
+
+
+def _get_scanning(status: scanner.ScanStatus, now: datetime) -> float | None:
+    if not status.scanning or status.started_at is None:
+        return None
+    return (now - status.started_at).total_seconds()
+
+
+def _format_time(value: datetime | None) -> str | None:
+    return value.isoformat() if value is not None else None
+
+
+def _round(value: float | None) -> float | None:
+    # The gateway latency is nan until the first heartbeat, which is not valid JSON
+    return round(value, 2) if value is not None and not math.isnan(value) else None
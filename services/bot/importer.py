@@ -0,0 +1,243 @@
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import date
+import logging
+import os
+from pathlib import Path
+from typing import Any, Iterator
+
+from django.db.models import Q
+
+from apps.core.models import WordleChannel, WordleGame
+from services.bot.chat_export import (
+    ChatExportError,
+    ChatExportReader,
+    ExportedMessage,
+    get_export_watermark,
+    parse_exported_messages,
+)
+from services.bot.daily_results import invalidate_daily_results
+from services.bot.difficulty import refresh_difficulty
+from services.bot.duplicates import recompute_duplicates
+from services.bot.parser import GameResult
+from services.bot.ratings import invalidate_ratings
+from services.bot.scanner import content_fingerprint, get_game_fields
+from services.bot.snowflake import snowflake_for_time
+from services.bot.timezones import get_timezone
+from services.bot.watermarks import mark_channel_changed
+from services.bot.window_totals import invalidate_window_totals
+
+logger = logging.getLogger(__name__)
+
+PARSE_BATCH_SIZE = 1000
+INSERT_BATCH_SIZE = 500
+
+
+class ImporterError(Exception):
+    pass
+
+
+@dataclass
+class ImportResult:
+    channel_id: int
+    messages: int = 0
+    games: int = 0
+    inserted: int = 0
+    last_message_id: int | None = None
+
+
+def import_chat_export(
+    path: Path,
+    channel_id: int | None = None,
+    workers: int | None = None,
+    parse_batch_size: int = PARSE_BATCH_SIZE,
+    insert_batch_size: int = INSERT_BATCH_SIZE,
+) -> ImportResult:
+    reader = ChatExportReader.open(path)
+    try:
+        messages = iter(reader)
+        first = next(messages, None)
+        channel = _get_or_create_channel(reader.metadata, channel_id)
+        result = ImportResult(channel_id=channel.channel_id)
+        if first is None:
+            return result
+
+        workers = workers or os.cpu_count() or 1
+        batches = _batch(_chain(first, messages), parse_batch_size)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            games = _parse_in_order(pool, workers, batches, result)
+            _insert_games(channel, games, insert_batch_size, result)
+
+        _update_last_seen_message(channel, result.last_message_id)
+        # Games already in the channel were not seen above, so make sure their flags agree with the import
+        changed = recompute_duplicates(channel.channel_id)
+        if result.inserted > 0:
+            # Recomputing duplicates already refreshed everything that depends on the games if any flags changed
+            if changed == 0:
+                invalidate_daily_results(channel.channel_id)
+                invalidate_ratings(channel.channel_id)
+                invalidate_window_totals(channel.channel_id)
+                refresh_difficulty()
+            mark_channel_changed(channel.channel_id, result.last_message_id)
+
+    except ChatExportError as ex:
+        raise ImporterError(f"Unable to read chat export {path}: {ex}") from ex
+    finally:
+        reader.close()
+
+    logger.info(
+        f"Imported {result.inserted} new games from {result.messages} messages",
+        extra={"channel_id": channel.channel_id},
+    )
+    return result
+
+
+def _get_or_create_channel(metadata: dict[str, Any], channel_id: int | None) -> WordleChannel:
+    if channel_id is None:
+        try:
+            channel_id = int(metadata["channel"]["id"])
+        except (KeyError, TypeError, ValueError):
+            raise ImporterError("Chat export does not contain a channel id, pass one explicitly")
+
+    try:
+        guild_id = int(metadata["guild"]["id"])
+    except (KeyError, TypeError, ValueError):
+        raise ImporterError("Chat export does not contain a guild id")
+
+    # Everything up to the watermark is covered by the export, so the live scanner only needs to
+    # pick up messages after it. Setting this up front means the scanner never walks the history we
+    # are busy importing, if the import fails part way through it can simply be run again.
+    watermark = get_export_watermark(metadata)
+    last_seen_message = snowflake_for_time(watermark) if watermark is not None else None
+
+    channel, created = WordleChannel.objects.get_or_create(
+        channel_id=channel_id,
+        defaults=dict(
+            guild_id=guild_id,
+            last_seen_message=last_seen_message,
+            daily_summary_enabled=True,
+            daily_reminder_enabled=True,
+        ),
+    )
+    if not created and channel.guild_id != guild_id:
+        raise ImporterError(f"Channel {channel_id} belongs to guild {channel.guild_id}, not {guild_id}")
+
+    if channel.last_seen_message is None and last_seen_message is not None:
+        channel.last_seen_message = last_seen_message
+        channel.save(update_fields=["last_seen_message"])
+
+    return channel
+
+
+def _chain(first: ExportedMessage, rest: Iterator[ExportedMessage]) -> Iterator[ExportedMessage]:
+    yield first
+    yield from rest
+
+
+def _batch(messages: Iterator[ExportedMessage], size: int) -> Iterator[list[ExportedMessage]]:
+    batch = []
+    for message in messages:
+        batch.append(message)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+
+    if len(batch) > 0:
+        yield batch
+
+
+def _parse_in_order(
+    pool: ProcessPoolExecutor, workers: int, batches: Iterator[list[ExportedMessage]], result: ImportResult
+) -> Iterator[tuple[ExportedMessage, GameResult]]:
+    # Only keep a couple of batches per worker in flight so memory does not grow with the file size,
+    # results are consumed in submission order so duplicate detection still sees messages in order
+    max_in_flight = workers * 2
+    in_flight: deque[Future[list[tuple[ExportedMessage, GameResult]]]] = deque()
+
+    for batch in batches:
+        result.messages += len(batch)
+        result.last_message_id = batch[-1].message_id
+        in_flight.append(pool.submit(parse_exported_messages, batch))
+        if len(in_flight) >= max_in_flight:
+            yield from in_flight.popleft().result()
+
+    while len(in_flight) > 0:
+        yield from in_flight.popleft().result()
+
+
+def _insert_games(
+    channel: WordleChannel,
+    games: Iterator[tuple[ExportedMessage, GameResult]],
+    batch_size: int,
+    result: ImportResult,
+) -> None:
+    # Exports are ordered oldest first and a duplicate is always posted on the same day as the
+    # original, so we only need to remember who has played what on the current day
+    current_day: date | None = None
+    played_today: set[tuple[int, str, int]] = set()
+    pending: list[WordleGame] = []
+    last_message_id = 0
+    tz = get_timezone(channel.timezone)
+
+    for message, game in games:
+        if message.message_id <= last_message_id:
+            raise ImporterError(f"Chat export is not ordered oldest first at message {message.message_id}")
+        last_message_id = message.message_id
+        result.games += 1
+
+        day = message.posted_at.astimezone(tz).date()
+        if day != current_day:
+            current_day = day
+            played_today = set()
+
+        key = (message.author_id, game.puzzle_type, game.game_number)
+        is_duplicate = key in played_today
+        played_today.add(key)
+
+        pending.append(
+            WordleGame(
+                message_id=message.message_id,
+                **get_game_fields(
+                    game,
+                    channel.channel_id,
+                    message.author_id,
+                    message.posted_at,
+                    is_duplicate,
+                    content_fingerprint(message.content),
+                    tz,
+                ),
+            )
+        )
+        if len(pending) >= batch_size:
+            result.inserted += _flush(channel, pending)
+
+    result.inserted += _flush(channel, pending)
+
+
+def _update_last_seen_message(channel: WordleChannel, message_id: int | None) -> None:
+    if message_id is None:
+        return
+
+    WordleChannel.objects.filter(
+        Q(last_seen_message__isnull=True) | Q(last_seen_message__lt=message_id),
+        channel_id=channel.channel_id,
+    ).update(last_seen_message=message_id)
+
+
+def _flush(channel: WordleChannel, pending: list[WordleGame]) -> int:
+    if len(pending) == 0:
+        return 0
+
+    # Existing games win so re-running an import is harmless
+    existing = set(
+        WordleGame.objects.filter(message_id__in=[game.message_id for game in pending]).values_list(
+            "message_id", flat=True
+        )
+    )
+    # Archived games are already in the archive, the rest are archived along with the channel's other games
+    archived_until = channel.archived_until if channel.archived_until is not None else -1
+    new_games = [game for game in pending if game.message_id not in existing and game.message_id > archived_until]
+    WordleGame.objects.bulk_create(new_games, ignore_conflicts=True)
+    pending.clear()
+    return len(new_games)
@@ -1,21 +1,42 @@
 from asyncio import AbstractEventLoop
 import asyncio
-from datetime import datetime, timedelta
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from apscheduler.events import EVENT_JOB_ERROR, EVENT_JOB_EXECUTED, EVENT_JOB_MISSED, JobExecutionEvent
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.jobstores.base import JobLookupError
 from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from apscheduler.triggers.base import BaseTrigger
 from apscheduler.triggers.cron import CronTrigger
 import logging
+from typing import Any, Callable
 import discord
 
 from apps.core.models import WordleChannel
-from services.bot.config import CLIENT_WAIT_TIMEOUT, TIMEZONE
-from services.bot.scanner import scan_unseen_messages
+from services.bot.archive import archive_old_games
+from services.bot.backup import backup_database
+from services.bot.config import (
+    CLIENT_WAIT_TIMEOUT,
+    MEMORY_LOG_INTERVAL_MINUTES,
+    SCHEDULE_BUCKET_MINUTES,
+    SCHEDULE_GRACE_MINUTES,
+    TIMEZONE,
+)
+from services.bot.memory import log_memory_stats
+from services.bot.outbound import Priority, with_request_priority
+from services.bot.ratings import update_all_ratings
+from services.bot.reconciler import reconcile_deleted_games
+from services.bot.scanner import prune_fingerprints, scan_unseen_messages
+from services.bot.schedule import DailyPost, get_due_channels, get_post_game_number, schedule_next_posts
 from services.bot.summarizer import Summarizer
-from services.bot.utils import game_number_for_day
+from services.bot.timezones import get_timezone
 from wordletracker.settings import DB_PATH
 
 logger = logging.getLogger(__name__)
 
+# Jobs which used to be scheduled, which may still be in the job store
+OBSOLETE_JOBS = ["daily_summary", "daily_reminder"]
+
 
 class Services:
     def __init__(self, client: discord.Client) -> None:
@@ -26,6 +47,13 @@ class Services:
 services: Services | None = None
 
 
+@dataclass
+class JobStatus:
+    trigger: BaseTrigger
+    last_run_at: datetime | None = None
+    last_error: str | None = None
+
+
 class JobScheduler:
     def __init__(self, event_loop: AbstractEventLoop, client: discord.Client) -> None:
         global services
@@ -38,101 +66,139 @@ class JobScheduler:
             event_loop=event_loop,
             timezone=TIMEZONE,
         )
-        self.scheduler.add_job(
-            _daily_summary,
-            CronTrigger(hour=9, minute=0, second=0, timezone=TIMEZONE),
-            id="daily_summary",
-            replace_existing=True,
+        # Tracked here as well, as reading the jobs back from the scheduler goes to its database
+        self.jobs: dict[str, JobStatus] = {}
+        self.scheduler.add_listener(self._on_job_event, EVENT_JOB_EXECUTED | EVENT_JOB_ERROR | EVENT_JOB_MISSED)
+        self._add_job(
+            _daily_posts, CronTrigger(minute=f"*/{SCHEDULE_BUCKET_MINUTES}", timezone=TIMEZONE), "daily_posts"
+        )
+        self._add_job(_scan_unseen_messages, CronTrigger(minute="*/5", timezone=TIMEZONE), "scan_unseen_messages")
+        self._add_job(
+            prune_fingerprints, CronTrigger(hour=4, minute=0, second=0, timezone=TIMEZONE), "prune_fingerprints"
+        )
+        self._add_job(
+            archive_old_games, CronTrigger(hour=4, minute=30, second=0, timezone=TIMEZONE), "archive_old_games"
         )
-        self.scheduler.add_job(
-            _daily_reminder,
-            CronTrigger(hour=21, minute=0, second=0, timezone=TIMEZONE),
-            id="daily_reminder",
-            replace_existing=True,
+        self._add_job(backup_database, CronTrigger(hour=3, minute=0, second=0, timezone=TIMEZONE), "backup_database")
+        self._add_job(
+            update_all_ratings, CronTrigger(hour=0, minute=15, second=0, timezone=TIMEZONE), "update_all_ratings"
         )
-        self.scheduler.add_job(
-            _scan_unseen_messages,
-            CronTrigger(minute="*/5", timezone=TIMEZONE),
-            id="scan_unseen_messages",
-            replace_existing=True,
+        self._add_job(
+            _reconcile_deleted_games, CronTrigger(minute="2-59/10", timezone=TIMEZONE), "reconcile_deleted_games"
         )
+        self._add_job(
+            log_memory_stats,
+            CronTrigger(minute=f"*/{MEMORY_LOG_INTERVAL_MINUTES}", timezone=TIMEZONE),
+            "log_memory_stats",
+        )
+
+    def _add_job(self, function: Callable[..., Any], trigger: BaseTrigger, id: str) -> None:
+        self.scheduler.add_job(function, trigger, id=id, replace_existing=True)
+        self.jobs[id] = JobStatus(trigger)
+
+    def _on_job_event(self, event: JobExecutionEvent) -> None:
+        status = self.jobs.get(event.job_id)
+        if status is None:
+            return
+
+        status.last_run_at = event.scheduled_run_time
+        if event.code == EVENT_JOB_MISSED:
+            status.last_error = "Missed"
+        else:
+            status.last_error = str(event.exception) if event.exception is not None else None
+
+    def get_next_run_time(self, id: str) -> datetime | None:
+        return self.jobs[id].trigger.get_next_fire_time(None, datetime.now(TIMEZONE))
 
     def start(self) -> None:
         self.scheduler.start()
+        # Removed before the scheduler first wakes up, so it does not try to load jobs whose functions are gone
+        for id in OBSOLETE_JOBS:
+            try:
+                self.scheduler.remove_job(id)
+            except JobLookupError:
+                pass
 
     def shutdown(self) -> None:
         if self.scheduler.running:
             self.scheduler.shutdown()
 
 
+@with_request_priority(Priority.BACKFILL)
 async def _scan_unseen_messages() -> None:
     assert services is not None, "Services must exist for jobs to run"
     await scan_unseen_messages(services.client)
 
 
-async def _daily_summary() -> None:
+@with_request_priority(Priority.BACKFILL)
+async def _reconcile_deleted_games() -> None:
     assert services is not None, "Services must exist for jobs to run"
-    logger.info("Daily summary running")
+    await reconcile_deleted_games(services.client)
 
-    await asyncio.wait_for(services.client.wait_until_ready(), timeout=CLIENT_WAIT_TIMEOUT)
-    yesterday = datetime.now(TIMEZONE).today().date() - timedelta(days=1)
-    game_number = game_number_for_day(yesterday)
-    if game_number is None:
-        logger.error(f"Failed to get game number for yesterday: {yesterday}")
-        return
 
-    async for wordle_channel in WordleChannel.objects.aiterator():
-        if not wordle_channel.daily_summary_enabled:
+@with_request_priority(Priority.DAILY_POST)
+async def _daily_posts() -> None:
+    """
+    Posts the daily summaries and reminders which have come due since the last bucket. Channels are only read
+    when they are due, so a run costs the same however many channels are tracked, and the channels due in a
+    bucket are posted to in one run rather than each having a job of their own.
+    """
+    assert services is not None, "Services must exist for jobs to run"
+    now = datetime.now(timezone.utc)
+    late = now - timedelta(minutes=SCHEDULE_GRACE_MINUTES)
+    for post in DailyPost:
+        channels = await get_due_channels(post, now)
+        if len(channels) == 0:
             continue
 
-        channel = await services.client.fetch_channel(wordle_channel.channel_id)
-        if not isinstance(channel, discord.TextChannel):
+        # Moved on before posting, so a channel which fails to post is not tried again every bucket
+        await schedule_next_posts(post, channels, now)
+        # Channels which have not been scheduled before are only scheduled
+        due = [channel for channel in channels if getattr(channel, post.due_field) is not None]
+        if len(due) == 0:
             continue
 
-        try:
-            summarizer = Summarizer(channel)
+        logger.info(f"Daily {post.value} running for {len(due)} channels")
+        await asyncio.wait_for(services.client.wait_until_ready(), timeout=CLIENT_WAIT_TIMEOUT)
+        for wordle_channel in due:
+            due_at: datetime = getattr(wordle_channel, post.due_field)
+            if due_at < late:
+                logger.warning(
+                    f"Skipped daily {post.value} due at {due_at.isoformat()}, as it is too late to post",
+                    extra={"guild_id": wordle_channel.guild_id, "channel_id": wordle_channel.channel_id},
+                )
+                continue
 
-            results = await summarizer.get_daily_results(game_number)
-            await channel.send(embed=results)
-        except Exception as ex:
-            logger.error(
-                "Unable to post daily summary to channel: %s",
-                ex,
-                exc_info=ex,
-                extra={"guild_id": channel.guild.id, "channel_id": channel.id},
-            )
+            await _send_daily_post(wordle_channel, post, due_at)
 
-    logger.info("Daily summary finished")
+        logger.info(f"Daily {post.value} finished")
 
 
-async def _daily_reminder() -> None:
+async def _send_daily_post(wordle_channel: WordleChannel, post: DailyPost, due_at: datetime) -> None:
     assert services is not None, "Services must exist for jobs to run"
-    logger.info("Daily reminder running")
-    await asyncio.wait_for(services.client.wait_until_ready(), timeout=CLIENT_WAIT_TIMEOUT)
-    today = datetime.now(TIMEZONE).today().date()
-    game_number = game_number_for_day(today)
+    # The days of the post are the channel's own, so it is yesterday's game or today's wherever the channel is
+    game_number = get_post_game_number(post, get_timezone(wordle_channel.timezone), due_at)
     if game_number is None:
-        logger.error(f"Failed to get game number for today: {today}")
+        logger.error(f"Failed to get game number for daily {post.value} due at {due_at.isoformat()}")
         return
 
-    async for wordle_channel in WordleChannel.objects.aiterator():
-        if not wordle_channel.daily_reminder_enabled:
-            continue
-
+    try:
         channel = await services.client.fetch_channel(wordle_channel.channel_id)
         if not isinstance(channel, discord.TextChannel):
-            continue
-
-        try:
-            summarizer = Summarizer(channel)
-            reminder = await summarizer.get_daily_reminder(game_number)
-            if reminder is not None:
-                await channel.send(embed=reminder)
-
-        except Exception as ex:
-            logger.error(
-                "Unable to post daily reminder to channel: %s",
-                ex,
-                exc_info=ex,
-                extra={"guild_id": channel.guild.id, "channel_id": channel.id},
-            )
+            return
+
+        summarizer = Summarizer(channel)
+        if post == DailyPost.SUMMARY:
+            embed: discord.Embed | None = await summarizer.get_daily_results(game_number)
+        else:
+            embed = await summarizer.get_daily_reminder(game_number)
+
+        if embed is not None:
+            await channel.send(embed=embed)
+    except Exception as ex:
+        logger.error(
+            f"Unable to post daily {post.value} to channel: %s",
+            ex,
+            exc_info=ex,
+            extra={"guild_id": wordle_channel.guild_id, "channel_id": wordle_channel.channel_id},
+        )
@@ -8,30 +8,49 @@ import logging
 from dotenv import load_dotenv
 
 from services.bot.logging import setup_logging
+from services.bot.metrics import setup_metrics
 
 load_dotenv(Path.cwd() / ".env")
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "wordletracker.settings")
 setup_logging()
+setup_metrics()
 django.setup()
 
 # The above code needs to be ran before the rest of the app is imported
+from services.bot.diagnostics import start_tracing, stop_tracing, write_report  # noqa: E402
+from services.bot.config import WARM_RESTART  # noqa: E402
 from services.bot.startup import run  # noqa: E402
+from services.bot.warm_cache import load_snapshot, write_snapshot  # noqa: E402
 
 logger = logging.getLogger(__name__)
 
+# The event loop only keeps weak references to tasks, so ones nothing waits on are kept here until they finish
+_background_tasks: set[asyncio.Task[None]] = set()
+
 
 async def main() -> int:
+    if WARM_RESTART:
+        await _load_cache_snapshot()
+
     application = asyncio.create_task(run())
 
     def handle_signal(signal: signal.Signals) -> None:
         logger.info(f"Got {signal.name} signal, sending cancellation request")
         application.cancel()
 
+    def handle_diagnostics_signal() -> None:
+        logger.info("Got SIGUSR1 signal, writing memory report")
+        task = asyncio.create_task(_write_memory_report())
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
     # Signals only supported on unix type systems
     try:
         loop = asyncio.get_running_loop()
         for shutdown_signal in (signal.SIGTERM, signal.SIGINT):
             loop.add_signal_handler(shutdown_signal, handle_signal, shutdown_signal)
+        loop.add_signal_handler(signal.SIGUSR1, handle_diagnostics_signal)
+        loop.add_signal_handler(signal.SIGUSR2, stop_tracing)
     except Exception as ex:
         logger.warning("Failed to register signal handlers (are you using windows?) %s", ex, exc_info=ex)
 
@@ -42,10 +61,37 @@ async def main() -> int:
         return 1
     except asyncio.exceptions.CancelledError:
         logger.warning("App shutdown due to cancellation request")
+        # Only written on a graceful shutdown, as the caches may not be trusted after an error
+        if WARM_RESTART:
+            await _write_cache_snapshot()
 
     return 0
 
 
+async def _load_cache_snapshot() -> None:
+    try:
+        await load_snapshot()
+    except Exception as ex:
+        logger.error("Error loading cache snapshot: %s", ex, exc_info=ex)
+
+
+async def _write_cache_snapshot() -> None:
+    try:
+        await asyncio.to_thread(write_snapshot)
+    except Exception as ex:
+        logger.error("Error writing cache snapshot: %s", ex, exc_info=ex)
+
+
+async def _write_memory_report() -> None:
+    try:
+        await asyncio.to_thread(write_report)
+    except Exception as ex:
+        logger.error("Error writing memory report: %s", ex, exc_info=ex)
+
+    # Tracing is started by the first signal, so the reports after it include allocation sites
+    start_tracing()
+
+
 if __name__ == "__main__":
     exit_code = asyncio.run(main())
     sys.exit(exit_code)
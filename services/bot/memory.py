@@ -0,0 +1,97 @@
+from dataclasses import dataclass
+import logging
+import os
+import sys
+
+import discord
+
+from services.bot.metrics import Gauge
+
+logger = logging.getLogger(__name__)
+
+# The client whose caches are reported, set once it has been created
+_client: discord.Client | None = None
+
+
+@dataclass
+class MemoryStats:
+    rss: int
+    peak_rss: int
+    allocated_blocks: int
+    guilds: int
+    channels: int
+    cached_messages: int
+    cached_members: int
+
+
+def track_client(client: discord.Client) -> None:
+    global _client
+    _client = client
+
+
+def get_rss() -> int:
+    """Current resident set size of the process in bytes, only available on linux"""
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def get_peak_rss() -> int:
+    try:
+        import resource
+    except ImportError:
+        # Not available on windows
+        return 0
+
+    # Reported in kilobytes on linux, but bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def get_memory_stats() -> MemoryStats:
+    return MemoryStats(
+        rss=get_rss(),
+        peak_rss=get_peak_rss(),
+        allocated_blocks=sys.getallocatedblocks(),
+        guilds=_count_guilds(),
+        channels=sum(len(guild.channels) for guild in _get_guilds()),
+        cached_messages=_count_cached_messages(),
+        cached_members=_count_cached_members(),
+    )
+
+
+async def log_memory_stats() -> None:
+    stats = get_memory_stats()
+    logger.info(
+        f"Memory: rss={stats.rss // 2**20}MiB peak_rss={stats.peak_rss // 2**20}MiB "
+        f"allocated_blocks={stats.allocated_blocks} guilds={stats.guilds} channels={stats.channels} "
+        f"cached_messages={stats.cached_messages} cached_members={stats.cached_members}"
+    )
+
+
+def _get_guilds() -> list[discord.Guild]:
+    return list(_client.guilds) if _client is not None else []
+
+
+def _count_guilds() -> int:
+    return len(_get_guilds())
+
+
+def _count_cached_messages() -> int:
+    return len(_client.cached_messages) if _client is not None else 0
+
+
+def _count_cached_members() -> int:
+    return sum(len(guild.members) for guild in _get_guilds())
+
+
+rss = Gauge("process.memory.rss", "Resident set size of the bot process", "By", get_rss)
+peak_rss = Gauge("process.memory.peak_rss", "Largest resident set size of the bot process", "By", get_peak_rss)
+allocated_blocks = Gauge(
+    "process.python.allocated_blocks", "Memory blocks held by the Python allocator", "1", sys.getallocatedblocks
+)
+cached_guilds = Gauge("discord.cache.guilds", "Guilds held by the client", "1", _count_guilds)
+cached_messages = Gauge("discord.cache.messages", "Messages held by the client", "1", _count_cached_messages)
+cached_members = Gauge("discord.cache.members", "Members held by the client", "1", _count_cached_members)
@@ -0,0 +1,65 @@
+import os
+from typing import Callable, Iterable
+
+from opentelemetry import metrics
+from opentelemetry.metrics import CallbackOptions, Observation
+from opentelemetry.exporter.otlp.proto.grpc.metric_exporter import OTLPMetricExporter
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.util.types import Attributes
+
+from services.bot.logging import get_attributes
+
+# Instruments can be created before setup_metrics is called, they are bound to the provider once it is set
+meter = metrics.get_meter("wordle-tracker")
+
+
+def setup_metrics() -> None:
+    if os.getenv("DEBUG") == "TRUE":
+        return
+
+    reader = PeriodicExportingMetricReader(OTLPMetricExporter())
+    provider = MeterProvider(resource=Resource.create(get_attributes()), metric_readers=[reader])
+    metrics.set_meter_provider(provider)
+
+
+class Counter:
+    """An OpenTelemetry counter which also keeps its total in process so it can be reported directly"""
+
+    def __init__(self, name: str, description: str, unit: str = "1") -> None:
+        self.value = 0
+        self._counter = meter.create_counter(name, unit=unit, description=description)
+
+    def add(self, amount: int = 1, attributes: Attributes = None) -> None:
+        self.value += amount
+        self._counter.add(amount, attributes)
+
+
+class Histogram:
+    """An OpenTelemetry histogram which also keeps the count and last value in process"""
+
+    def __init__(self, name: str, description: str, unit: str = "1") -> None:
+        self.count = 0
+        self.last: float | None = None
+        self._histogram = meter.create_histogram(name, unit=unit, description=description)
+
+    def record(self, value: float, attributes: Attributes = None) -> None:
+        self.count += 1
+        self.last = value
+        self._histogram.record(value, attributes)
+
+
+class Gauge:
+    """An OpenTelemetry gauge which is read from a callback each time metrics are exported, or directly"""
+
+    def __init__(self, name: str, description: str, unit: str, callback: Callable[[], float]) -> None:
+        self.callback = callback
+        meter.create_observable_gauge(name, callbacks=[self._observe], unit=unit, description=description)
+
+    @property
+    def value(self) -> float:
+        return self.callback()
+
+    def _observe(self, options: CallbackOptions) -> Iterable[Observation]:
+        yield Observation(self.callback())
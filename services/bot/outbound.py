@@ -0,0 +1,239 @@
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from dataclasses import dataclass, field
+import enum
+import heapq
+import itertools
+import logging
+import time
+import unittest
+from typing import Any, Awaitable, Callable, Iterator, ParamSpec, TypeVar
+
+from discord.http import HTTPClient, Route
+
+from services.bot.config import OUTBOUND_BACKFILL_RESERVE, OUTBOUND_BUCKET_RATE, OUTBOUND_BURST, OUTBOUND_RATE
+from services.bot.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+# Buckets which are full and have nobody waiting are forgotten once there are more than this many
+MAX_IDLE_BUCKETS = 256
+
+queue_wait = Histogram("outbound.queue_wait", "Time requests to discord spent waiting for a rate limit token", "ms")
+
+
+class Priority(enum.IntEnum):
+    """Lower values go first"""
+
+    INTERACTION = 0
+    DAILY_POST = 1
+    BACKFILL = 2
+
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+_priority: ContextVar[Priority] = ContextVar("outbound_priority", default=Priority.INTERACTION)
+
+
+@contextmanager
+def request_priority(priority: Priority) -> Iterator[None]:
+    """
+    Sets the priority of discord requests made within the block, including from tasks started inside it.
+    Anything which is not marked is treated as an interaction, so a user is never stuck behind background work.
+    """
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def with_request_priority(priority: Priority) -> Callable[[Callable[P, Awaitable[T]]], Callable[P, Awaitable[T]]]:
+    """Runs the decorated coroutine function under `request_priority`"""
+
+    def decorator(function: Callable[P, Awaitable[T]]) -> Callable[P, Awaitable[T]]:
+        @wraps(function)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+            with request_priority(priority):
+                return await function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float, now: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, reserve: float = 0) -> float:
+        """Seconds until a token can be taken while leaving `reserve` tokens behind"""
+        missing = 1 + reserve - self.tokens
+        return max(missing / self.rate, 0)
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: Priority
+    sequence: int
+    bucket: str = field(compare=False)
+    queued_at: float = field(compare=False)
+    future: "asyncio.Future[None]" = field(compare=False)
+
+
+class RequestScheduler:
+    """
+    Hands out tokens for requests to discord, from a global bucket shared by every request and a bucket per
+    rate limit route. Waiting requests are served in priority order, and backfill can not use the last few
+    global tokens so that interactions always have some available straight away. Discord.py still handles
+    the real rate limits, this keeps background work far enough under them that it never trips them.
+    """
+
+    def __init__(
+        self,
+        rate: float = OUTBOUND_RATE,
+        burst: float = OUTBOUND_BURST,
+        bucket_rate: float = OUTBOUND_BUCKET_RATE,
+        backfill_reserve: float = OUTBOUND_BACKFILL_RESERVE,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.bucket_rate = bucket_rate
+        self.backfill_reserve = backfill_reserve
+        self.clock = clock
+        # At most `burst + rate` requests can be sent in any second, keep that under discord's global limit
+        self._global = TokenBucket(rate, burst, clock())
+        self._buckets: dict[str, TokenBucket] = {}
+        self._waiters: list[_Waiter] = []
+        self._sequence = itertools.count()
+        self._timer: asyncio.TimerHandle | None = None
+
+    def install(self, http: HTTPClient) -> None:
+        """Makes every request sent by the client wait for a token first"""
+        request = http.request
+
+        async def scheduled_request(route: Route, **kwargs: Any) -> Any:
+            await self.acquire(f"{route.key}:{route.major_parameters}")
+            return await request(route, **kwargs)
+
+        http.request = scheduled_request  # type: ignore[method-assign]
+
+    async def acquire(self, bucket: str, priority: Priority | None = None) -> None:
+        priority = priority if priority is not None else _priority.get()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, _Waiter(priority, next(self._sequence), bucket, self.clock(), future))
+        self._dispatch()
+        await future
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def _dispatch(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        now = self.clock()
+        self._global.refill(now)
+        blocked: list[_Waiter] = []
+        next_attempt: float | None = None
+        global_blocked = False
+
+        while len(self._waiters) > 0:
+            waiter = heapq.heappop(self._waiters)
+            if waiter.future.done():
+                # Cancelled while waiting
+                continue
+
+            bucket = self._get_bucket(waiter.bucket, now)
+            reserve = self.backfill_reserve if waiter.priority == Priority.BACKFILL else 0
+            global_wait = self._global.wait_time(reserve)
+            wait = max(global_wait, bucket.wait_time())
+            # Once something is waiting on the global bucket, nothing behind it may take a global token
+            if wait > 0 or global_blocked:
+                global_blocked = global_blocked or global_wait > 0
+                blocked.append(waiter)
+                if wait > 0:
+                    next_attempt = wait if next_attempt is None else min(next_attempt, wait)
+                continue
+
+            self._global.tokens -= 1
+            bucket.tokens -= 1
+            waiter.future.set_result(None)
+            queue_wait.record((now - waiter.queued_at) * 1000, {"priority": waiter.priority.name.lower()})
+
+        self._waiters = blocked
+        heapq.heapify(self._waiters)
+        if next_attempt is not None:
+            self._timer = asyncio.get_running_loop().call_later(next_attempt, self._dispatch)
+
+    def _get_bucket(self, key: str, now: float) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= MAX_IDLE_BUCKETS:
+                self._evict_idle_buckets(now)
+            # Requests on a route are spaced out evenly rather than sent in bursts
+            bucket = self._buckets[key] = TokenBucket(self.bucket_rate, 1, now)
+
+        bucket.refill(now)
+        return bucket
+
+    def _evict_idle_buckets(self, now: float) -> None:
+        waiting = {waiter.bucket for waiter in self._waiters}
+        for key, bucket in list(self._buckets.items()):
+            bucket.refill(now)
+            if bucket.tokens >= bucket.capacity and key not in waiting:
+                del self._buckets[key]
+
+
+outbound = RequestScheduler()
+
+
+class TestRequestScheduler(unittest.IsolatedAsyncioTestCase):
+    async def test_priority_order(self) -> None:
+        now = 0.0
+        scheduler = RequestScheduler(rate=10, burst=1, bucket_rate=100, backfill_reserve=0, clock=lambda: now)
+        await scheduler.acquire("a", Priority.BACKFILL)
+
+        order: list[Priority] = []
+
+        async def request(priority: Priority) -> None:
+            await scheduler.acquire("b", priority)
+            order.append(priority)
+
+        tasks = [asyncio.create_task(request(priority)) for priority in reversed(Priority)]
+        await asyncio.sleep(0)
+        self.assertEqual(scheduler.waiting, 3)
+
+        for _ in range(3):
+            now += 0.1
+            scheduler._dispatch()
+            await asyncio.sleep(0)
+
+        await asyncio.gather(*tasks)
+        self.assertEqual(order, sorted(Priority))
+
+    async def test_backfill_leaves_reserve(self) -> None:
+        scheduler = RequestScheduler(rate=1, burst=3, bucket_rate=100, backfill_reserve=2, clock=lambda: 0.0)
+        await scheduler.acquire("a", Priority.BACKFILL)
+        task = asyncio.create_task(scheduler.acquire("a", Priority.BACKFILL))
+        await asyncio.sleep(0)
+        self.assertFalse(task.done())
+
+        await scheduler.acquire("b", Priority.INTERACTION)
+        await scheduler.acquire("c", Priority.INTERACTION)
+        task.cancel()
+
+
+if __name__ == "__main__":
+    unittest.main()
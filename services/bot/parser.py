@@ -1,13 +1,20 @@
 from dataclasses import dataclass
+from datetime import date
 from enum import Enum
+from functools import partial
 import logging
-from typing import Optional
+import re
+from typing import Callable, Iterable, Optional
 import unittest
 import regex
 
+from services.bot.utils import WORDLE_EPOCH
+
 WORD_LENGTH = 5
 MAX_GUESSES = 6
 
+WORDLE = "wordle"
+
 logger = logging.getLogger(__name__)
 
 
@@ -23,26 +30,97 @@ class GameResult:
     is_win: bool
     is_hard_mode: bool
     guesses: list[list[LetterGuess]]
+    puzzle_type: str = WORDLE
+
+
+@dataclass(frozen=True)
+class PuzzleFormat:
+    """
+    A daily puzzle's share format. Lines starting with the prefix are checked with is_header, which should be
+    cheap as it runs on anything that happens to start the same way, and parse is given the lines of the
+    message from the header on. The epoch is the day before the puzzle's first game.
+    """
+
+    puzzle_type: str
+    prefix: str
+    is_header: Callable[[str], bool]
+    parse: Callable[[list[str]], Optional[GameResult]]
+    epoch: date
+
+    def game_number_for_day(self, day: date) -> int | None:
+        game_number = (day - self.epoch).days
+        return game_number if game_number > 0 else None
+
+
+class ParserRegistry:
+    """
+    The formats messages are parsed with. Their prefixes are compiled into a single pattern shaped like a trie,
+    so finding a header costs the same however many formats are registered, and messages which are not games,
+    which are most of them, are rejected without being split into lines.
+    """
+
+    def __init__(self, formats: Iterable[PuzzleFormat] = ()) -> None:
+        self._formats: dict[str, PuzzleFormat] = {}
+        self._by_prefix: dict[str, PuzzleFormat] = {}
+        self._pattern: re.Pattern[str] | None = None
+        for format in formats:
+            self.register(format)
+
+    def register(self, format: PuzzleFormat) -> None:
+        if format.puzzle_type in self._formats or format.prefix in self._by_prefix:
+            raise ValueError(f"A format for {format.puzzle_type} or starting with {format.prefix!r} already exists")
+
+        self._formats[format.puzzle_type] = format
+        self._by_prefix[format.prefix] = format
+        self._pattern = re.compile(f"^{_get_trie_pattern(self._by_prefix)}", re.MULTILINE)
+
+    def get(self, puzzle_type: str) -> PuzzleFormat:
+        return self._formats[puzzle_type]
+
+    def parse(self, message: str) -> Optional[GameResult]:
+        if self._pattern is None:
+            return None
+
+        # To catch cases were people put stuff before their result every line is checked for a header
+        for match in self._pattern.finditer(message):
+            format = self._by_prefix[match.group()]
+            end = message.find("\n", match.start())
+            if format.is_header(message[match.start() : end if end != -1 else None]):
+                return format.parse(message[match.start() :].split("\n"))
+
+        return None
+
+
+def _get_trie_pattern(prefixes: Iterable[str]) -> str:
+    trie: dict[str, dict] = {}
+    for prefix in prefixes:
+        node = trie
+        for character in prefix:
+            node = node.setdefault(character, {})
+        node[""] = {}
+
+    def build(node: dict[str, dict]) -> str:
+        # Longer prefixes are tried first, so a format whose prefix starts with another's still gets its messages
+        branches = [re.escape(character) + build(child) for character, child in sorted(node.items()) if character]
+        if "" in node:
+            branches.append("")
+        return branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+
+    return build(trie)
 
 
 def parse_message(message: str) -> Optional[GameResult]:
-    lines = message.split("\n")
+    return registry.parse(message)
 
-    start_index = 0
-    # To catch cases were people put stuff before their result we check each line to see if its
-    # a reasonable looking wordle result
-    while True:
-        if len(lines) == start_index:
-            return None
 
-        # A line starting with "Wordle " which has 3 words total is good enough of a match for us to
-        # start trying to parse it
-        if lines[start_index].startswith("Wordle "):
-            header = lines[start_index].split(" ")
-            if len(header) == 3:
-                break
+def _is_wordle_header(line: str) -> bool:
+    # A line starting with "Wordle " which has 3 words total is good enough of a match for us to
+    # start trying to parse it
+    return len(line.split(" ")) == 3
+
 
-        start_index += 1
+def _parse_wordle(lines: list[str]) -> Optional[GameResult]:
+    header = lines[0].split(" ")
 
     # Here we are quite confident that its a real wordle result so log any errors as
     # the noise should be fairly low
@@ -75,12 +153,12 @@ def parse_message(message: str) -> Optional[GameResult]:
         logger.warning("Wordle message contained invalid max", extra={"max": max})
         return None
 
-    if len(lines[start_index + 1]) != 0:
-        logger.warning("Wordle message did not contain empty second line", extra={"line1": lines[1]})
+    if len(lines) < 2 or len(lines[1]) != 0:
+        logger.warning("Wordle message did not contain empty second line", extra={"line1": lines[1:2]})
         return None
 
     guesses: list[list[LetterGuess]] = []
-    for line in lines[start_index + 2 :]:
+    for line in lines[2:]:
         guess = _parse_guess(line)
         if guess is None:
             logger.warning("Invalid guess parsed, assuming wordle result content is finished")
@@ -152,6 +230,15 @@ def _parse_letter_guess(letter_guess: str) -> Optional[LetterGuess]:
             return None
 
 
+registry = ParserRegistry(
+    [
+        PuzzleFormat(
+            puzzle_type=WORDLE, prefix="Wordle ", is_header=_is_wordle_header, parse=_parse_wordle, epoch=WORDLE_EPOCH
+        )
+    ]
+)
+
+
 class TestParser(unittest.TestCase):
     def test_parse_result(self) -> None:
         message = """Wordle 1,555 4/6*
@@ -208,6 +295,30 @@ Look at my result!
             ],
         )
 
+    def test_dispatches_by_prefix(self) -> None:
+        def parse_number(puzzle_type: str, lines: list[str]) -> GameResult:
+            return GameResult(int(lines[1]), True, False, [], puzzle_type)
+
+        registry = ParserRegistry()
+        for puzzle_type, prefix in [("wordle", "Wordle "), ("wordle-es", "Wordle (ES) "), ("worldle", "#Worldle ")]:
+            registry.register(
+                PuzzleFormat(
+                    puzzle_type=puzzle_type,
+                    prefix=prefix,
+                    is_header=lambda line: line.endswith("/6"),
+                    parse=partial(parse_number, puzzle_type),
+                    epoch=WORDLE_EPOCH,
+                )
+            )
+
+        self.assertIsNone(registry.parse("Wordle is fun\nWordles 1 1/6\n1"))
+        result = registry.parse("Wordle is fun\nWordle (ES) #1 1/6\n2")
+        self.assertEqual((result.game_number, result.puzzle_type) if result else None, (2, "wordle-es"))
+        result = registry.parse("Look\n#Worldle #3 1/6\n3")
+        self.assertEqual((result.game_number, result.puzzle_type) if result else None, (3, "worldle"))
+        result = registry.parse("Wordle 4 1/6\n4")
+        self.assertEqual((result.game_number, result.puzzle_type) if result else None, (4, "wordle"))
+
 
 if __name__ == "__main__":
     unittest.main()
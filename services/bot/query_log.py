@@ -0,0 +1,149 @@
+from functools import lru_cache
+import hashlib
+import logging
+from pathlib import Path
+import re
+import sys
+import time
+from types import CodeType
+from typing import Any, Callable
+import unittest
+
+from django.db import connections
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.db.backends.signals import connection_created
+
+from services.bot.config import SLOW_QUERY_LOG_INTERVAL, SLOW_QUERY_MS
+from services.bot.metrics import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+ROOT = str(Path(__file__).resolve().parents[2])
+
+query_duration = Histogram("db.query.duration", "Time taken to run a database query", "ms")
+slow_queries = Counter("db.query.slow", "Database queries which took longer than the slow query threshold")
+
+# A run of placeholders or of VALUES rows, which only differ in how many items a query was given
+_PLACEHOLDERS = re.compile(r"(%s|\?)(\s*,\s*(%s|\?))+")
+_ROWS = re.compile(r"(\([^()]*\))(\s*,\s*\([^()]*\))+")
+_OPERATION = re.compile(r"^\s*(\w+)")
+_TABLE = re.compile(r'\b(?:FROM|INTO|UPDATE)\s+"?(\w+)"?', re.IGNORECASE)
+
+# Code object to the name of the function which made the query, so the stack is only named once per call site
+_callers: dict[CodeType, str] = {}
+_last_logged: dict[str, float] = {}
+
+
+def install_query_log() -> None:
+    """
+    Times every query run through Django, on every connection including those opened later by other threads,
+    recording the duration by the shape of the query and the function in the bot which ran it
+    """
+    connection_created.connect(_add_wrapper, dispatch_uid="query_log")
+    for connection in connections.all(initialized_only=True):
+        _add_wrapper(connection)
+
+
+@lru_cache(maxsize=1024)
+def get_query_shape(sql: str) -> tuple[str, str, str]:
+    """A short id for the query with any lists of parameters collapsed, its operation, and the first table"""
+    normalized = _ROWS.sub(r"\1", _PLACEHOLDERS.sub(r"\1", sql))
+    shape = hashlib.blake2b(normalized.encode(), digest_size=6).hexdigest()
+    operation = _OPERATION.match(normalized)
+    table = _TABLE.search(normalized)
+    return (
+        shape,
+        operation.group(1).upper() if operation is not None else "",
+        table.group(1) if table is not None else "",
+    )
+
+
+def _add_wrapper(connection: BaseDatabaseWrapper, **kwargs: Any) -> None:
+    if _log_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_log_query)
+
+
+def _log_query(execute: Callable[..., Any], sql: str, params: Any, many: bool, context: dict[str, Any]) -> Any:
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = (time.perf_counter() - start) * 1000
+        shape, operation, table = get_query_shape(sql)
+        caller = _get_caller()
+        query_duration.record(duration, {"shape": shape, "operation": operation, "table": table, "caller": caller})
+        if duration >= SLOW_QUERY_MS:
+            _log_slow_query(sql, params, many, context["connection"], duration, shape, caller)
+
+
+def _log_slow_query(
+    sql: str, params: Any, many: bool, connection: BaseDatabaseWrapper, duration: float, shape: str, caller: str
+) -> None:
+    slow_queries.add(1, {"shape": shape, "caller": caller})
+    # Each shape is only logged once in a while, a query which has got slow is usually run a lot
+    now = time.monotonic()
+    if now - _last_logged.get(shape, -SLOW_QUERY_LOG_INTERVAL) < SLOW_QUERY_LOG_INTERVAL:
+        return
+
+    _last_logged[shape] = now
+    plan = _explain(sql, params, connection) if not many else None
+    logger.warning(
+        f"Slow query {shape} from {caller} took {duration:.1f}ms:\n{sql}\nparams: {params!r}\nplan:\n{plan}",
+        extra={"query_shape": shape, "query_caller": caller},
+    )
+
+
+def _explain(sql: str, params: Any, connection: BaseDatabaseWrapper) -> str | None:
+    if connection.vendor != "sqlite" or get_query_shape(sql)[1] not in ("SELECT", "INSERT", "UPDATE", "DELETE"):
+        return None
+
+    try:
+        # A fresh cursor from the backend, so the plan is not logged itself and does not replace the results
+        cursor = connection.create_cursor()
+        try:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            return "\n".join(f"{node_id} {parent} {detail}" for node_id, parent, _, detail in cursor.fetchall())
+        finally:
+            cursor.close()
+    except Exception as ex:
+        logger.warning("Unable to explain slow query: %s", ex, exc_info=ex)
+        return None
+
+
+def _get_caller() -> str:
+    frame = sys._getframe(2)
+    while frame is not None:
+        code = frame.f_code
+        caller = _callers.get(code)
+        if caller is None:
+            filename = code.co_filename
+            in_bot = filename.startswith(ROOT) and "site-packages" not in filename and filename != __file__
+            caller = _callers[code] = f"{frame.f_globals.get('__name__')}.{code.co_qualname}" if in_bot else ""
+
+        if caller != "":
+            return caller
+        frame = frame.f_back  # type: ignore[assignment]
+
+    return "unknown"
+
+
+class TestQueryShape(unittest.TestCase):
+    def test_lists_have_the_same_shape(self) -> None:
+        one = get_query_shape('SELECT "a" FROM "core_wordlegame" WHERE "message_id" IN (%s)')
+        many = get_query_shape('SELECT "a" FROM "core_wordlegame" WHERE "message_id" IN (%s, %s, %s)')
+        self.assertEqual(one, many)
+        self.assertEqual(one[1:], ("SELECT", "core_wordlegame"))
+
+        rows = get_query_shape('INSERT INTO "core_rating" ("a", "b") VALUES (%s, %s), (%s, %s)')
+        self.assertEqual(rows, get_query_shape('INSERT INTO "core_rating" ("a", "b") VALUES (%s, %s)'))
+        self.assertEqual(rows[1:], ("INSERT", "core_rating"))
+
+    def test_different_queries_have_different_shapes(self) -> None:
+        self.assertNotEqual(
+            get_query_shape('SELECT "a" FROM "core_wordlegame" WHERE "user_id" = %s'),
+            get_query_shape('SELECT "a" FROM "core_wordlegame" WHERE "channel_id" = %s'),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
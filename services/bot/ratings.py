@@ -0,0 +1,172 @@
+from datetime import datetime
+from itertools import groupby
+import logging
+from operator import itemgetter
+from typing import Iterable, Iterator
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+
+from apps.core.models import ArchivedWordleGame, PlayerRating, RatingChange, WordleChannel, WordleGame
+from services.bot.config import RATING_INITIAL, RATING_K_FACTOR
+from services.bot.difficulty import get_score
+from services.bot.parser import WORDLE
+from services.bot.timezones import get_channel_timezone
+from services.bot.utils import game_number_for_day
+
+logger = logging.getLogger(__name__)
+
+WRITE_BATCH_SIZE = 500
+
+
+async def update_all_ratings() -> None:
+    async for channel_id in WordleChannel.objects.values_list("channel_id", flat=True).aiterator():
+        try:
+            await sync_to_async(update_ratings)(channel_id)
+        except Exception as ex:
+            logger.error(
+                "Error while updating ratings for channel: %s", ex, exc_info=ex, extra={"channel_id": channel_id}
+            )
+
+
+def update_ratings(channel_id: int) -> int:
+    """
+    Brings the channel's ratings up to date with its finished games, returning how many days were played.
+    Only the days after the channel's rated_until are played, after winding back any ratings which were
+    worked out from them, so a late or deleted game replays from its own day rather than from the start.
+    """
+    # A game is finished once its day is over where the channel is
+    today = game_number_for_day(datetime.now(get_channel_timezone(channel_id)).date())
+    if today is None:
+        return 0
+
+    with transaction.atomic():
+        rated_until = WordleChannel.objects.values_list("rated_until", flat=True).get(channel_id=channel_id)
+        if rated_until is not None and rated_until >= today - 1:
+            return 0
+
+        ratings, changed = _rewind(channel_id, rated_until)
+        changes: list[RatingChange] = []
+        days = 0
+        for game_number, scores in _get_days(channel_id, rated_until, today - 1):
+            for user_id, new_rating in get_new_ratings(ratings, scores).items():
+                previous_rating, games = ratings.get(user_id, (RATING_INITIAL, 0))
+                changes.append(
+                    RatingChange(
+                        channel_id=channel_id, game_number=game_number, user_id=user_id, previous_rating=previous_rating
+                    )
+                )
+                ratings[user_id] = (new_rating, games + 1)
+                changed.add(user_id)
+            days += 1
+
+        RatingChange.objects.bulk_create(changes, batch_size=WRITE_BATCH_SIZE)
+        PlayerRating.objects.bulk_create(
+            [
+                PlayerRating(
+                    channel_id=channel_id, user_id=user_id, rating=ratings[user_id][0], games=ratings[user_id][1]
+                )
+                for user_id in changed
+                if ratings[user_id][1] > 0
+            ],
+            batch_size=WRITE_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=["channel", "user_id"],
+            update_fields=["rating", "games"],
+        )
+        # Players whose only games were replayed and are now gone
+        PlayerRating.objects.filter(
+            channel_id=channel_id, user_id__in=[user_id for user_id in changed if ratings[user_id][1] == 0]
+        ).delete()
+        WordleChannel.objects.filter(channel_id=channel_id).update(rated_until=today - 1)
+
+    if days > 0:
+        logger.info(f"Played {days} days of ratings", extra={"channel_id": channel_id})
+
+    return days
+
+
+def invalidate_ratings(channel_id: int, game_numbers: Iterable[int] | None = None) -> None:
+    """Marks the channel's ratings from the earliest of the given games, or all of them, to be played again"""
+    channels = WordleChannel.objects.filter(channel_id=channel_id)
+    if game_numbers is None:
+        channels.update(rated_until=None)
+        return
+
+    earliest = min(game_numbers, default=None)
+    if earliest is not None:
+        channels.filter(rated_until__gte=earliest).update(rated_until=earliest - 1)
+
+
+def get_new_ratings(ratings: dict[int, tuple[float, int]], scores: list[tuple[int, int]]) -> dict[int, float]:
+    """
+    Ratings after one game day, played as an Elo match between every pair of players on the day. Each
+    player's change is averaged over their opponents, so busy days do not move ratings further than quiet ones.
+    """
+    current = {user_id: ratings.get(user_id, (RATING_INITIAL, 0))[0] for user_id, _ in scores}
+    if len(scores) < 2:
+        return current
+
+    new_ratings = {}
+    for user_id, score in scores:
+        change = 0.0
+        for opponent_id, opponent_score in scores:
+            if opponent_id == user_id:
+                continue
+            expected = 1 / (1 + 10 ** ((current[opponent_id] - current[user_id]) / 400))
+            actual = 1.0 if score < opponent_score else 0.5 if score == opponent_score else 0.0
+            change += actual - expected
+        new_ratings[user_id] = current[user_id] + RATING_K_FACTOR * change / (len(scores) - 1)
+
+    return new_ratings
+
+
+def _rewind(channel_id: int, rated_until: int | None) -> tuple[dict[int, tuple[float, int]], set[int]]:
+    """
+    Winds the channel's ratings back to how they were after rated_until, returning the (rating, games) of
+    each player and which players were wound back
+    """
+    if rated_until is None:
+        RatingChange.objects.filter(channel_id=channel_id).delete()
+        PlayerRating.objects.filter(channel_id=channel_id).delete()
+        return {}, set()
+
+    ratings = {
+        user_id: (rating, games)
+        for user_id, rating, games in PlayerRating.objects.filter(channel_id=channel_id).values_list(
+            "user_id", "rating", "games"
+        )
+    }
+
+    changes = RatingChange.objects.filter(channel_id=channel_id, game_number__gt=rated_until)
+    rows = changes.order_by("user_id", "game_number").values_list("user_id", "previous_rating")
+    rewound = set()
+    for user_id, user_changes in groupby(rows, key=itemgetter(0)):
+        previous = list(user_changes)
+        # The rating before the first replayed day, less the games being replayed
+        ratings[user_id] = (previous[0][1], ratings[user_id][1] - len(previous))
+        rewound.add(user_id)
+
+    changes.delete()
+    return ratings, rewound
+
+
+def _get_days(channel_id: int, after: int | None, until: int) -> Iterator[tuple[int, list[tuple[int, int]]]]:
+    """The (user_id, score) of each counted game for each day in the range, in game number order"""
+    rows: list[tuple[int, int, int, bool]] = []
+    for model in (ArchivedWordleGame, WordleGame):
+        games = model.objects.filter(
+            channel_id=channel_id,
+            is_duplicate=False,
+            is_correct_day=True,
+            puzzle_type=WORDLE,
+            game_number__lte=until,
+        )
+        if after is not None:
+            games = games.filter(game_number__gt=after)
+
+        rows.extend(games.values_list("game_number", "user_id", "guesses", "is_win"))
+
+    rows.sort()
+    for game_number, day in groupby(rows, key=itemgetter(0)):
+        yield game_number, [(user_id, get_score(guesses, is_win)) for _, user_id, guesses, is_win in day]
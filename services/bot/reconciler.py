@@ -0,0 +1,103 @@
+import asyncio
+from datetime import timedelta
+import logging
+from asgiref.sync import sync_to_async
+import discord
+from django.db.models import Min
+
+from apps.core.models import WordleChannel, WordleGame
+from services.bot.config import CLIENT_WAIT_TIMEOUT, RECONCILE_BATCH_SIZE, RECONCILE_WINDOW_DAYS
+from services.bot.scanner import delete_games
+from services.bot.snowflake import snowflake_duration
+
+logger = logging.getLogger(__name__)
+
+
+class ReconcilerError(Exception):
+    pass
+
+
+async def reconcile_deleted_games(client: discord.Client) -> None:
+    await asyncio.wait_for(client.wait_until_ready(), timeout=CLIENT_WAIT_TIMEOUT)
+
+    async for wordle_channel in WordleChannel.objects.aiterator():
+        try:
+            channel = await client.fetch_channel(wordle_channel.channel_id)
+            if not isinstance(channel, discord.TextChannel):
+                raise ReconcilerError(
+                    f"Expected channel {wordle_channel.channel_id} to be a TextChannel, got {type(channel)}"
+                )
+
+            await reconcile_next_window(channel, wordle_channel)
+        except Exception as ex:
+            logger.error(
+                "Error while reconciling deleted games for channel: %s",
+                ex,
+                exc_info=ex,
+                extra={"channel_id": wordle_channel.channel_id},
+            )
+
+
+async def reconcile_next_window(channel: discord.TextChannel, wordle_channel: WordleChannel) -> int:
+    """
+    Reconciles the next window of the channel's history after `reconciled_until`, wrapping back round
+    to the first tracked game once the window reaches the last message the scanner has processed.
+    """
+
+    # Anything after the last seen message has not been scanned yet, so there is nothing to compare
+    if wordle_channel.last_seen_message is None:
+        return 0
+
+    after = wordle_channel.reconciled_until
+    if after is None or after >= wordle_channel.last_seen_message:
+        first_game = await WordleGame.objects.filter(channel_id=channel.id).aaggregate(first=Min("message_id"))
+        if first_game["first"] is None:
+            return 0
+        after = first_game["first"] - 1
+
+    window = snowflake_duration(timedelta(days=RECONCILE_WINDOW_DAYS))
+    before = min(after + window, wordle_channel.last_seen_message + 1)
+
+    deleted_count = await reconcile_window(channel, after, before)
+
+    await WordleChannel.objects.filter(channel_id=channel.id).aupdate(reconciled_until=before - 1)
+    return deleted_count
+
+
+async def reconcile_window(channel: discord.TextChannel, after: int, before: int) -> int:
+    """Deletes games for messages strictly between after and before which no longer exist in the channel"""
+
+    missing = {
+        message_id
+        async for message_id in WordleGame.objects.filter(
+            channel_id=channel.id,
+            message_id__gt=after,
+            message_id__lt=before,
+        )
+        .values_list("message_id", flat=True)
+        .aiterator()
+    }
+    if len(missing) == 0:
+        return 0
+
+    # If this raises part way through then nothing is deleted, we must see the whole window to know
+    # which games have really gone
+    async for message in channel.history(
+        limit=None,
+        after=discord.Object(id=after),
+        before=discord.Object(id=before),
+    ):
+        missing.discard(message.id)
+
+    deleted_count = 0
+    to_delete = sorted(missing)
+    for index in range(0, len(to_delete), RECONCILE_BATCH_SIZE):
+        batch = to_delete[index : index + RECONCILE_BATCH_SIZE]
+        deleted_count += await sync_to_async(delete_games)(channel.id, batch)
+
+    if deleted_count > 0:
+        logger.info(
+            f"Deleted {deleted_count} games which are no longer in the channel", extra={"channel_id": channel.id}
+        )
+
+    return deleted_count
@@ -1,25 +1,92 @@
 import asyncio
-from datetime import datetime, time, timezone
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone, tzinfo
+import enum
+import hashlib
 import logging
+import time
+from typing import Any, Awaitable, Callable
+from asgiref.sync import sync_to_async
 import discord
+from django.db import transaction
+from django.db.models import Q
 
-from apps.core.models import WordleChannel, WordleGame
-from services.bot.config import CLIENT_WAIT_TIMEOUT, TIMEZONE
-from services.bot.parser import LetterGuess, parse_message
-
-from services.bot.utils import game_number_for_day
+from apps.core.models import ScannedMessage, WordleChannel, WordleGame
+from services.bot.archive import delete_archived_games, is_archived
+from services.bot.config import (
+    CLIENT_WAIT_TIMEOUT,
+    FINGERPRINT_RETENTION_DAYS,
+    RESCAN_CONCURRENCY,
+    RESCAN_SLICE_DAYS,
+)
+from services.bot.daily_results import invalidate_daily_results
+from services.bot.difficulty import count_greens, refresh_difficulty
+from services.bot.duplicates import recompute_duplicates
+from services.bot.metrics import Counter, Histogram
+from services.bot.parser import GameResult, LetterGuess, parse_message, registry
+from services.bot.ratings import invalidate_ratings
+from services.bot.snowflake import snowflake_duration, snowflake_for_time
+from services.bot.timezones import aget_channel_timezone
+from services.bot.watermarks import mark_channel_changed
+from services.bot.window_totals import update_window_totals
 
 logger = logging.getLogger(__name__)
 
+# Bump this whenever parsing or the stored game fields change, so existing fingerprints stop matching and
+# every message is processed again on the next rescan
+FINGERPRINT_VERSION = 1
+
+unchanged_messages = Counter(
+    "ingest.unchanged_messages", "Messages skipped without parsing because their content fingerprint matched"
+)
+game_writes = Counter("ingest.game_writes", "Games written to the database")
+store_duration = Histogram("ingest.store_duration", "Time taken to write a game and fix up its duplicates", "ms")
+
 
 class ScannerError(Exception):
     pass
 
 
+class MessageSource(enum.Enum):
+    CREATED = "created"
+    EDITED = "edited"
+    SCANNED = "scanned"
+
+
+@dataclass
+class ScanStatus:
+    scanned_until: int | None
+    scanning: bool = False
+    messages: int = 0
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    error: str | None = None
+
+
+# Kept in memory so the health endpoint can report them without going to the database
+scan_statuses: dict[int, ScanStatus] = {}
+messages_in_flight = 0
+
+
+@dataclass
+class RescanProgress:
+    slices_done: int
+    slices_total: int
+    messages: int = 0
+    games: int = 0
+    unchanged: int = 0
+
+
 async def scan_unseen_messages(client: discord.Client) -> None:
     await asyncio.wait_for(client.wait_until_ready(), timeout=CLIENT_WAIT_TIMEOUT)
 
     async def scan_channel(wordle_channel: WordleChannel) -> None:
+        status = scan_statuses.setdefault(wordle_channel.channel_id, ScanStatus(wordle_channel.last_seen_message))
+        status.scanning = True
+        status.messages = 0
+        status.started_at = datetime.now(timezone.utc)
+        status.error = None
         try:
             channel = await client.fetch_channel(wordle_channel.channel_id)
             if channel is None:
@@ -36,12 +103,16 @@ async def scan_unseen_messages(client: discord.Client) -> None:
             await scan_messages_for_channel(channel, last_seen)
 
         except Exception as ex:
+            status.error = str(ex)
             logger.error(
                 "Error while scanning messages for channel: %s",
                 ex,
                 exc_info=ex,
                 extra={"channel_id": wordle_channel.channel_id},
             )
+        finally:
+            status.scanning = False
+            status.finished_at = datetime.now(timezone.utc)
 
     logger.info("Scanning previous messages")
     channels = WordleChannel.objects.aiterator()
@@ -52,35 +123,117 @@ async def scan_unseen_messages(client: discord.Client) -> None:
 
 async def scan_messages_for_channel(channel: discord.TextChannel, from_message_id: discord.Object | None) -> None:
     new_last_seen = None
+    status = scan_statuses.get(channel.id)
 
     try:
         async for message in channel.history(limit=None, after=from_message_id, oldest_first=True):
             await process_message(message)
             new_last_seen = message
+            if status is not None:
+                status.scanned_until = message.id
+                status.messages += 1
     finally:
         if new_last_seen is not None:
             await WordleChannel.objects.filter(channel_id=message.channel.id).aupdate(
                 last_seen_message=new_last_seen.id
             )
 
-    if new_last_seen is None:
-        return
 
-    # TODO - fix this logic which kept removing games that it shouldn't
-    # Remove games which we did not just scan and are in the interval
-    # filters = {
-    #     "scanned_at__lt": scan_started_at,
-    #     "message_id__lte": new_last_seen.id,
-    # }
+async def rescan_channel(
+    channel: discord.TextChannel,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    on_progress: Callable[[RescanProgress], Awaitable[None]] | None = None,
+) -> RescanProgress:
+    """
+    Rescans the channel's history between start and end, or its whole history if they are not given.
+
+    Message ids are snowflakes which encode when the message was posted, so the history is split into
+    time slices which are fetched concurrently. Slices are then processed strictly in order so that
+    duplicate detection sees each user's games in the order they were posted.
+    """
+
+    # The channel id is itself a snowflake for when the channel was created, nothing can come before it
+    after = channel.id if start is None else max(channel.id, snowflake_for_time(start) - 1)
+    before = snowflake_for_time(end or datetime.now(timezone.utc) + timedelta(seconds=1))
+    slices = _get_slices(after, before)
+    progress = RescanProgress(slices_done=0, slices_total=len(slices))
+
+    async def fetch_slice(slice_after: int, slice_before: int) -> list[tuple[discord.Message, GameResult, int]]:
+        fingerprints = await _get_fingerprints(channel.id, slice_after, slice_before)
+        games = []
+        async for message in channel.history(
+            limit=None, after=discord.Object(id=slice_after), before=discord.Object(id=slice_before)
+        ):
+            progress.messages += 1
+            fingerprint = content_fingerprint(message.content)
+            if fingerprints.get(message.id) == fingerprint:
+                progress.unchanged += 1
+                unchanged_messages.add()
+                continue
+
+            result = parse_message(message.content)
+            if result is not None:
+                games.append((message, result, fingerprint))
+
+        return games
+
+    # Only fetch a few slices ahead of the one being processed, so we stay within the rate limits and
+    # do not hold too much of the history in memory at once
+    pending: deque[asyncio.Task[list[tuple[discord.Message, GameResult, int]]]] = deque()
+    next_slice = 0
+    last_seen: int | None = None
+    try:
+        while progress.slices_done < len(slices):
+            while next_slice < len(slices) and len(pending) < RESCAN_CONCURRENCY:
+                pending.append(asyncio.create_task(fetch_slice(*slices[next_slice])))
+                next_slice += 1
+
+            games = await pending.popleft()
+            for message, result, fingerprint in sorted(games, key=lambda game: game[0].id):
+                await _save_game(message, result, fingerprint)
+                last_seen = message.id
+            progress.games += len(games)
+            progress.slices_done += 1
+
+            if on_progress is not None:
+                await on_progress(progress)
+    finally:
+        for task in pending:
+            task.cancel()
+
+    # Only move the scanner on if we have rescanned right up to now
+    if end is None and last_seen is not None:
+        await WordleChannel.objects.filter(
+            Q(last_seen_message__isnull=True) | Q(last_seen_message__lt=last_seen),
+            channel_id=channel.id,
+        ).aupdate(last_seen_message=last_seen)
+
+    return progress
+
+
+async def _get_fingerprints(channel_id: int, after: int, before: int) -> dict[int, int | None]:
+    fingerprints: dict[int, int | None] = {}
+    for model in (ScannedMessage, WordleGame):
+        rows = model.objects.filter(
+            channel_id=channel_id, message_id__gt=after, message_id__lt=before, content_hash__isnull=False
+        ).values_list("message_id", "content_hash")
+        async for message_id, content_hash in rows:
+            fingerprints[message_id] = content_hash
+
+    return fingerprints
+
 
-    # if from_message_id is not None:
-    #     filters["message_id__gt"] = from_message_id.id
+def _get_slices(after: int, before: int) -> list[tuple[int, int]]:
+    slice_size = snowflake_duration(timedelta(days=RESCAN_SLICE_DAYS))
+    slices = []
+    while after < before - 1:
+        slice_before = min(after + slice_size, before)
+        slices.append((after, slice_before))
+        # Bounds are exclusive so the next slice starts from the last id the current one can contain
+        after = slice_before - 1
 
-    # deleted_count, _ = await WordleGame.objects.filter(**filters).adelete()
-    # if deleted_count > 0:
-    #     logger.info(
-    #         f"Deleted {deleted_count} games which are no longer in the channel", extra={"channel_id": channel.id}
-    #     )
+    return slices
 
 
 def _map_guess(guess: list[LetterGuess]) -> int:
@@ -93,42 +246,142 @@ def _map_guess(guess: list[LetterGuess]) -> int:
     return result
 
 
-async def process_message(message: discord.Message) -> None:
+def content_fingerprint(content: str) -> int:
+    digest = hashlib.blake2b(content.encode(), digest_size=8, person=f"v{FINGERPRINT_VERSION}".encode())
+    # Signed so it fits in a 64 bit integer column
+    return int.from_bytes(digest.digest(), "big", signed=True)
+
+
+async def process_message(message: discord.Message, source: MessageSource = MessageSource.SCANNED) -> None:
+    global messages_in_flight
+    messages_in_flight += 1
+    try:
+        await _process_message(message, source)
+    finally:
+        messages_in_flight -= 1
+
+
+async def _process_message(message: discord.Message, source: MessageSource) -> None:
     assert message.guild is not None, "Expected message to be in a guild channel"
 
+    # Brand new messages can not have been seen before, for anything else skip messages we already
+    # processed with the same content, edits are often only embeds being added to the message
+    fingerprint = content_fingerprint(message.content)
+    if source != MessageSource.CREATED and await _is_unchanged(message.id, fingerprint):
+        unchanged_messages.add()
+        return
+
     result = parse_message(message.content)
 
     if result is None:
+        # Remembering every message would cost a write per message, only edited messages are likely to
+        # be seen again soon
+        if source == MessageSource.EDITED and _is_recent(message.created_at):
+            await ScannedMessage.objects.aupdate_or_create(
+                message_id=message.id,
+                defaults=dict(channel_id=message.channel.id, content_hash=fingerprint),
+            )
         return
 
-    date = message.created_at.astimezone(TIMEZONE).date()
-    day_start = datetime.combine(date, time.min, tzinfo=TIMEZONE)
-    is_duplicate = await WordleGame.objects.filter(
+    await _save_game(message, result, fingerprint)
+
+
+async def _is_unchanged(message_id: int, fingerprint: int) -> bool:
+    if await WordleGame.objects.filter(message_id=message_id, content_hash=fingerprint).aexists():
+        return True
+
+    return await ScannedMessage.objects.filter(message_id=message_id, content_hash=fingerprint).aexists()
+
+
+def _is_recent(posted_at: datetime) -> bool:
+    return posted_at > datetime.now(timezone.utc) - timedelta(days=FINGERPRINT_RETENTION_DAYS)
+
+
+async def prune_fingerprints() -> None:
+    cutoff = snowflake_for_time(datetime.now(timezone.utc) - timedelta(days=FINGERPRINT_RETENTION_DAYS))
+    deleted_count, _ = await ScannedMessage.objects.filter(message_id__lt=cutoff).adelete()
+    logger.info(f"Pruned {deleted_count} message fingerprints")
+
+
+async def _save_game(message: discord.Message, result: GameResult, fingerprint: int) -> None:
+    # Saved as not being a duplicate, the flag is then worked out from all the games with the same key
+    tz = await aget_channel_timezone(message.channel.id)
+    fields = get_game_fields(result, message.channel.id, message.author.id, message.created_at, False, fingerprint, tz)
+    started = time.perf_counter()
+    await sync_to_async(_store_game)(message.id, fields)
+    store_duration.record((time.perf_counter() - started) * 1000)
+    game_writes.add()
+
+
+def _store_game(message_id: int, fields: dict[str, Any]) -> None:
+    with transaction.atomic():
+        # Archived games are already counted in the totals, writing them back as live games would count them twice
+        if is_archived(fields["channel_id"], message_id):
+            return
+
+        keys = {(fields["user_id"], fields["game_number"])}
+        # An edit can change the game number, in which case the old key needs fixing up as well
+        previous = WordleGame.objects.filter(message_id=message_id).values_list("user_id", "game_number").first()
+        if previous is not None:
+            keys.add(previous)
+
+        WordleGame.objects.update_or_create(message_id=message_id, defaults=fields)
+        recompute_duplicates(fields["channel_id"], keys)
+        game_numbers = {game_number for _, game_number in keys}
+        invalidate_daily_results(fields["channel_id"], game_numbers)
+        invalidate_ratings(fields["channel_id"], game_numbers)
+        update_window_totals(fields["channel_id"], keys)
+        refresh_difficulty(game_numbers)
+        mark_channel_changed(fields["channel_id"], message_id)
+
+
+def get_game_fields(
+    result: GameResult,
+    channel_id: int,
+    user_id: int,
+    posted_at: datetime,
+    is_duplicate: bool,
+    content_hash: int,
+    tz: tzinfo,
+) -> dict[str, Any]:
+    # Whether the game was played on the correct day depends on which day it was where the channel is
+    date = posted_at.astimezone(tz).date()
+    return dict(
+        user_id=user_id,
+        channel_id=channel_id,
+        posted_at=posted_at,
+        scanned_at=datetime.now(timezone.utc),
         game_number=result.game_number,
-        user_id=message.author.id,
-        channel_id=message.channel.id,
-        message_id__lt=message.id,
-        posted_at__gte=day_start,
-    ).aexists()
-    is_correct_day = game_number_for_day(date) == result.game_number
-
-    await WordleGame.objects.aupdate_or_create(
-        message_id=message.id,
-        defaults=dict(
-            user_id=message.author.id,
-            channel_id=message.channel.id,
-            posted_at=message.created_at,
-            scanned_at=datetime.now(timezone.utc),
-            game_number=result.game_number,
-            is_duplicate=is_duplicate,
-            is_correct_day=is_correct_day,
-            is_win=result.is_win,
-            is_hard_mode=result.is_hard_mode,
-            guesses=len(result.guesses),
-            result=[_map_guess(g) for g in result.guesses],
-        ),
+        is_duplicate=is_duplicate,
+        is_correct_day=registry.get(result.puzzle_type).game_number_for_day(date) == result.game_number,
+        puzzle_type=result.puzzle_type,
+        is_win=result.is_win,
+        is_hard_mode=result.is_hard_mode,
+        guesses=len(result.guesses),
+        result=[_map_guess(g) for g in result.guesses],
+        greens=count_greens(result.guesses),
+        content_hash=content_hash,
     )
 
 
-async def delete_message(message: discord.Message) -> None:
-    await WordleGame.objects.filter(message_id=message.id).adelete()
+async def delete_message(channel_id: int, message_id: int) -> None:
+    await sync_to_async(delete_games)(channel_id, [message_id])
+
+
+def delete_games(channel_id: int, message_ids: list[int]) -> int:
+    with transaction.atomic():
+        games = WordleGame.objects.filter(channel_id=channel_id, message_id__in=message_ids)
+        keys = set(games.values_list("user_id", "game_number"))
+        deleted_count, _ = games.delete()
+        recompute_duplicates(channel_id, keys)
+        game_numbers = {game_number for _, game_number in keys}
+        invalidate_daily_results(channel_id, game_numbers)
+        invalidate_ratings(channel_id, game_numbers)
+        update_window_totals(channel_id, keys)
+        refresh_difficulty(game_numbers)
+        if deleted_count < len(message_ids):
+            deleted_count += delete_archived_games(channel_id, message_ids)
+        if deleted_count > 0:
+            mark_channel_changed(channel_id)
+
+    return deleted_count
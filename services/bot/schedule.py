@@ -0,0 +1,167 @@
+from datetime import datetime, time, timedelta, timezone, tzinfo
+import enum
+from itertools import groupby
+import logging
+
+from django.db import transaction
+
+from apps.core.models import ArchivedWordleGame, WordleChannel, WordleGame
+from services.bot.archive import realign_archive
+from services.bot.config import DAILY_REMINDER_TIME, DAILY_SUMMARY_TIME
+from services.bot.daily_results import invalidate_daily_results
+from services.bot.difficulty import refresh_difficulty
+from services.bot.duplicates import recompute_duplicates
+from services.bot.parser import registry
+from services.bot.ratings import invalidate_ratings
+from services.bot.timezones import get_timezone
+from services.bot.utils import game_number_for_day
+from services.bot.watermarks import mark_channel_changed
+from services.bot.window_totals import invalidate_window_totals, rebuild_window_totals
+
+logger = logging.getLogger(__name__)
+
+# Keep well under SQLite's limit on query parameters
+IDS_PER_STATEMENT = 500
+
+
+class DailyPost(enum.Enum):
+    SUMMARY = "summary"
+    REMINDER = "reminder"
+
+    @property
+    def due_field(self) -> str:
+        return f"next_{self.value}_at"
+
+    @property
+    def enabled_field(self) -> str:
+        return f"daily_{self.value}_enabled"
+
+
+def get_post_time(channel: WordleChannel, post: DailyPost) -> time:
+    """The local time the channel gets the post at"""
+    if post == DailyPost.SUMMARY:
+        return channel.summary_time or DAILY_SUMMARY_TIME
+    return channel.reminder_time or DAILY_REMINDER_TIME
+
+
+def get_next_post_at(post_time: time, tz: tzinfo, after: datetime) -> datetime:
+    """
+    The first moment after the given one when clocks in the timezone read the post time, in UTC. A post time
+    which clocks skip when they go forward is posted as if they had not, an hour later, and one which they
+    repeat when they go back is posted the first time around.
+    """
+    day = after.astimezone(tz).date()
+    while True:
+        due_at = datetime.combine(day, post_time, tzinfo=tz).astimezone(timezone.utc)
+        if due_at > after:
+            return due_at
+        day += timedelta(days=1)
+
+
+def get_post_game_number(post: DailyPost, tz: tzinfo, due_at: datetime) -> int | None:
+    """The game the post is about, yesterday's results for a summary and today's game for a reminder"""
+    day = due_at.astimezone(tz).date()
+    return game_number_for_day(day - timedelta(days=1) if post == DailyPost.SUMMARY else day)
+
+
+async def get_due_channels(post: DailyPost, now: datetime) -> list[WordleChannel]:
+    """
+    The channels with the post enabled whose next one is due by now, or which have not been scheduled yet.
+    Each is a seek on the partial index of due times, so only the channels which are due are read. Asking for
+    both at once with an OR makes SQLite scan the whole index instead.
+    """
+    channels = WordleChannel.objects.filter(**{post.enabled_field: True})
+    return [
+        channel
+        for due in ({f"{post.due_field}__lte": now}, {f"{post.due_field}__isnull": True})
+        async for channel in channels.filter(**due)
+    ]
+
+
+async def schedule_next_posts(post: DailyPost, channels: list[WordleChannel], now: datetime) -> None:
+    """
+    Moves the channels on to their next post after now. Channels which are due together mostly share a timezone
+    and post time, so each group of them is moved on in one UPDATE.
+    """
+
+    def get_key(channel: WordleChannel) -> tuple[str, time]:
+        return str(get_timezone(channel.timezone)), get_post_time(channel, post)
+
+    for (name, post_time), group in groupby(sorted(channels, key=get_key), key=get_key):
+        due_at = get_next_post_at(post_time, get_timezone(name), now)
+        channel_ids = [channel.channel_id for channel in group]
+        for index in range(0, len(channel_ids), IDS_PER_STATEMENT):
+            await WordleChannel.objects.filter(channel_id__in=channel_ids[index : index + IDS_PER_STATEMENT]).aupdate(
+                **{post.due_field: due_at}
+            )
+
+
+def set_channel_schedule(
+    channel_id: int, timezone_name: str | None, summary_time: time | None, reminder_time: time | None
+) -> int:
+    """
+    Sets the timezone the channel's days are in and the local times it gets its daily posts at, none meaning the
+    defaults. When the timezone changes the games which were played on the correct day are worked out again,
+    archived ones included, returning how many changed. Days are archived whole, so the archive is first moved on
+    to the end of the day in the new timezone which it ends part way through.
+    """
+    now = datetime.now(timezone.utc)
+    tz = get_timezone(timezone_name)
+    with transaction.atomic():
+        channel = WordleChannel.objects.get(channel_id=channel_id)
+        moved = str(get_timezone(channel.timezone)) != str(tz)
+
+        channel.timezone = timezone_name
+        channel.summary_time = summary_time
+        channel.reminder_time = reminder_time
+        channel.next_summary_at = get_next_post_at(get_post_time(channel, DailyPost.SUMMARY), tz, now)
+        channel.next_reminder_at = get_next_post_at(get_post_time(channel, DailyPost.REMINDER), tz, now)
+        channel.save(update_fields=["timezone", "summary_time", "reminder_time", "next_summary_at", "next_reminder_at"])
+        if not moved:
+            return 0
+
+        realign_archive(channel_id, tz)
+        changed = recompute_correct_days(channel_id, tz)
+        # Duplicates are games posted on the same day, which has moved
+        recompute_duplicates(channel_id)
+        # Every day's results are of the games posted during it, which have moved even if no flags changed
+        invalidate_daily_results(channel_id)
+        invalidate_ratings(channel_id)
+        rebuild_window_totals(channel_id)
+        # Days ending at a different time changes what is finished and what today is, even if no games changed
+        mark_channel_changed(channel_id)
+
+    return changed
+
+
+def recompute_correct_days(channel_id: int, tz: tzinfo) -> int:
+    """Recomputes is_correct_day for the channel's games in the timezone, archived or not, returning how many changed"""
+    changed = 0
+    for model in (WordleGame, ArchivedWordleGame):
+        correct: list[int] = []
+        incorrect: list[int] = []
+        games = model.objects.filter(channel_id=channel_id).values_list(
+            "message_id", "posted_at", "puzzle_type", "game_number", "is_correct_day"
+        )
+        for message_id, posted_at, puzzle_type, game_number, is_correct_day in games.iterator(chunk_size=2000):
+            day = posted_at.astimezone(tz).date()
+            if (registry.get(puzzle_type).game_number_for_day(day) == game_number) != is_correct_day:
+                (incorrect if is_correct_day else correct).append(message_id)
+
+        # Only the rows whose flag changes are written
+        for message_ids, is_correct_day in ((correct, True), (incorrect, False)):
+            for index in range(0, len(message_ids), IDS_PER_STATEMENT):
+                model.objects.filter(message_id__in=message_ids[index : index + IDS_PER_STATEMENT]).update(
+                    is_correct_day=is_correct_day
+                )
+
+        changed += len(correct) + len(incorrect)
+
+    if changed > 0:
+        logger.info(f"Recomputed correct day flag for {changed} games", extra={"channel_id": channel_id})
+        invalidate_daily_results(channel_id)
+        invalidate_ratings(channel_id)
+        invalidate_window_totals(channel_id)
+        refresh_difficulty()
+
+    return changed
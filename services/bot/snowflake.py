@@ -0,0 +1,53 @@
+from datetime import date, datetime, time, timedelta, timezone, tzinfo
+import unittest
+
+# Discord ids are snowflakes, the upper bits are the milliseconds since the discord epoch that the
+# object was created at. Message ids are the primary key of games, so any range of time can be turned
+# into a range of ids and queried as a primary key range scan.
+DISCORD_EPOCH = 1420070400000
+TIMESTAMP_SHIFT = 22
+
+
+def snowflake_for_time(moment: datetime) -> int:
+    """The lowest possible snowflake for the given time, anything created at or after it is >= this"""
+    milliseconds = int(moment.timestamp() * 1000) - DISCORD_EPOCH
+    return max(milliseconds, 0) << TIMESTAMP_SHIFT
+
+
+def time_for_snowflake(snowflake: int) -> datetime:
+    milliseconds = (snowflake >> TIMESTAMP_SHIFT) + DISCORD_EPOCH
+    return datetime.fromtimestamp(milliseconds / 1000, tz=timezone.utc)
+
+
+def snowflake_duration(duration: timedelta) -> int:
+    """How far apart two snowflakes created `duration` apart are"""
+    return int(duration.total_seconds() * 1000) << TIMESTAMP_SHIFT
+
+
+def snowflake_range_for_days(start: date, end: date, tz: tzinfo) -> tuple[int, int]:
+    """
+    Snowflakes for messages posted from the start of `start` up to but not including the start of `end`
+    in the given timezone, as a half open range for `message_id__gte` and `message_id__lt`.
+    """
+    return (
+        snowflake_for_time(datetime.combine(start, time.min, tzinfo=tz)),
+        snowflake_for_time(datetime.combine(end, time.min, tzinfo=tz)),
+    )
+
+
+class TestSnowflake(unittest.TestCase):
+    def test_round_trip(self) -> None:
+        # Example from the discord developer documentation
+        snowflake = 175928847299117063
+        moment = time_for_snowflake(snowflake)
+        self.assertEqual(moment, datetime(2016, 4, 30, 11, 18, 25, 796000, tzinfo=timezone.utc))
+        self.assertLessEqual(snowflake_for_time(moment), snowflake)
+        self.assertGreater(snowflake_for_time(moment + timedelta(milliseconds=1)), snowflake)
+
+    def test_day_range(self) -> None:
+        start, end = snowflake_range_for_days(date(2024, 3, 30), date(2024, 3, 31), timezone.utc)
+        self.assertEqual(end - start, snowflake_duration(timedelta(days=1)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,14 +1,24 @@
 import logging
 from services.bot.client import run_client
-from services.bot.config import SYNC_COMMANDS, TIMEZONE
+from services.bot.config import ASYNCIO_DEBUG, LOW_MEMORY_MODE, SYNC_COMMANDS, TIMEZONE
+from services.bot.query_log import install_query_log
+from services.bot.watchdog import EventLoopWatchdog
 
 logger = logging.getLogger(__name__)
 
 
 async def run() -> None:
     logger.info(
-        f"Application bootstrapped with the following settings:\nTIMEZONE={TIMEZONE}\nSYNC_COMMANDS={SYNC_COMMANDS}"
+        "Application bootstrapped with the following settings:\n"
+        f"TIMEZONE={TIMEZONE}\nSYNC_COMMANDS={SYNC_COMMANDS}\nLOW_MEMORY_MODE={LOW_MEMORY_MODE}\n"
+        f"ASYNCIO_DEBUG={ASYNCIO_DEBUG}"
     )
 
-    logger.info("Client starting up...")
-    await run_client()
+    install_query_log()
+    watchdog = EventLoopWatchdog()
+    watchdog.start()
+    try:
+        logger.info("Client starting up...")
+        await run_client()
+    finally:
+        watchdog.stop()
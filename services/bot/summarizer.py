@@ -1,13 +1,28 @@
-from datetime import date
+from dataclasses import asdict
+from datetime import date, tzinfo
+from typing import Any
+from asgiref.sync import sync_to_async
 import discord
-from django.db.models import Count, Avg, Min, Q, Max
-from apps.core.models import WordleGame
+from django.db.models import Max
+from apps.core.models import ArchivedWordleGame, GameDifficulty, PlayerRating, WordleGame
 import enum
 
 from services.bot.config import USERNAME_MAX_LENGTH
-from services.bot.utils import game_number_for_day
+from services.bot.daily_results import get_daily_results
+from services.bot.difficulty import get_better_than, get_green_density, get_score
+from services.bot.parser import WORD_LENGTH, WORDLE
+from services.bot.ratings import update_ratings
+from services.bot.snowflake import snowflake_range_for_days
+from services.bot.timezones import aget_channel_timezone
+from services.bot.utils import day_for_game_number, game_number_for_day
+from services.bot.versus import get_head_to_head
+from services.bot.warm_cache import cache_leaderboard, get_cached_leaderboard, get_display_name, set_display_name
+from services.bot.watermarks import get_watermark
+from services.bot.window_totals import get_window_totals
 
 REMINDER_MAX_DAYS = 3
+# Games with fewer players than this are too noisy to call hard
+HARDEST_MIN_PLAYERS = 3
 DEFAULT_RANKING = ["-wins", "-games", "average", "best"]
 RANK_EMOJIS = {1: "🥇", 2: "🥈", 3: "🥉"}
 
@@ -17,6 +32,7 @@ class Ranking(enum.Enum):
     WINS = "wins"
     AVERAGE = "average"
     BEST = "best"
+    RATING = "rating"
 
 
 RANKING_FIELD_MAP = {
@@ -42,33 +58,11 @@ class Summarizer:
         ranking: Ranking,
         days: int | None,
     ) -> discord.Embed:
+        if ranking == Ranking.RATING:
+            return await self._get_rating_summary(limit)
 
-        max_game_number = game_number_for_day(end) or 0
-        games = WordleGame.objects.filter(
-            channel_id=self.channel.id,
-            is_duplicate=False,
-            is_correct_day=True,
-            game_number__lt=max_game_number,
-        )
-
-        if days is not None:
-            min_game_number = max_game_number - days
-            games = games.filter(game_number__gte=min_game_number)
-
-        order = DEFAULT_RANKING
-        ranking_field = RANKING_FIELD_MAP[ranking]
-        order = [ranking_field] + [x for x in order if x != ranking_field]
-
-        data = (
-            games.values("user_id")
-            .annotate(
-                games=Count("message_id"),
-                wins=Count("message_id", filter=Q(is_win=True)),
-                average=Avg("guesses"),
-                best=Min("guesses"),
-            )
-            .order_by(*order)[:limit]
-        )
+        min_game_number, max_game_number = get_game_range(end, days)
+        rows = await _get_cached_leaderboard(self.channel.id, ranking, limit, min_game_number, max_game_number)
 
         rank = 1
         title = "🏆 Top Autists 🏆"
@@ -79,7 +73,7 @@ class Summarizer:
             title += f" | ranked by {ranking.value}"
 
         summary = discord.Embed(title=title, color=0x00FF00)
-        async for row in data.aiterator():
+        for row in rows:
             display_name = await self._get_display_name(row["user_id"])
             rank_symbol = _get_rank_symbol(rank)
             row_summary = (
@@ -103,14 +97,7 @@ class Summarizer:
         rank = 1
         title = f"🏆 Game {game_number} Results 🏆"
         results = discord.Embed(title=title, color=0x00FF00)
-        games = WordleGame.objects.filter(
-            channel_id=self.channel.id,
-            is_duplicate=False,
-            is_correct_day=True,
-            game_number=game_number,
-        ).order_by("guesses", "-is_win", "posted_at")
-
-        async for row in games.aiterator():
+        for row in await sync_to_async(get_daily_results)(self.channel.id, game_number):
             display_name = await self._get_display_name(row.user_id)
             rank_symbol = _get_rank_symbol(rank)
 
@@ -134,14 +121,17 @@ class Summarizer:
         return results
 
     async def get_daily_reminder(self, game_number: int) -> discord.Embed | None:
+        tz = await aget_channel_timezone(self.channel.id)
 
         last_played = (
             WordleGame.objects.filter(
                 channel_id=self.channel.id,
                 is_duplicate=False,
                 is_correct_day=True,
+                puzzle_type=WORDLE,
                 game_number__gte=game_number - REMINDER_MAX_DAYS,
                 game_number__lte=game_number,
+                **_get_message_id_range(game_number - REMINDER_MAX_DAYS, game_number + 1, tz),
             )
             .values("user_id")
             .annotate(last_played=Max("game_number"))
@@ -168,8 +158,130 @@ class Summarizer:
 
         return reminder
 
+    async def get_hardest_days(self, limit: int, end: date, days: int | None) -> discord.Embed:
+        max_game_number = game_number_for_day(end) or 0
+        hardest = GameDifficulty.objects.filter(players__gte=HARDEST_MIN_PLAYERS, game_number__lt=max_game_number)
+        if days is not None:
+            hardest = hardest.filter(game_number__gte=max_game_number - days)
+
+        title = "💀 Hardest Days 💀"
+        if days is not None:
+            title += f" | last {days} days"
+
+        embed = discord.Embed(title=title, color=0xFF0000)
+        rank = 1
+        async for difficulty in hardest.order_by("-average_score")[:limit].aiterator():
+            day = day_for_game_number(difficulty.game_number)
+            embed.add_field(
+                name=f"\u200b\n{_get_rank_symbol(rank)} Game {difficulty.game_number} | {day:%d %b %Y}",
+                value=_get_difficulty_text(difficulty),
+                inline=False,
+            )
+            rank += 1
+
+        if len(embed.fields) == 0:
+            embed.add_field(name="\u200b\n", value="No games found 😥")
+
+        return embed
+
+    async def get_field_comparison(self, user_id: int, game_number: int) -> discord.Embed:
+        """How the user did on the game in this channel, against everyone in every tracked channel"""
+        display_name = await self._get_display_name(user_id)
+        embed = discord.Embed(title=f"📊 Game {game_number} | {display_name} vs the field 📊", color=0x0000FF)
+
+        difficulty = await GameDifficulty.objects.filter(game_number=game_number).afirst()
+        if difficulty is None:
+            embed.add_field(name="\u200b\n", value="No games found 😥")
+            return embed
+
+        embed.add_field(
+            name="\u200b\nThe field",
+            value=_get_difficulty_text(difficulty),
+            inline=False,
+        )
+
+        game = None
+        for model in (WordleGame, ArchivedWordleGame):
+            game = (
+                await model.objects.filter(
+                    channel_id=self.channel.id,
+                    user_id=user_id,
+                    game_number=game_number,
+                    is_duplicate=False,
+                    is_correct_day=True,
+                    puzzle_type=WORDLE,
+                )
+                .values("guesses", "is_win", "greens")
+                .afirst()
+            )
+            if game is not None:
+                break
+
+        if game is None:
+            embed.add_field(name="\u200b\nYou", value="Not played 😥", inline=False)
+            return embed
+
+        score = get_score(game["guesses"], game["is_win"])
+        guesses = str(game["guesses"]) if game["is_win"] else "X"
+        # Games archived before greens were counted have none
+        greens = f"{game['greens'] / (game['guesses'] * WORD_LENGTH):.0%}" if model is WordleGame else "?"
+        embed.add_field(
+            name="\u200b\nYou",
+            value=(
+                f"Guesses:** {guesses}** | Greens:** {greens}**"
+                f" | Better than** {get_better_than(difficulty, score):.0%}** of players"
+            ),
+            inline=False,
+        )
+        return embed
+
+    async def get_head_to_head(self, user_id: int, opponent_id: int) -> discord.Embed:
+        display_name = await self._get_display_name(user_id)
+        opponent_name = await self._get_display_name(opponent_id)
+        embed = discord.Embed(title=f"⚔️ {display_name} vs {opponent_name} ⚔️", color=0x0000FF)
+
+        result = await sync_to_async(get_head_to_head)(self.channel.id, user_id, opponent_id)
+        if result.games == 0:
+            embed.add_field(name="\u200b\n", value="No games played by both 😥")
+            return embed
+
+        difference = result.average_difference
+        if difference == 0:
+            average = "Same number of guesses on average"
+        else:
+            average = f"**{abs(difference):.2f}** {'fewer' if difference < 0 else 'more'} guesses on average"
+
+        embed.add_field(
+            name=f"\u200b\n{result.games} games played by both",
+            value=f"Won:** {result.wins}** | Lost:** {result.losses}** | Tied:** {result.ties}**\n{average}",
+            inline=False,
+        )
+        return embed
+
+    async def _get_rating_summary(self, limit: int) -> discord.Embed:
+        """Ratings cover every finished game, so they are not limited to a number of days"""
+        summary = discord.Embed(title="🏆 Top Autists 🏆 | ranked by rating", color=0x00FF00)
+        rank = 1
+        for rating in await sync_to_async(get_rating_leaderboard)(self.channel.id, limit):
+            display_name = await self._get_display_name(rating.user_id)
+            summary.add_field(
+                name=f"\u200b\n{_get_rank_symbol(rank)} {display_name}",
+                value=f"Rating:** {rating.rating:.0f}** | Games:** {rating.games}**",
+                inline=False,
+            )
+            rank += 1
+
+        if len(summary.fields) == 0:
+            summary.add_field(name="\u200b\n", value="No games found in the current channel 😥")
+
+        return summary
+
     async def _get_display_name(self, user_id: int) -> str:
-        display_name: str
+        # Each member is fetched from discord, which is rate limited, so names are kept for a while
+        display_name = get_display_name(self.channel.guild.id, user_id)
+        if display_name is not None:
+            return display_name
+
         try:
             user = await self.channel.guild.fetch_member(user_id)
             display_name = (
@@ -180,8 +292,86 @@ class Summarizer:
         except discord.NotFound:
             display_name = "Unknown User"
 
+        set_display_name(self.channel.guild.id, user_id, display_name)
         return display_name
 
 
+def get_game_range(end: date, days: int | None) -> tuple[int | None, int]:
+    """The first and last plus one game numbers of the days before end, or of every day before it"""
+    max_game_number = game_number_for_day(end) or 0
+    return (max_game_number - days if days is not None else None), max_game_number
+
+
+def get_leaderboard(
+    channel_id: int,
+    ranking: Ranking,
+    limit: int,
+    min_game_number: int | None,
+    max_game_number: int,
+    read_only: bool = False,
+) -> list[dict[str, Any]]:
+    """Totals of the top players over the range of games, which can not be ranked by rating"""
+    ranking_field = RANKING_FIELD_MAP[ranking]
+    order = [ranking_field] + [x for x in DEFAULT_RANKING if x != ranking_field]
+
+    # Every window is the difference of two running totals per player, however many days it covers
+    rows: list[dict[str, Any]] = [
+        asdict(row) for row in get_window_totals(channel_id, min_game_number, max_game_number, read_only)
+    ]
+    for row in rows:
+        row["average"] = row["total_guesses"] / row["games"]
+
+    return sorted(rows, key=lambda row: [-row[x[1:]] if x.startswith("-") else row[x] for x in order])[:limit]
+
+
+async def _get_cached_leaderboard(
+    channel_id: int, ranking: Ranking, limit: int, min_game_number: int | None, max_game_number: int
+) -> list[dict[str, Any]]:
+    """The leaderboard, worked out again only once the channel's games have changed"""
+    watermark = await get_watermark(channel_id)
+    if watermark is None:
+        return []
+
+    key = (channel_id, ranking.value, limit, min_game_number, max_game_number)
+    rows = get_cached_leaderboard(key, watermark)
+    if rows is None:
+        rows = await sync_to_async(get_leaderboard)(channel_id, ranking, limit, min_game_number, max_game_number)
+        cache_leaderboard(key, watermark, rows)
+
+    return rows
+
+
+def get_rating_leaderboard(channel_id: int, limit: int, read_only: bool = False) -> list[PlayerRating]:
+    """
+    The top rated players, after rating any days which have finished since. Read only callers, which must not
+    take the write lock, get the ratings as they are, which the bot brings up to date every night.
+    """
+    if not read_only:
+        update_ratings(channel_id)
+    return list(PlayerRating.objects.filter(channel_id=channel_id).order_by("-rating")[:limit])
+
+
+def _get_message_id_range(min_game_number: int | None, max_game_number: int, tz: tzinfo) -> dict[str, int]:
+    """
+    Games played on the correct day were posted during the day of their game number where the channel is, so a
+    range of game numbers is also a range of message ids which the database can use as a primary key range scan.
+    """
+    start, end = snowflake_range_for_days(
+        day_for_game_number(min_game_number or 0), day_for_game_number(max_game_number), tz
+    )
+    if min_game_number is None:
+        return {"message_id__lt": end}
+
+    return {"message_id__gte": start, "message_id__lt": end}
+
+
+def _get_difficulty_text(difficulty: GameDifficulty) -> str:
+    density = get_green_density(difficulty)
+    return (
+        f"Avg:** {difficulty.average_score:.2f}** | Failed:** {difficulty.losses / difficulty.players:.0%}**"
+        f" | Greens:** {f'{density:.0%}' if density is not None else '?'}** | Players:** {difficulty.players}**"
+    )
+
+
 def _get_rank_symbol(rank: int) -> str:
     return RANK_EMOJIS.get(rank, f"{rank}.")
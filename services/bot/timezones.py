@@ -0,0 +1,22 @@
+from datetime import tzinfo
+from zoneinfo import ZoneInfo
+
+from apps.core.models import WordleChannel
+from services.bot.config import TIMEZONE
+
+
+def get_timezone(name: str | None) -> tzinfo:
+    """The timezone with the given IANA name, or the default TIMEZONE for channels which have not set one"""
+    # ZoneInfo keeps its own cache, so asking for the same name again does not read the tz database
+    return ZoneInfo(name) if name is not None else TIMEZONE
+
+
+def get_channel_timezone(channel_id: int) -> tzinfo:
+    """The timezone the channel's days start and end in"""
+    name = WordleChannel.objects.filter(channel_id=channel_id).values_list("timezone", flat=True).first()
+    return get_timezone(name)
+
+
+async def aget_channel_timezone(channel_id: int) -> tzinfo:
+    name = await WordleChannel.objects.filter(channel_id=channel_id).values_list("timezone", flat=True).afirst()
+    return get_timezone(name)
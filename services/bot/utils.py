@@ -1,5 +1,4 @@
-from datetime import date
-
+from datetime import date, timedelta
 
 WORDLE_EPOCH = date(2021, 6, 19)
 
@@ -10,3 +9,7 @@ def game_number_for_day(day: date) -> int | None:
         return None
 
     return game_number
+
+
+def day_for_game_number(game_number: int) -> date:
+    return WORDLE_EPOCH + timedelta(days=game_number)
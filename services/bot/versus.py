@@ -0,0 +1,71 @@
+from dataclasses import dataclass
+import logging
+
+from django.db import connection
+
+from apps.core.models import ArchivedWordleGame, WordleGame
+from services.bot.difficulty import LOSS_SCORE
+from services.bot.parser import WORDLE
+
+logger = logging.getLogger(__name__)
+
+# Written out rather than built with the ORM, which takes longer to compile the query than SQLite takes to run it.
+# Both sides only read the covering versus index: a range scan over the user's games, with an index lookup for
+# the opponent's result in each of them. The conditions match the index's, so SQLite knows it can use it.
+HEAD_TO_HEAD_SQL = f"""
+SELECT COUNT(*), SUM("difference" < 0), SUM("difference" > 0), SUM("difference" = 0), SUM("difference")
+FROM (
+    SELECT
+        (CASE WHEN "user"."is_win" THEN "user"."guesses" ELSE {LOSS_SCORE} END)
+        - (CASE WHEN "opponent"."is_win" THEN "opponent"."guesses" ELSE {LOSS_SCORE} END) AS "difference"
+    FROM "{{table}}" AS "user"
+    INNER JOIN "{{table}}" AS "opponent"
+        ON "opponent"."channel_id" = "user"."channel_id"
+        AND "opponent"."user_id" = %s
+        AND "opponent"."game_number" = "user"."game_number"
+        AND "opponent"."is_correct_day" AND NOT "opponent"."is_duplicate" AND "opponent"."puzzle_type" = '{WORDLE}'
+    WHERE "user"."channel_id" = %s AND "user"."user_id" = %s
+        AND "user"."is_correct_day" AND NOT "user"."is_duplicate" AND "user"."puzzle_type" = '{WORDLE}'
+)
+"""
+
+
+@dataclass
+class HeadToHead:
+    games: int = 0
+    wins: int = 0
+    losses: int = 0
+    ties: int = 0
+    # Sum of the user's score minus the opponent's over the games both played, so lower is better
+    total_difference: int = 0
+
+    @property
+    def average_difference(self) -> float:
+        return self.total_difference / max(self.games, 1)
+
+
+def get_head_to_head(channel_id: int, user_id: int, opponent_id: int) -> HeadToHead:
+    """
+    Compares the user's games in the channel with the opponent's results for the same game numbers. The games
+    of a day are either all archived or none of them are, so the live and archived games are compared separately.
+    """
+    result = HeadToHead()
+    for model in (WordleGame, ArchivedWordleGame):
+        games, wins, losses, ties, total_difference = _compare(model, channel_id, user_id, opponent_id)
+        result.games += games
+        result.wins += wins
+        result.losses += losses
+        result.ties += ties
+        result.total_difference += total_difference
+
+    return result
+
+
+def _compare(
+    model: type[WordleGame] | type[ArchivedWordleGame], channel_id: int, user_id: int, opponent_id: int
+) -> tuple[int, int, int, int, int]:
+    with connection.cursor() as cursor:
+        cursor.execute(HEAD_TO_HEAD_SQL.format(table=model._meta.db_table), (opponent_id, channel_id, user_id))
+        games, wins, losses, ties, total_difference = cursor.fetchone()
+
+    return games, wins or 0, losses or 0, ties or 0, total_difference or 0
@@ -0,0 +1,267 @@
+"""
+In process caches of what the bot would otherwise ask discord or the database for on every command, which are
+written to the data volume on a graceful shutdown and read back on startup, so a deploy does not start cold.
+"""
+
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+import gzip
+import json
+import logging
+from pathlib import Path
+import time
+from typing import Any
+
+from apps.core.models import WordleChannel
+from services.bot.config import (
+    CACHE_SNAPSHOT_FILE,
+    DISPLAY_NAME_CACHE_SIZE,
+    DISPLAY_NAME_TTL_SECONDS,
+    FAST_RESPONSE_MS,
+    LEADERBOARD_CACHE_SIZE,
+    TRACKED_CHANNEL_RECHECK_SECONDS,
+)
+from services.bot.metrics import Counter, Histogram
+from services.bot.watermarks import Watermark, get_all_watermarks
+from wordletracker.settings import DB_PATH
+
+logger = logging.getLogger(__name__)
+
+# Bumped whenever what is stored in the snapshot changes, older snapshots are then ignored
+SNAPSHOT_VERSION = 1
+
+# Channel, ranking, limit, first and last plus one game numbers
+LeaderboardKey = tuple[int, str, int, int | None, int]
+
+cache_hits = Counter("warm_cache.hits", "Lookups answered from the in process caches")
+cache_misses = Counter("warm_cache.misses", "Lookups which had to go to discord or the database")
+response_duration = Histogram("command.duration", "Time taken to respond to a command", "ms")
+first_fast_response = Histogram(
+    "warm_cache.first_fast_response", "Time from startup until a command was first answered quickly", "s"
+)
+
+# Display names by guild and user, along with the unix time they were fetched at so they stay valid over a restart
+_display_names: OrderedDict[tuple[int, int], tuple[str, float]] = OrderedDict()
+# Leaderboard rows along with the watermark of the channel they were worked out at
+_leaderboards: OrderedDict[LeaderboardKey, tuple[Watermark, list[dict[str, Any]]]] = OrderedDict()
+# Channels are only added or removed by commands, apart from imports which run in another process, so channels
+# which are not tracked are checked again after a while
+_tracked_channels: set[int] | None = None
+_untracked_channels: dict[int, float] = {}
+_started_at = time.monotonic()
+_answered_fast = False
+
+
+@dataclass
+class SnapshotResult:
+    display_names: int
+    leaderboards: int
+    stale: int
+    duration: float
+
+
+def get_snapshot_path() -> Path:
+    return DB_PATH / CACHE_SNAPSHOT_FILE
+
+
+def reset() -> None:
+    """Empties every cache, as they are after a cold start"""
+    global _tracked_channels, _started_at, _answered_fast
+    _display_names.clear()
+    _leaderboards.clear()
+    _untracked_channels.clear()
+    _tracked_channels = None
+    _started_at = time.monotonic()
+    _answered_fast = False
+
+
+async def is_tracked_channel(channel_id: int) -> bool:
+    global _tracked_channels
+    if _tracked_channels is None:
+        _tracked_channels = set(await get_all_watermarks())
+
+    if channel_id in _tracked_channels:
+        cache_hits.add(attributes={"cache": "tracked_channels"})
+        return True
+
+    checked_at = _untracked_channels.get(channel_id)
+    if checked_at is not None and time.monotonic() - checked_at < TRACKED_CHANNEL_RECHECK_SECONDS:
+        cache_hits.add(attributes={"cache": "tracked_channels"})
+        return False
+
+    cache_misses.add(attributes={"cache": "tracked_channels"})
+    tracked = await WordleChannel.objects.filter(channel_id=channel_id).aexists()
+    set_channel_tracked(channel_id, tracked)
+    return tracked
+
+
+def set_channel_tracked(channel_id: int, tracked: bool) -> None:
+    if tracked:
+        _untracked_channels.pop(channel_id, None)
+        if _tracked_channels is not None:
+            _tracked_channels.add(channel_id)
+    else:
+        _untracked_channels[channel_id] = time.monotonic()
+        if _tracked_channels is not None:
+            _tracked_channels.discard(channel_id)
+
+
+def get_display_name(guild_id: int, user_id: int) -> str | None:
+    cached = _display_names.get((guild_id, user_id))
+    if cached is None or time.time() - cached[1] > DISPLAY_NAME_TTL_SECONDS:
+        cache_misses.add(attributes={"cache": "display_names"})
+        return None
+
+    cache_hits.add(attributes={"cache": "display_names"})
+    _display_names.move_to_end((guild_id, user_id))
+    return cached[0]
+
+
+def set_display_name(guild_id: int, user_id: int, display_name: str, fetched_at: float | None = None) -> None:
+    _display_names[(guild_id, user_id)] = (display_name, fetched_at or time.time())
+    _display_names.move_to_end((guild_id, user_id))
+    if len(_display_names) > DISPLAY_NAME_CACHE_SIZE:
+        _display_names.popitem(last=False)
+
+
+def get_cached_leaderboard(key: LeaderboardKey, watermark: Watermark) -> list[dict[str, Any]] | None:
+    """The leaderboard's rows if they were worked out at the channel's current watermark"""
+    cached = _leaderboards.get(key)
+    if cached is None or cached[0] != watermark:
+        cache_misses.add(attributes={"cache": "leaderboards"})
+        return None
+
+    cache_hits.add(attributes={"cache": "leaderboards"})
+    _leaderboards.move_to_end(key)
+    return cached[1]
+
+
+def cache_leaderboard(key: LeaderboardKey, watermark: Watermark, rows: list[dict[str, Any]]) -> None:
+    _leaderboards[key] = (watermark, rows)
+    _leaderboards.move_to_end(key)
+    if len(_leaderboards) > LEADERBOARD_CACHE_SIZE:
+        _leaderboards.popitem(last=False)
+
+
+def record_response(command: str, started: float) -> None:
+    """
+    Records how long the command took to answer from when it started, by time.perf_counter. The first time
+    since startup one is answered within FAST_RESPONSE_MS is also recorded, which is how long a deploy
+    leaves the bot slow for.
+    """
+    global _answered_fast
+    elapsed = (time.perf_counter() - started) * 1000
+    response_duration.record(elapsed, {"command": command})
+    if not _answered_fast and elapsed <= FAST_RESPONSE_MS:
+        _answered_fast = True
+        since_startup = time.monotonic() - _started_at
+        first_fast_response.record(since_startup)
+        logger.info(f"First fast response {since_startup:.1f}s after startup", extra={"command": command})
+
+
+def write_snapshot(path: Path | None = None) -> int:
+    """
+    Writes the caches to a compressed file, returning its size. It is written alongside and then moved into
+    place, so a shutdown which is cut short leaves the previous snapshot rather than half of one.
+    """
+    path = path or get_snapshot_path()
+    now = time.time()
+    display_names = [
+        [guild_id, user_id, display_name, fetched_at]
+        for (guild_id, user_id), (display_name, fetched_at) in _display_names.items()
+        if now - fetched_at <= DISPLAY_NAME_TTL_SECONDS
+    ]
+    leaderboards = [[*key, _dump_watermark(watermark), rows] for key, (watermark, rows) in _leaderboards.items()]
+    snapshot = {
+        "version": SNAPSHOT_VERSION,
+        "written_at": datetime.now(timezone.utc).isoformat(),
+        "display_names": display_names,
+        "leaderboards": leaderboards,
+    }
+
+    partial = path.with_name(f"{path.name}.partial")
+    with gzip.open(partial, "wt", encoding="utf-8") as file:
+        json.dump(snapshot, file, separators=(",", ":"))
+    partial.replace(path)
+
+    size = path.stat().st_size
+    logger.info(
+        f"Wrote cache snapshot of {len(display_names)} display names and {len(leaderboards)} leaderboards, "
+        f"{size} bytes"
+    )
+    return size
+
+
+async def load_snapshot(path: Path | None = None) -> SnapshotResult | None:
+    """
+    Fills the caches from the snapshot written on the last shutdown, if there is one of this version. Games may
+    have been posted, edited or imported while the bot was down, so leaderboards are only kept if their
+    channel's watermark has not moved since. The watermarks also give the tracked channels.
+    """
+    global _tracked_channels
+    started = time.perf_counter()
+    path = path or get_snapshot_path()
+    watermarks = await get_all_watermarks()
+    _tracked_channels = set(watermarks)
+
+    try:
+        snapshot = await asyncio.to_thread(_read_snapshot, path)
+    except FileNotFoundError:
+        logger.info("No cache snapshot to load, starting cold")
+        return None
+    except Exception as ex:
+        logger.warning("Failed to read cache snapshot, starting cold: %s", ex, exc_info=ex)
+        return None
+
+    if snapshot.get("version") != SNAPSHOT_VERSION:
+        logger.info(f"Ignoring cache snapshot of version {snapshot.get('version')}, starting cold")
+        return None
+
+    now = time.time()
+    display_names = stale = 0
+    for guild_id, user_id, display_name, fetched_at in snapshot["display_names"]:
+        if now - fetched_at > DISPLAY_NAME_TTL_SECONDS:
+            stale += 1
+            continue
+
+        set_display_name(guild_id, user_id, display_name, fetched_at)
+        display_names += 1
+
+    leaderboards = 0
+    for channel_id, ranking, limit, min_game_number, max_game_number, watermark, rows in snapshot["leaderboards"]:
+        if watermarks.get(channel_id) != _load_watermark(watermark):
+            stale += 1
+            continue
+
+        key = (channel_id, ranking, limit, min_game_number, max_game_number)
+        cache_leaderboard(key, watermarks[channel_id], rows)
+        leaderboards += 1
+
+    result = SnapshotResult(display_names, leaderboards, stale, time.perf_counter() - started)
+    logger.info(
+        f"Loaded cache snapshot written at {snapshot['written_at']} with {display_names} display names "
+        f"and {leaderboards} leaderboards, dropped {stale} stale entries in {result.duration * 1000:.0f}ms"
+    )
+    return result
+
+
+def _read_snapshot(path: Path) -> dict[str, Any]:
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        snapshot: dict[str, Any] = json.load(file)
+    return snapshot
+
+
+def _dump_watermark(watermark: Watermark) -> list[Any]:
+    changed_at = watermark.changed_at.isoformat() if watermark.changed_at is not None else None
+    return [watermark.last_ingested_message, changed_at, watermark.timezone]
+
+
+def _load_watermark(values: list[Any]) -> Watermark:
+    last_ingested_message, changed_at, timezone_name = values
+    return Watermark(
+        last_ingested_message,
+        datetime.fromisoformat(changed_at) if changed_at is not None else None,
+        timezone_name,
+    )
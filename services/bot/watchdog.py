@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+import unittest
+
+from services.bot.config import ASYNCIO_DEBUG, SLOW_CALLBACK_MS, WATCHDOG_INTERVAL_MS, WATCHDOG_STALL_MS
+from services.bot.metrics import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+event_loop_lag = Histogram("event_loop.lag", "How late the event loop was to wake up a sleeping task", "ms")
+event_loop_stalls = Counter("event_loop.stalls", "Times the event loop was blocked for longer than the threshold")
+
+
+class EventLoopWatchdog:
+    """
+    Measures how late the event loop runs a task which sleeps for a fixed interval, which is how long anything
+    else waiting on the loop, like the gateway heartbeat, was held up. The lag can only be measured once the
+    loop is free again, so a thread also watches for the task falling behind and logs the stack of the loop
+    thread while it is still blocked, which shows the sync call or callback responsible.
+    """
+
+    def __init__(
+        self,
+        interval_ms: float = WATCHDOG_INTERVAL_MS,
+        stall_ms: float = WATCHDOG_STALL_MS,
+        asyncio_debug: bool = ASYNCIO_DEBUG,
+        slow_callback_ms: float = SLOW_CALLBACK_MS,
+    ) -> None:
+        self.interval = interval_ms / 1000
+        self.stall = stall_ms / 1000
+        self.asyncio_debug = asyncio_debug
+        self.slow_callback = slow_callback_ms / 1000
+        self.last_stack: str | None = None
+        self._heartbeat = time.monotonic()
+        self._stopped = threading.Event()
+        self._task: asyncio.Task[None] | None = None
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self.asyncio_debug:
+            # Logs every callback which holds the loop for longer than this, with where it was created
+            loop.set_debug(True)
+            loop.slow_callback_duration = self.slow_callback
+
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = loop.create_task(self._measure_lag())
+        self._thread = threading.Thread(
+            target=self._watch, args=(loop, threading.get_ident()), name="event-loop-watchdog", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+        if self._thread is not None:
+            self._thread.join()
+
+    async def _measure_lag(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            event_loop_lag.record(max(loop.time() - start - self.interval, 0) * 1000)
+            self._heartbeat = time.monotonic()
+
+    def _watch(self, loop: asyncio.AbstractEventLoop, thread_id: int) -> None:
+        reported = None
+        while not self._stopped.wait(min(self.interval, self.stall) / 2):
+            heartbeat = self._heartbeat
+            blocked = time.monotonic() - heartbeat - self.interval
+            # Each stall is only reported once, however long it goes on for
+            if blocked < self.stall or reported == heartbeat:
+                continue
+
+            frame = sys._current_frames().get(thread_id)
+            if frame is None:
+                return
+
+            reported = heartbeat
+            task = asyncio.current_task(loop)
+            self.last_stack = "".join(traceback.format_stack(frame))
+            event_loop_stalls.add()
+            logger.warning(
+                f"Event loop blocked for over {blocked * 1000:.0f}ms "
+                f"in task {task.get_name() if task is not None else None}:\n{self.last_stack}"
+            )
+
+
+class TestEventLoopWatchdog(unittest.IsolatedAsyncioTestCase):
+    async def test_captures_blocking_call(self) -> None:
+        watchdog = EventLoopWatchdog(interval_ms=10, stall_ms=50, asyncio_debug=False)
+        watchdog.start()
+        await asyncio.sleep(0.05)
+        self.assertIsNone(watchdog.last_stack)
+
+        lag_count = event_loop_lag.count
+        time.sleep(0.3)
+        await asyncio.sleep(0.05)
+        watchdog.stop()
+
+        assert watchdog.last_stack is not None
+        self.assertIn("test_captures_blocking_call", watchdog.last_stack)
+        self.assertIn("time.sleep(0.3)", watchdog.last_stack)
+        self.assertGreater(event_loop_lag.count, lag_count)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Iterable
+
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from apps.core.models import WordleChannel
+
+
+@dataclass(frozen=True)
+class Watermark:
+    last_ingested_message: int | None
+    changed_at: datetime | None
+    # Which day it is for the channel depends on its timezone, so responses depend on that as well
+    timezone: str | None
+
+
+def mark_channel_changed(channel_id: int, message_id: int | None = None) -> None:
+    """Records that the channel's games changed, and that a game was stored from the message if one is given"""
+    fields: dict[str, object] = {"changed_at": datetime.now(timezone.utc)}
+    if message_id is not None:
+        # Edits and rescans store games from older messages, which must not move the watermark back
+        fields["last_ingested_message"] = Greatest(Coalesce(F("last_ingested_message"), Value(0)), Value(message_id))
+
+    WordleChannel.objects.filter(channel_id=channel_id).update(**fields)
+
+
+async def get_watermark(channel_id: int) -> Watermark | None:
+    """The channel's watermark, or none if the channel is not tracked"""
+    row = (
+        await WordleChannel.objects.filter(channel_id=channel_id)
+        .values_list("last_ingested_message", "changed_at", "timezone")
+        .afirst()
+    )
+    return Watermark(*row) if row is not None else None
+
+
+async def get_watermarks(channel_ids: Iterable[int]) -> dict[int, Watermark]:
+    """The watermarks of the tracked channels out of those given, read in a single query"""
+    rows = WordleChannel.objects.filter(channel_id__in=list(channel_ids)).values_list(
+        "channel_id", "last_ingested_message", "changed_at", "timezone"
+    )
+    return {
+        channel_id: Watermark(message_id, changed_at, timezone)
+        async for channel_id, message_id, changed_at, timezone in rows
+    }
+
+
+async def get_all_watermarks() -> dict[int, Watermark]:
+    """The watermarks of every tracked channel, read in a single query"""
+    rows = WordleChannel.objects.values_list("channel_id", "last_ingested_message", "changed_at", "timezone")
+    return {
+        channel_id: Watermark(message_id, changed_at, timezone)
+        async for channel_id, message_id, changed_at, timezone in rows
+    }
@@ -0,0 +1,338 @@
+from dataclasses import dataclass
+from itertools import groupby
+import json
+import logging
+from operator import itemgetter
+from typing import Iterable
+
+from django.db import connection, transaction
+from django.db.models import Count, Min, Q, Sum
+
+from apps.core.models import ArchivedWordleGame, PrefixTail, PrefixTotals, WordleChannel, WordleGame
+from services.bot.parser import WORDLE
+
+logger = logging.getLogger(__name__)
+
+WRITE_BATCH_SIZE = 500
+# Each position uses two query parameters, keep well under SQLite's limit
+POSITIONS_PER_STATEMENT = 200
+
+# For each player the last row before the end of the window and the last row before its start, each found
+# with a seek on the primary key, so the cost does not depend on how many games the window covers. The cross
+# join stops SQLite starting from the totals, which would read every row in the channel.
+WINDOW_SQL = """
+SELECT "tail"."user_id", "end"."games", "end"."wins", "end"."total_guesses", "end"."best",
+    "start"."games", "start"."wins", "start"."total_guesses"
+FROM "{tail}" AS "tail"
+CROSS JOIN "{totals}" AS "end"
+    ON "end"."channel_id" = "tail"."channel_id"
+    AND "end"."user_id" = "tail"."user_id"
+    AND "end"."game_number" = (
+        SELECT MAX("game_number") FROM "{totals}"
+        WHERE "channel_id" = "tail"."channel_id" AND "user_id" = "tail"."user_id" AND "game_number" < %s
+    )
+LEFT JOIN "{totals}" AS "start"
+    ON "start"."channel_id" = "tail"."channel_id"
+    AND "start"."user_id" = "tail"."user_id"
+    AND "start"."game_number" = (
+        SELECT MAX("game_number") FROM "{totals}"
+        WHERE "channel_id" = "tail"."channel_id" AND "user_id" = "tail"."user_id" AND "game_number" < %s
+    )
+WHERE "tail"."channel_id" = %s
+"""
+
+# One statement rather than a query for each table, reading the totals is quicker than building two ORM queries
+UP_TO_DATE_SQL = """
+SELECT "channel"."totals_indexed" AND NOT EXISTS (
+    SELECT 1 FROM "{tail}" WHERE "channel_id" = "channel"."channel_id" AND "stale_from" IS NOT NULL
+)
+FROM "{channel}" AS "channel"
+WHERE "channel"."channel_id" = %s
+"""
+
+
+@dataclass
+class WindowTotals:
+    user_id: int
+    games: int
+    wins: int
+    total_guesses: int
+    best: int
+
+
+def get_window_totals(
+    channel_id: int, min_game_number: int | None, max_game_number: int, read_only: bool = False
+) -> list[WindowTotals]:
+    """
+    Totals of each player's counted games in the channel with min_game_number <= game_number < max_game_number,
+    from the player's running totals, rebuilding any which are out of date first. Read only callers, which must
+    not take the write lock, add the games up instead while the running totals are out of date.
+    """
+    if read_only:
+        if not _is_up_to_date(channel_id):
+            return _sum_games(channel_id, min_game_number, max_game_number)
+    else:
+        _refresh(channel_id)
+
+    sql = WINDOW_SQL.format(tail=PrefixTail._meta.db_table, totals=PrefixTotals._meta.db_table)
+    start = min_game_number if min_game_number is not None else -1
+    with connection.cursor() as cursor:
+        cursor.execute(sql, (max_game_number, start, channel_id))
+        rows = cursor.fetchall()
+
+    results = []
+    # Fewest guesses over positions [first, last] is the smaller of two overlapping power of two spans, the one
+    # ending at the last game is already in the end row, the one ending first + 2^k - 1 needs looking up
+    lookups: dict[tuple[int, int], tuple[WindowTotals, int]] = {}
+    for user_id, games, wins, total_guesses, best, start_games, start_wins, start_total_guesses in rows:
+        first, last = (start_games or 0) + 1, games
+        if last < first:
+            continue
+
+        level = (last - first + 1).bit_length() - 1
+        totals = WindowTotals(
+            user_id=user_id,
+            games=games - (start_games or 0),
+            wins=wins - (start_wins or 0),
+            total_guesses=total_guesses - (start_total_guesses or 0),
+            best=_load_best(best)[level],
+        )
+        results.append(totals)
+        position = first + (1 << level) - 1
+        if position != last:
+            lookups[(user_id, position)] = (totals, level)
+
+    for (user_id, position), best in _get_best(channel_id, list(lookups)).items():
+        totals, level = lookups[(user_id, position)]
+        totals.best = min(totals.best, best[level])
+
+    return results
+
+
+def update_window_totals(channel_id: int, keys: Iterable[tuple[int, int]]) -> None:
+    """
+    Brings the running totals up to date after the channel's games with the given (user_id, game_number) keys
+    changed. New games after a player's last one are added on to the end straight away, anything earlier marks
+    the player's totals to be rebuilt from that game the next time they are read.
+    """
+    if not WordleChannel.objects.filter(channel_id=channel_id, totals_indexed=True).exists():
+        return
+
+    earliest: dict[int, int] = {}
+    for user_id, game_number in keys:
+        earliest[user_id] = min(game_number, earliest.get(user_id, game_number))
+
+    tails = {
+        user_id: (game_number, stale_from)
+        for user_id, game_number, stale_from in PrefixTail.objects.filter(
+            channel_id=channel_id, user_id__in=list(earliest)
+        ).values_list("user_id", "game_number", "stale_from")
+    }
+    for user_id, game_number in earliest.items():
+        tail = tails.get(user_id)
+        if tail is None or (tail[1] is None and game_number > tail[0]):
+            _rebuild(channel_id, user_id, game_number)
+        elif tail[1] is None or game_number < tail[1]:
+            PrefixTail.objects.filter(channel_id=channel_id, user_id=user_id).update(stale_from=game_number)
+
+
+def invalidate_window_totals(channel_id: int) -> None:
+    """Marks all of the channel's running totals to be rebuilt the next time they are read"""
+    WordleChannel.objects.filter(channel_id=channel_id).update(totals_indexed=False)
+
+
+def rebuild_window_totals(channel_id: int) -> None:
+    """Rebuilds all of the channel's running totals now, rather than the next time they are read"""
+    with transaction.atomic():
+        _rebuild_channel(channel_id)
+
+
+def _refresh(channel_id: int) -> None:
+    # Checked before starting a transaction, as the totals are nearly always up to date
+    if _is_up_to_date(channel_id):
+        return
+
+    with transaction.atomic():
+        if not WordleChannel.objects.filter(channel_id=channel_id, totals_indexed=True).exists():
+            _rebuild_channel(channel_id)
+            return
+
+        for tail in list(PrefixTail.objects.filter(channel_id=channel_id, stale_from__isnull=False)):
+            assert tail.stale_from is not None
+            _rebuild(channel_id, tail.user_id, tail.stale_from)
+
+
+def _is_up_to_date(channel_id: int) -> bool:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            UP_TO_DATE_SQL.format(channel=WordleChannel._meta.db_table, tail=PrefixTail._meta.db_table), (channel_id,)
+        )
+        row = cursor.fetchone()
+
+    return row is not None and bool(row[0])
+
+
+def _rebuild_channel(channel_id: int) -> None:
+    PrefixTotals.objects.filter(channel_id=channel_id).delete()
+    PrefixTail.objects.filter(channel_id=channel_id).delete()
+
+    games = sorted(_get_games(channel_id, None, None))
+    rows: list[PrefixTotals] = []
+    for user_id, user_games in groupby(games, key=itemgetter(0)):
+        rows.extend(_get_rows(channel_id, user_id, None, [game[1:] for game in user_games]))
+
+    _save(channel_id, rows)
+    WordleChannel.objects.filter(channel_id=channel_id).update(totals_indexed=True)
+    logger.info(f"Built running totals from {len(rows)} games", extra={"channel_id": channel_id})
+
+
+def _rebuild(channel_id: int, user_id: int, from_game_number: int) -> None:
+    """Recomputes the player's running totals from the game number onwards"""
+    totals = PrefixTotals.objects.filter(channel_id=channel_id, user_id=user_id)
+    totals.filter(game_number__gte=from_game_number).delete()
+    previous = totals.filter(game_number__lt=from_game_number).order_by("-game_number").first()
+
+    games = sorted(game[1:] for game in _get_games(channel_id, user_id, from_game_number))
+    rows = _get_rows(channel_id, user_id, previous, games)
+    if previous is None and len(rows) == 0:
+        PrefixTail.objects.filter(channel_id=channel_id, user_id=user_id).delete()
+        return
+
+    _save(channel_id, rows)
+    # Only happens when the player's last games were deleted
+    if len(rows) == 0 and previous is not None:
+        PrefixTail.objects.filter(channel_id=channel_id, user_id=user_id).update(
+            game_number=previous.game_number, stale_from=None
+        )
+
+
+def _get_rows(
+    channel_id: int, user_id: int, previous: PrefixTotals | None, games: list[tuple[int, int, bool]]
+) -> list[PrefixTotals]:
+    position = previous.games if previous is not None else 0
+    # The sparse table of each new game is built from the tables of games a power of two before it
+    needed = {
+        earlier
+        for offset in range(1, len(games) + 1)
+        for level in range((position + offset).bit_length())
+        if 0 < (earlier := position + offset - (1 << level)) <= position
+    }
+    best = _get_best(channel_id, [(user_id, earlier) for earlier in needed])
+    tables = {earlier: table for (_, earlier), table in best.items()}
+
+    rows = []
+    wins = previous.wins if previous is not None else 0
+    total_guesses = previous.total_guesses if previous is not None else 0
+    for game_number, guesses, is_win in games:
+        position += 1
+        wins += is_win
+        total_guesses += guesses
+        table = [guesses]
+        while (1 << len(table)) <= position:
+            level = len(table) - 1
+            table.append(min(table[level], tables[position - (1 << level)][level]))
+
+        tables[position] = table
+        rows.append(
+            PrefixTotals(
+                channel_id=channel_id,
+                user_id=user_id,
+                game_number=game_number,
+                games=position,
+                wins=wins,
+                total_guesses=total_guesses,
+                best=table,
+            )
+        )
+
+    return rows
+
+
+def _save(channel_id: int, rows: list[PrefixTotals]) -> None:
+    PrefixTotals.objects.bulk_create(rows, batch_size=WRITE_BATCH_SIZE)
+    tails = {row.user_id: row.game_number for row in rows}
+    PrefixTail.objects.bulk_create(
+        [
+            PrefixTail(channel_id=channel_id, user_id=user_id, game_number=game_number, stale_from=None)
+            for user_id, game_number in tails.items()
+        ],
+        batch_size=WRITE_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=["channel", "user_id"],
+        update_fields=["game_number", "stale_from"],
+    )
+
+
+def _get_games(channel_id: int, user_id: int | None, from_game_number: int | None) -> list[tuple[int, int, int, bool]]:
+    """(user_id, game_number, guesses, is_win) of the counted games, from the live games and the archive"""
+    rows: list[tuple[int, int, int, bool]] = []
+    for model in (ArchivedWordleGame, WordleGame):
+        games = model.objects.filter(channel_id=channel_id, is_duplicate=False, is_correct_day=True, puzzle_type=WORDLE)
+        if user_id is not None:
+            games = games.filter(user_id=user_id)
+        if from_game_number is not None:
+            games = games.filter(game_number__gte=from_game_number)
+
+        rows.extend(games.values_list("user_id", "game_number", "guesses", "is_win"))
+
+    return rows
+
+
+def _sum_games(channel_id: int, min_game_number: int | None, max_game_number: int) -> list[WindowTotals]:
+    totals: dict[int, WindowTotals] = {}
+    window = Q(game_number__lt=max_game_number)
+    if min_game_number is not None:
+        window &= Q(game_number__gte=min_game_number)
+
+    for model in (ArchivedWordleGame, WordleGame):
+        rows = (
+            model.objects.filter(
+                window, channel_id=channel_id, is_duplicate=False, is_correct_day=True, puzzle_type=WORDLE
+            )
+            .values("user_id")
+            .annotate(
+                games=Count("message_id"),
+                wins=Count("message_id", filter=Q(is_win=True)),
+                total_guesses=Sum("guesses"),
+                best=Min("guesses"),
+            )
+            .order_by()
+        )
+        for row in rows:
+            total = totals.get(row["user_id"])
+            if total is None:
+                totals[row["user_id"]] = WindowTotals(**row)
+                continue
+
+            total.games += row["games"]
+            total.wins += row["wins"]
+            total.total_guesses += row["total_guesses"]
+            total.best = min(total.best, row["best"])
+
+    return list(totals.values())
+
+
+def _get_best(channel_id: int, positions: list[tuple[int, int]]) -> dict[tuple[int, int], list[int]]:
+    """Sparse tables of the games at the given (user_id, position) keys"""
+    tables = {}
+    table = PrefixTotals._meta.db_table
+    with connection.cursor() as cursor:
+        for index in range(0, len(positions), POSITIONS_PER_STATEMENT):
+            chunk = positions[index : index + POSITIONS_PER_STATEMENT]
+            values = ", ".join(["(%s, %s)"] * len(chunk))
+            # Joined from the keys so each one is a seek on the position constraint rather than a channel scan
+            cursor.execute(
+                f'SELECT "totals"."user_id", "totals"."games", "totals"."best" FROM (VALUES {values}) AS "keys" '
+                f'CROSS JOIN "{table}" AS "totals" ON "totals"."channel_id" = %s '
+                'AND "totals"."user_id" = "keys"."column1" AND "totals"."games" = "keys"."column2"',
+                (*(value for key in chunk for value in key), channel_id),
+            )
+            for user_id, games, best in cursor.fetchall():
+                tables[(user_id, games)] = _load_best(best)
+
+    return tables
+
+
+def _load_best(best: str | list[int]) -> list[int]:
+    # Raw queries return the JSON text rather than the decoded list
+    return json.loads(best) if isinstance(best, str) else best
@@ -21,13 +21,16 @@ DB_PATH = Path(os.getenv("DB_PATH", BASE_DIR))
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
-# SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = "django-insecure-f3mrz6k*==lkawe0js^z(akl(*e@5jz-a2y@_o5o@pk+o9*itz"
-
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.getenv("DEBUG") == "TRUE"
+
+# SECURITY WARNING: keep the secret key used in production secret! Only the stats API needs one, the bot does not
+SECRET_KEY = os.getenv("SECRET_KEY") or (
+    "django-insecure-f3mrz6k*==lkawe0js^z(akl(*e@5jz-a2y@_o5o@pk+o9*itz" if DEBUG else ""
+)
 
-ALLOWED_HOSTS: list[str] = []
+# Comma separated hosts the stats API can be served under
+ALLOWED_HOSTS: list[str] = [host for host in os.getenv("ALLOWED_HOSTS", "").split(",") if host != ""]
 
 
 # Application definition
@@ -123,3 +126,14 @@ STATIC_URL = "static/"
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+
+# Stats API, see readme.md
+
+API_WATERMARK_TTL = int(os.getenv("API_WATERMARK_TTL", "5"))
+API_CACHE_SIZE = int(os.getenv("API_CACHE_SIZE", "512"))
+API_PAGE_SIZE = int(os.getenv("API_PAGE_SIZE", "50"))
+API_MAX_LIMIT = int(os.getenv("API_MAX_LIMIT", "200"))
+LIVE_POLL_SECONDS = int(os.getenv("LIVE_POLL_SECONDS", "2"))
+LIVE_BUFFER_SIZE = int(os.getenv("LIVE_BUFFER_SIZE", "32"))
+LIVE_KEEPALIVE_SECONDS = int(os.getenv("LIVE_KEEPALIVE_SECONDS", "15"))
@@ -18,6 +18,12 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path
 
+from apps.core import views
+
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("api/channels/<int:channel_id>/leaderboard", views.leaderboard, name="leaderboard"),
+    path("api/channels/<int:channel_id>/games/<int:game_number>", views.game_results, name="game_results"),
+    path("api/channels/<int:channel_id>/users/<int:user_id>/games", views.user_history, name="user_history"),
+    path("api/channels/<int:channel_id>/live", views.live_leaderboard, name="live_leaderboard"),
 ]